@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Adicionar o diretório raiz ao path para importar src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.db_manager import DBManager
+from src.database.bulk_writer import bulk_upsert
+from src.utils.money import to_centavos, from_centavos
+
+NUM_PARCELAS = 500_000
+
+def gerar_parcelas(n):
+    inicio = date(2020, 1, 1)
+    for i in range(n):
+        yield {
+            'id': f"CNT_{i // 12:06d}_P{i % 12 + 1}",
+            'contrato_id': f"CNT_{i // 12:06d}",
+            'numero': i % 12 + 1,
+            'valor': 250.0,
+            'data_vencimento': (inicio + timedelta(days=i % 2000)).isoformat(),
+            'data_pagamento': None,
+            'status': 'em_aberto'
+        }
+
+def gravar_loop(conn, parcelas):
+    """Estratégia antiga: um cursor.execute por linha (com a mesma conversão para centavos)."""
+    cursor = conn.cursor()
+    for item in parcelas:
+        centavos = to_centavos(item.get('valor'))
+        cursor.execute("""
+            INSERT OR REPLACE INTO parcelas (
+                id, contrato_id, numero, valor,
+                data_vencimento, data_pagamento, status, valor_centavos
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            item.get('id'), item.get('contrato_id'),
+            item.get('numero'), from_centavos(centavos),
+            item.get('data_vencimento'), item.get('data_pagamento'),
+            item.get('status'), centavos
+        ))
+    conn.commit()
+
+def gravar_bulk(conn, parcelas):
+    bulk_upsert(conn, "parcelas", parcelas)
+
+def medir(nome, func, parcelas):
+    """Mede a carga inicial (tabela vazia) e a regravação (todas as linhas já existem)."""
+    n = len(parcelas)
+    tempos = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager(os.path.join(tmp, "bench.db"))
+        for _ in range(2):
+            t0 = time.perf_counter()
+            func(db.get_connection(), parcelas)
+            tempos.append(time.perf_counter() - t0)
+        db.close()
+    carga, regrava = tempos
+    print(f"{nome:<18} carga {n / carga:10,.0f} linhas/s   regravação {n / regrava:10,.0f} linhas/s")
+    return tempos
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_PARCELAS
+    print(f"Gravando {n:,} parcelas...")
+    parcelas = list(gerar_parcelas(n))
+    t_loop = medir("execute em loop", gravar_loop, parcelas)
+    t_bulk = medir("bulk_upsert", gravar_bulk, parcelas)
+    print(f"Ganho: carga {t_loop[0] / t_bulk[0]:.2f}x, regravação {t_loop[1] / t_bulk[1]:.2f}x")
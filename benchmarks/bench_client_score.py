@@ -0,0 +1,63 @@
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+# Adicionar o diretório raiz ao path para importar src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import Contrato, Parcela
+from src.utils.client_score import calcular_score_cliente, calcular_scores_clientes
+
+NUM_CLIENTES = 5_000
+PARCELAS_POR_CONTRATO = 12
+# O cálculo por cliente é O(clientes x registros); medimos uma amostra e extrapolamos
+AMOSTRA_POR_CLIENTE = 200
+
+def gerar_dados(num_clientes, seed=42):
+    rnd = random.Random(seed)
+    hoje = date.today()
+    contratos, parcelas = [], []
+    for i in range(num_clientes):
+        cliente = f"Cliente {i:05d}"
+        for j in range(rnd.randint(1, 2)):
+            contrato_id = f"CNT_{i:05d}_{j}"
+            inicio = hoje - timedelta(days=rnd.randint(0, 1500))
+            contratos.append(Contrato(
+                id=contrato_id, cliente=cliente, valor_total=rnd.randint(1_000, 60_000),
+                num_parcelas=PARCELAS_POR_CONTRATO, data_inicio=inicio.isoformat(), status="ativo"
+            ))
+            for n in range(PARCELAS_POR_CONTRATO):
+                venc = inicio + timedelta(days=30 * n)
+                paga = venc < hoje and rnd.random() < 0.85
+                pagamento = venc + timedelta(days=rnd.choice([-2, 0, 0, 3, 15])) if paga else None
+                parcelas.append(Parcela(
+                    id=f"{contrato_id}_P{n + 1}", contrato_id=contrato_id, numero=n + 1,
+                    valor=rnd.randint(100, 5_000), data_vencimento=venc.isoformat(),
+                    data_pagamento=pagamento.isoformat() if pagamento else None,
+                    status="paga" if paga else "em_aberto", cliente=cliente
+                ))
+    return contratos, parcelas
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_CLIENTES
+    contratos, parcelas = gerar_dados(n)
+    clientes = sorted({c['cliente'] for c in contratos})
+    print(f"{len(clientes):,} clientes, {len(contratos):,} contratos, {len(parcelas):,} parcelas")
+
+    amostra = clientes[:AMOSTRA_POR_CLIENTE]
+    t0 = time.perf_counter()
+    por_cliente = {cli: calcular_score_cliente(cli, contratos, parcelas) for cli in amostra}
+    t_amostra = time.perf_counter() - t0
+    t_por_cliente = t_amostra * len(clientes) / len(amostra)
+
+    t0 = time.perf_counter()
+    lote = calcular_scores_clientes(contratos, parcelas)
+    t_lote = time.perf_counter() - t0
+
+    divergentes = [cli for cli in amostra if por_cliente[cli] != lote[cli]]
+    print(f"por cliente (estimado p/ {len(clientes):,}) {t_por_cliente:8.2f} s   "
+          f"({len(amostra)} clientes medidos em {t_amostra:.2f} s)")
+    print(f"calcular_scores_clientes           {t_lote:8.2f} s")
+    print(f"Ganho: {t_por_cliente / t_lote:,.0f}x   resultados divergentes na amostra: {len(divergentes)}")
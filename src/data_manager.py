@@ -1,8 +1,33 @@
 import os
 import shutil
 import sqlite3
-from datetime import datetime
-from src.database.db_manager import DBManager
+import json
+import threading
+import numpy as np
+from datetime import date, datetime
+from src.database.db_manager import DBManager, TABLE_COLUMNS, MONEY_COLUMNS, IDS_POR_CONSULTA
+from src.database.bulk_writer import bulk_upsert, bulk_delete, row_values
+from src.database.aggregates import AGGREGATE_FIELDS, contribuicoes, aplicar_diferenca, rebuild_aggregates
+from src.models import RECORD_TYPES
+from src.utils.money import to_centavos, from_centavos
+from src.utils.dates import to_iso
+from src.utils.analytics import AnalyticsEngine, intervalo_meses
+from src.utils.client_score import COMPONENTES, calcular_componentes, montar_score
+from src.utils.forecast import HORIZONTE_MESES, calcular_previsao
+from src.utils.schedule import diff_cronograma
+
+# Componentes do score de clientes afetados por uma escrita em cada tabela
+SCORE_COMPONENTES = {
+    "contratos": COMPONENTES,                   # cliente, data de início e o próprio vínculo das parcelas
+    "parcelas": ("pontualidade", "volume"),     # pagamentos e vencimentos
+    "despesas": ()
+}
+# Colunas que entram no cálculo do score (um UPDATE só nas outras não recalcula nada)
+SCORE_FIELDS = {
+    "contratos": {"cliente", "data_inicio"},
+    "parcelas": {"contrato_id", "valor", "valor_centavos", "data_vencimento", "data_pagamento", "status"},
+    "despesas": set()
+}
 
 class DataManager:
     def __init__(self, data_dir="dados_sistema"):
@@ -18,97 +43,854 @@ class DataManager:
             "parcelas": "parcelas",
             "despesas": "despesas"
         }
+        # Colunas persistidas de cada tabela (a primeira é sempre a chave primária)
+        self.columns = TABLE_COLUMNS
+        # Coluna de data usada por padrão nos filtros de período
+        self.date_fields = {
+            "contratos": "data_inicio",
+            "parcelas": "data_vencimento",
+            "despesas": "data"
+        }
+        # Último estado conhecido de cada tabela: {tabela: {id: tupla de valores}}
+        self._snapshots = {}
+        # Revisão da tabela que cada snapshot reflete: load_data em outra thread (pool do desktop)
+        # só troca o snapshot por um de revisão igual ou mais nova
+        self._snapshot_revisions = {}
+        # Cache de leitura: {tabela: (revisões das dependências, linhas, snapshot)}
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        # Tabelas cujas revisões invalidam o cache de cada tabela (parcelas traz cliente via JOIN)
+        self.cache_dependencies = {
+            "contratos": ("contratos",),
+            "parcelas": ("parcelas", "contratos"),
+            "despesas": ("despesas",)
+        }
+        # Conexão dedicada apenas a ler PRAGMA data_version. Como ela nunca escreve, o valor muda
+        # a cada commit de qualquer outra conexão: das threads deste processo ou de outro processo
+        # (ex.: desktop e Streamlit abertos ao mesmo tempo). Enquanto ele não muda, as revisões
+        # da tabela `revisoes` não precisam ser relidas.
+        self._version_conn = self.db.create_connection()
+        self._revisions = None
+        self._revisions_version = None
+        # Revisões geradas pelas escritas deste DataManager: {tabela: set(revisao)}
+        self._own_revisions = {t: set() for t in self.table_map.values()}
+        # Motor analítico dos dashboards: (revisões de todas as tabelas, AnalyticsEngine)
+        self._analytics = None
 
     def load_data(self, key):
         """
-        Carrega dados da tabela correspondente no SQLite e retorna como lista de dicionários.
+        Carrega dados da tabela correspondente no SQLite e retorna como lista de registros
+        (Contrato, Parcela, Despesa de src.models), que também se comportam como dicionários.
+        Guarda também um snapshot das linhas lidas para que o próximo save_data grave apenas o que mudou.
+        Leituras repetidas sem escrita no meio vêm do cache: custam uma cópia da lista, sem consultar
+        a tabela. Os registros são compartilhados com o cache, então alterações neles devem ser seguidas
+        de uma gravação (que invalida o cache).
         """
         table = self.table_map.get(key)
         if not table:
             return []
 
-        conn = self.db.get_connection()
         try:
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT * FROM {table}")
-            rows = cursor.fetchall()
-            # Converter sqlite3.Row para dict
-            return [dict(row) for row in rows]
+            revisions = self._current_revisions()
+            version = tuple(revisions.get(t, 0) for t in self.cache_dependencies[table])
+            with self._cache_lock:
+                cached = self._cache.get(table)
+            if cached and cached[0] == version:
+                _, rows, snapshot = cached
+            else:
+                cursor = self.db.get_connection().cursor()
+                cursor.execute(self._select_sql(table))
+                fetched = cursor.fetchall()
+                columns = self.columns[table]
+                snapshot = {row['id']: tuple(row[c] for c in columns) for row in fetched}
+                # Converter sqlite3.Row em registros tipados (datas e valores já convertidos)
+                rows = RECORD_TYPES[table].from_rows(cursor.description, fetched)
+                # As revisões foram lidas antes do SELECT: se alguém gravar no meio, a próxima
+                # leitura verá uma revisão diferente e recarrega
+                with self._cache_lock:
+                    self._cache[table] = (version, rows, snapshot)
+            self._trocar_snapshot(table, snapshot, revisions.get(table, 0))
+            return list(rows)
         except sqlite3.Error as e:
             print(f"Erro ao carregar dados de {key}: {e}")
             return []
 
+    def _trocar_snapshot(self, table, snapshot, revision):
+        """Guarda o snapshot (base do diff do save_data) se ele não for mais antigo que o atual."""
+        with self._cache_lock:
+            if revision >= self._snapshot_revisions.get(table, -1):
+                self._snapshots[table] = snapshot
+                self._snapshot_revisions[table] = revision
+
+    def _data_version(self):
+        with self._cache_lock:
+            return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _current_revisions(self):
+        version = self._data_version()
+        with self._cache_lock:
+            if self._revisions is not None and self._revisions_version == version:
+                return self._revisions
+        revisions = self.db.get_revisions()
+        with self._cache_lock:
+            self._revisions, self._revisions_version = revisions, version
+        return revisions
+
+    def _mark_own_revision(self, table, revision):
+        """Registra uma revisão gerada por este DataManager (chamar só depois do commit)."""
+        with self._cache_lock:
+            self._own_revisions[table].add(revision)
+
+    def get_revisions(self):
+        """Revisão atual de cada tabela: {key: revisao}. Muda sempre que alguém grava na tabela."""
+        revisions = self._current_revisions()
+        return {key: revisions.get(table, 0) for key, table in self.table_map.items()}
+
+    def poll_changes(self, known, include_own=False):
+        """
+        Compara revisões conhecidas pelo frontend com as atuais.
+        Retorna (chaves alteradas, revisões atuais). Por padrão ignora mudanças feitas pelo
+        próprio DataManager, já que a tela que gravou se atualiza sozinha.
+        """
+        current = self.get_revisions()
+        changed = set()
+        for key, revision in current.items():
+            previous = known.get(key)
+            if previous is None:
+                changed.add(key)
+                continue
+            if revision == previous:
+                continue
+            with self._cache_lock:
+                own = self._own_revisions[self.table_map[key]]
+                external = include_own or any(r not in own for r in range(previous + 1, revision + 1))
+                own.difference_update([r for r in own if r <= revision])
+            if external:
+                changed.add(key)
+        return changed, current
+
+    def invalidate_cache(self, key=None):
+        """Descarta o cache de uma tabela (ou de todas)."""
+        with self._cache_lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(self.table_map.get(key), None)
+
+    def get_analytics(self):
+        """
+        AnalyticsEngine (arrays NumPy) com contratos, parcelas e despesas atuais.
+        Só é reconstruído quando alguma das tabelas muda; trocar o período do dashboard
+        reaproveita os mesmos arrays.
+        """
+        revisions = self._current_revisions()
+        version = tuple(revisions.get(t, 0) for t in self.table_map.values())
+        with self._cache_lock:
+            cached = self._analytics
+        if cached and cached[0] == version:
+            return cached[1]
+        engine = AnalyticsEngine(self.load_data("contratos"), self.load_data("parcelas"), self.load_data("despesas"))
+        with self._cache_lock:
+            self._analytics = (version, engine)
+        return engine
+
+    def _from_sql(self, table):
+        """FROM base de cada tabela. A tabela principal usa o alias 't'."""
+        if table == "parcelas":
+            # Parcelas são normalizadas: cliente e tipo de honorário vêm do contrato
+            return "FROM parcelas t LEFT JOIN contratos c ON c.id = t.contrato_id"
+        return f"FROM {table} t"
+
+    def _select_sql(self, table):
+        """SELECT base de cada tabela. A tabela principal usa o alias 't'."""
+        if table == "parcelas":
+            return "SELECT t.*, c.cliente, c.tipo_honorario " + self._from_sql(table)
+        return "SELECT t.* " + self._from_sql(table)
+
+    def _column_ref(self, table, column):
+        """Resolve o nome de coluna usado em filtros/ordenação para a expressão SQL correspondente."""
+        if column in self.columns[table]:
+            return f"t.{column}"
+        if table == "parcelas" and column in ("cliente", "tipo_honorario"):
+            return f"c.{column}"
+        raise ValueError(f"Coluna inválida para {table}: {column}")
+
+    @staticmethod
+    def _sql_literal(value):
+        return "'" + str(value).replace("'", "''") + "'"
+
+    @staticmethod
+    def _iso_date(value):
+        if isinstance(value, (date, datetime)):
+            return value.strftime("%Y-%m-%d")
+        return to_iso(value) or value
+
+    def _build_where(self, table, status=None, date_from=None, date_to=None, date_field=None,
+                     contrato_id=None, cliente=None, cliente_contains=None):
+        conditions = []
+        params = []
+
+        if status is not None:
+            # Status vai como literal (e não como parâmetro) para que o SQLite consiga usar
+            # os índices parciais "WHERE status = 'em_aberto'" / "WHERE status = 'paga'"
+            if isinstance(status, (list, tuple, set)):
+                literals = ", ".join(self._sql_literal(s) for s in status)
+                conditions.append(f"t.status IN ({literals})")
+            else:
+                conditions.append(f"t.status = {self._sql_literal(status)}")
+
+        if date_from is not None or date_to is not None:
+            col = self._column_ref(table, date_field or self.date_fields[table])
+            if date_from is not None:
+                conditions.append(f"{col} >= ?")
+                params.append(self._iso_date(date_from))
+            if date_to is not None:
+                conditions.append(f"{col} <= ?")
+                params.append(self._iso_date(date_to))
+
+        if contrato_id is not None:
+            conditions.append(f"{self._column_ref(table, 'contrato_id')} = ?")
+            params.append(contrato_id)
+
+        if cliente is not None:
+            conditions.append(f"{self._column_ref(table, 'cliente')} = ?")
+            params.append(cliente)
+
+        if cliente_contains:
+            conditions.append(f"{self._column_ref(table, 'cliente')} LIKE ?")
+            params.append(f"%{cliente_contains}%")
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+
+    def query_data(self, key, status=None, date_from=None, date_to=None, date_field=None,
+                   contrato_id=None, cliente=None, cliente_contains=None,
+                   order_by=None, limit=None, offset=None):
+        """
+        Consulta filtrada: os filtros, a ordenação e a paginação rodam no SQLite.
+        - status: valor único ou lista de valores
+        - date_from / date_to: intervalo inclusivo (date ou 'AAAA-MM-DD') sobre date_field
+          (padrão: data_vencimento, data ou data_inicio, conforme a tabela)
+        - contrato_id, cliente: igualdade; cliente_contains: busca parcial (LIKE)
+        - order_by: coluna ou lista de colunas; prefixo '-' para ordem decrescente
+        - limit / offset: paginação
+        Diferente de load_data, o resultado não atualiza o snapshot usado pelo save_data,
+        então a lista retornada serve apenas para leitura.
+        """
+        table = self.table_map.get(key)
+        if not table:
+            return []
+
+        where, params = self._build_where(
+            table, status=status, date_from=date_from, date_to=date_to, date_field=date_field,
+            contrato_id=contrato_id, cliente=cliente, cliente_contains=cliente_contains
+        )
+        sql = self._select_sql(table) + where
+
+        if order_by:
+            if isinstance(order_by, str):
+                order_by = [order_by]
+            terms = []
+            for col in order_by:
+                desc = col.startswith("-")
+                terms.append(f"{self._column_ref(table, col.lstrip('-'))}{' DESC' if desc else ''}")
+            sql += f" ORDER BY {', '.join(terms)}"
+
+        if limit is not None or offset is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else int(limit), int(offset or 0)]
+
+        try:
+            cursor = self.db.get_connection().cursor()
+            cursor.execute(sql, params)
+            return RECORD_TYPES[table].from_rows(cursor.description, cursor.fetchall())
+        except sqlite3.Error as e:
+            print(f"Erro ao consultar {key}: {e}")
+            return []
+
+    def count_data(self, key, status=None, date_from=None, date_to=None, date_field=None,
+                   contrato_id=None, cliente=None, cliente_contains=None):
+        """Quantidade de registros que query_data retornaria com os mesmos filtros (sem paginação)."""
+        table = self.table_map.get(key)
+        if not table:
+            return 0
+
+        where, params = self._build_where(
+            table, status=status, date_from=date_from, date_to=date_to, date_field=date_field,
+            contrato_id=contrato_id, cliente=cliente, cliente_contains=cliente_contains
+        )
+        try:
+            cursor = self.db.get_connection().cursor()
+            cursor.execute("SELECT COUNT(*) " + self._from_sql(table) + where, params)
+            return cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Erro ao contar {key}: {e}")
+            return 0
+
+    def get_record(self, key, record_id):
+        """Busca um único registro pela chave primária. Retorna None se não existir."""
+        table = self.table_map.get(key)
+        if not table:
+            return None
+
+        try:
+            cursor = self.db.get_connection().cursor()
+            cursor.execute(self._select_sql(table) + " WHERE t.id = ?", (record_id,))
+            row = cursor.fetchone()
+            return RECORD_TYPES[table].from_rows(cursor.description, [row])[0] if row else None
+        except sqlite3.Error as e:
+            print(f"Erro ao buscar {key} {record_id}: {e}")
+            return None
+
+    def _load_snapshot(self, table):
+        """Lê do banco o estado atual das colunas persistidas (usado quando não houve load_data antes)."""
+        columns = self.columns[table]
+        cursor = self.db.get_connection().cursor()
+        cursor.execute(f"SELECT {', '.join(columns)} FROM {table}")
+        return {row[0]: tuple(row) for row in cursor.fetchall()}
+
     def save_data(self, key, data):
         """
         Salva uma lista de dados na tabela correspondente.
-        Simula o comportamento de sobrescrever o JSON: Atualiza registros existentes e insere novos.
+        Simula o comportamento de sobrescrever o JSON, mas grava apenas a diferença em relação
+        ao último load/save: registros novos ou alterados recebem UPSERT e registros que sumiram
+        da lista são excluídos, tudo em uma única transação.
         """
         table = self.table_map.get(key)
         if not table:
             return
 
-        conn = self.db.get_connection()
+        # Estado desejado: apenas as colunas que existem na tabela, indexado pelo id
+        atual = {}
+        for item in data:
+            valores = row_values(table, item)
+            atual[valores[0]] = valores
+
         try:
-            cursor = conn.cursor()
-            
-            # Estratégia: Usar transação para garantir integridade
-            # Como recebemos a lista completa, idealmente deveríamos sincronizar.
-            # Para simplificar e manter performance, vamos fazer UPSERT (INSERT OR REPLACE)
-            # nos itens recebidos.
-            
-            if key == "contratos":
-                for item in data:
-                    cursor.execute("""
-                        INSERT OR REPLACE INTO contratos (
-                            id, cliente, telefone, area_direito, tipo_honorario, 
-                            valor_total, num_parcelas, data_inicio, status, 
-                            origem, forma_pagamento, responsavel
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        item.get('id'), item.get('cliente'), item.get('telefone'),
-                        item.get('area_direito'), item.get('tipo_honorario'),
-                        item.get('valor_total'), item.get('num_parcelas'),
-                        item.get('data_inicio'), item.get('status'),
-                        item.get('origem'), item.get('forma_pagamento'),
-                        item.get('responsavel')
-                    ))
-                    
-            elif key == "parcelas":
-                # Atenção: Se uma parcela foi deletada na interface, ela não virá nesta lista.
-                # O comportamento do JSON era sobrescrever tudo. 
-                # Para replicar isso 100%, deveríamos limpar a tabela ou deletar os que não estão na lista.
-                # Por segurança, vamos apenas atualizar/inserir por enquanto.
-                for item in data:
-                    cursor.execute("""
-                        INSERT OR REPLACE INTO parcelas (
-                            id, contrato_id, numero, valor, 
-                            data_vencimento, data_pagamento, status
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        item.get('id'), item.get('contrato_id'),
-                        item.get('numero'), item.get('valor'),
-                        item.get('data_vencimento'), item.get('data_pagamento'),
-                        item.get('status')
-                    ))
-                    
-            elif key == "despesas":
-                for item in data:
-                    cursor.execute("""
-                        INSERT OR REPLACE INTO despesas (
-                            id, descricao, categoria, tipo, valor, data, comprovante
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        item.get('id'), item.get('descricao'),
-                        item.get('categoria'), item.get('tipo'),
-                        item.get('valor'), item.get('data'),
-                        item.get('comprovante')
-                    ))
-
-            conn.commit()
-            
+            # O diff e a troca do snapshot acontecem sob o write_lock para que dois
+            # escritores (ex.: sessões do Streamlit) não gravem diffs calculados sobre o mesmo estado
+            with self.db.write_lock:
+                snapshot = self._snapshots.get(table)
+                if snapshot is None:
+                    snapshot = self._load_snapshot(table)
+
+                alterados = [valores for id_, valores in atual.items() if snapshot.get(id_) != valores]
+                removidos = [id_ for id_ in snapshot if id_ not in atual]
+
+                if alterados or removidos:
+                    ids = [valores[0] for valores in alterados] + removidos
+                    with self.db.transaction() as conn:
+                        clientes = self._clientes_afetados(conn, table, ids)
+                        agregados = contribuicoes(conn, table, ids)
+                        bulk_upsert(conn, table, alterados, commit=False)
+                        bulk_delete(conn, table, removidos, commit=False)
+                        clientes |= self._clientes_afetados(conn, table, ids)
+                        self._atualizar_scores(conn, clientes, SCORE_COMPONENTES[table])
+                        aplicar_diferenca(conn, table, agregados, contribuicoes(conn, table, ids))
+                        revision = self.db.bump_revision(conn, table)
+                    self._mark_own_revision(table, revision)
+                    self.invalidate_cache(key)
+                    self._trocar_snapshot(table, atual, revision)
+                else:
+                    with self._cache_lock:
+                        self._snapshots[table] = atual
+
         except sqlite3.Error as e:
             print(f"Erro ao salvar dados em {key}: {e}")
 
+    # ----- Mutações pontuais -----
+    # Cada método roda um único comando em uma transação e retorna a quantidade de linhas afetadas.
+    # Não alteram o snapshot do save_data: se a lista em memória do chamador também for atualizada,
+    # um save_data posterior apenas regrava a mesma linha; se não for, nada é revertido.
+
+    def _execute_write(self, key, sql, params, record_id=None, componentes=None, agregados=True):
+        """
+        record_id: registro alterado, para atualizar o score dos clientes afetados
+        (os de antes e os de depois da escrita, caso o cliente do registro mude) e os agregados mensais.
+        componentes: componentes do score afetados (padrão: SCORE_COMPONENTES da tabela).
+        agregados: False quando a escrita não muda os agregados mensais.
+        """
+        try:
+            table = self.table_map[key]
+            if componentes is None:
+                componentes = SCORE_COMPONENTES[table]
+            with self.db.transaction() as conn:
+                ids = [record_id] if record_id is not None and componentes else []
+                ids_agregados = [record_id] if record_id is not None and agregados else []
+                clientes = self._clientes_afetados(conn, table, ids)
+                antes = contribuicoes(conn, table, ids_agregados)
+                count = conn.execute(sql, params).rowcount
+                if count:
+                    clientes |= self._clientes_afetados(conn, table, ids)
+                    self._atualizar_scores(conn, clientes, componentes)
+                    aplicar_diferenca(conn, table, antes, contribuicoes(conn, table, ids_agregados))
+                revision = self.db.bump_revision(conn, table) if count else None
+        except sqlite3.Error as e:
+            print(f"Erro ao gravar em {key}: {e}")
+            return 0
+        if revision is not None:
+            self._mark_own_revision(table, revision)
+        self.invalidate_cache(key)
+        return count
+
+    def insert_records(self, key, items):
+        """Insere (ou atualiza, se o id já existir) apenas os registros informados."""
+        table = self.table_map.get(key)
+        if not table or not items:
+            return 0
+        try:
+            with self.db.transaction() as conn:
+                count, revision = self._inserir(conn, table, items)
+        except sqlite3.Error as e:
+            print(f"Erro ao inserir em {key}: {e}")
+            return 0
+        self._mark_own_revision(table, revision)
+        self.invalidate_cache(key)
+        return count
+
+    def _inserir(self, conn, table, items):
+        """UPSERT dos registros dentro da transação do chamador (scores, agregados e revisão). Retorna (linhas, revisão)."""
+        rows = [row_values(table, item) for item in items]
+        ids = [row[0] for row in rows]
+        clientes = self._clientes_afetados(conn, table, ids)
+        agregados = contribuicoes(conn, table, ids)
+        count = bulk_upsert(conn, table, rows, commit=False)
+        clientes |= self._clientes_afetados(conn, table, ids)
+        self._atualizar_scores(conn, clientes, SCORE_COMPONENTES[table])
+        aplicar_diferenca(conn, table, agregados, contribuicoes(conn, table, ids))
+        return count, self.db.bump_revision(conn, table)
+
+    def _campos_update(self, table, fields):
+        """Valida as colunas de um UPDATE e completa o par reais/centavos dos valores monetários."""
+        invalid = [c for c in fields if c not in self.columns[table] or c == "id"]
+        if invalid:
+            raise ValueError(f"Colunas inválidas para {table}: {', '.join(invalid)}")
+
+        fields = dict(fields)
+        for reais_col, cent_col in MONEY_COLUMNS[table].items():
+            if reais_col in fields:
+                fields[cent_col] = to_centavos(fields[reais_col])
+            if cent_col in fields:
+                fields[reais_col] = from_centavos(fields[cent_col])
+        return fields
+
+    def update_fields(self, key, record_id, fields):
+        """
+        Atualiza apenas as colunas informadas de um registro (UPDATE ... WHERE id = ?).
+        Valores monetários podem vir em reais (valor) ou em centavos (valor_centavos);
+        as duas colunas são gravadas juntas.
+        """
+        table = self.table_map.get(key)
+        if not table or not fields:
+            return 0
+        fields = self._campos_update(table, fields)
+
+        # Editar só dados cadastrais (telefone, área...) não muda o score
+        componentes = SCORE_COMPONENTES[table]
+        if not SCORE_FIELDS[table] & fields.keys():
+            componentes = ()
+
+        assignments = ", ".join(f"{c} = ?" for c in fields)
+        return self._execute_write(
+            key, f"UPDATE {table} SET {assignments} WHERE id = ?", (*fields.values(), record_id),
+            record_id=record_id, componentes=componentes,
+            agregados=bool(AGGREGATE_FIELDS[table] & fields.keys())
+        )
+
+    def delete_record(self, key, record_id):
+        """Exclui um registro pela chave primária."""
+        table = self.table_map.get(key)
+        if not table:
+            return 0
+        return self._execute_write(key, f"DELETE FROM {table} WHERE id = ?", (record_id,), record_id=record_id)
+
+    def mark_installment_paid(self, parcela_id, data_pagamento=None):
+        """
+        Marca uma parcela como paga. Retorna 0 se a parcela não existir ou já estiver paga.
+        data_pagamento: date ou 'AAAA-MM-DD' (padrão: hoje).
+        """
+        data_pagamento = self._iso_date(data_pagamento or date.today())
+        return self._execute_write(
+            "parcelas",
+            "UPDATE parcelas SET status = 'paga', data_pagamento = ? WHERE id = ? AND status != 'paga'",
+            (data_pagamento, parcela_id),
+            record_id=parcela_id
+        )
+
+    def update_contract_fields(self, contrato_id, **fields):
+        """Atualiza campos de um contrato (ex.: cliente, telefone, status)."""
+        return self.update_fields("contratos", contrato_id, fields)
+
+    def insert_contract(self, contrato, parcelas):
+        """
+        Insere um contrato novo e suas parcelas em uma única transação: ou os dois são gravados,
+        ou nenhum. Retorna True se a gravação deu certo.
+        """
+        revisoes = {}
+        try:
+            with self.db.transaction() as conn:
+                revisoes["contratos"] = self._inserir(conn, "contratos", [contrato])[1]
+                if parcelas:
+                    revisoes["parcelas"] = self._inserir(conn, "parcelas", parcelas)[1]
+        except sqlite3.Error as e:
+            print(f"Erro ao inserir o contrato {contrato.get('id')}: {e}")
+            return False
+        for table, revision in revisoes.items():
+            self._mark_own_revision(table, revision)
+            self.invalidate_cache(table)
+        return True
+
+    def update_contract_schedule(self, contrato_id, parcelas, **fields):
+        """
+        Troca o cronograma de parcelas de um contrato (e atualiza os campos do contrato) em uma transação.
+        parcelas: cronograma desejado (schedule.gerar_cronograma). As parcelas gravadas do contrato são
+        lidas pelo índice de contrato_id e só a diferença é gravada (schedule.diff_cronograma).
+        Retorna (inserir, atualizar, excluir) para o chamador ajustar a lista em memória,
+        ou None se a gravação falhar.
+        """
+        fields = self._campos_update("contratos", fields) if fields else {}
+        try:
+            with self.db.transaction() as conn:
+                cursor = conn.execute(
+                    "SELECT id, numero, valor, valor_centavos, data_vencimento FROM parcelas WHERE contrato_id = ?",
+                    (contrato_id,)
+                )
+                colunas = [d[0] for d in cursor.description]
+                atuais = [dict(zip(colunas, row)) for row in cursor.fetchall()]
+                inserir, atualizar, excluir = diff_cronograma(atuais, parcelas)
+                mudou_parcelas = bool(inserir or atualizar or excluir)
+                if not fields and not mudou_parcelas:
+                    return inserir, atualizar, excluir
+
+                # Tudo o que muda pertence ao contrato: o filtro por contrato cobre clientes e agregados
+                clientes = self._clientes_afetados(conn, "contratos", [contrato_id])
+                agregados = contribuicoes(conn, "contratos", [contrato_id])
+                if fields:
+                    assignments = ", ".join(f"{c} = ?" for c in fields)
+                    conn.execute(f"UPDATE contratos SET {assignments} WHERE id = ?", (*fields.values(), contrato_id))
+                bulk_upsert(conn, "parcelas", [row_values("parcelas", p) for p in inserir], commit=False)
+                for parcela_id, campos in atualizar:
+                    campos = self._campos_update("parcelas", campos)
+                    assignments = ", ".join(f"{c} = ?" for c in campos)
+                    conn.execute(f"UPDATE parcelas SET {assignments} WHERE id = ?", (*campos.values(), parcela_id))
+                bulk_delete(conn, "parcelas", excluir, commit=False)
+                clientes |= self._clientes_afetados(conn, "contratos", [contrato_id])
+                self._atualizar_scores(conn, clientes, SCORE_COMPONENTES["contratos"])
+                aplicar_diferenca(conn, "contratos", agregados, contribuicoes(conn, "contratos", [contrato_id]))
+                revisoes = {}
+                if fields:
+                    revisoes["contratos"] = self.db.bump_revision(conn, "contratos")
+                if mudou_parcelas:
+                    revisoes["parcelas"] = self.db.bump_revision(conn, "parcelas")
+        except sqlite3.Error as e:
+            print(f"Erro ao gravar o cronograma do contrato {contrato_id}: {e}")
+            return None
+        for table, revision in revisoes.items():
+            self._mark_own_revision(table, revision)
+            self.invalidate_cache(table)
+        return inserir, atualizar, excluir
+
+    def delete_expense(self, despesa_id):
+        """Exclui uma despesa."""
+        return self.delete_record("despesas", despesa_id)
+
+    # ----- Agregados mensais (tabelas receita_mensal e despesa_mensal) -----
+    # Mantidos pelas escritas acima; relatórios e dashboards leem algumas dezenas de linhas
+    # em vez do histórico inteiro.
+
+    def rebuild_aggregates(self):
+        """Recalcula os agregados mensais do zero (ex.: após editar o banco por fora do sistema)."""
+        try:
+            with self.db.transaction() as conn:
+                rebuild_aggregates(conn)
+        except sqlite3.Error as e:
+            print(f"Erro ao recalcular agregados: {e}")
+
+    def totais_periodo(self, mes_inicio=None, mes_fim=None):
+        """
+        Receita paga (por mês de pagamento) e despesas dos meses em [mes_inicio, mes_fim), em centavos.
+        mes_inicio / mes_fim: 'AAAA-MM' ou None (sem limite; sem nenhum, entra também o que não tem data).
+        Retorna receita, despesa, saldo, receita_por_area e despesas_por_categoria (mesmas chaves do
+        AnalyticsEngine.resumo).
+        """
+        def filtro(coluna):
+            conditions, params = [], []
+            if mes_inicio is not None:
+                conditions.append(f"{coluna} >= ?")
+                params.append(mes_inicio)
+            if mes_fim is not None:
+                conditions.append(f"{coluna} < ?")
+                params.append(mes_fim)
+            return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+        conn = self.db.get_connection()
+        where, params = filtro("mes_pagamento")
+        receita_por_area = {}
+        for area, total in conn.execute(
+            f"SELECT area_direito, SUM(total_centavos) AS total FROM receita_mensal{where} "
+            "GROUP BY area_direito HAVING total != 0 ORDER BY total DESC", params
+        ):
+            area = area or "Outros"
+            receita_por_area[area] = receita_por_area.get(area, 0) + total
+        where, params = filtro("mes")
+        despesas_por_categoria = {
+            categoria or "Sem categoria": total
+            for categoria, total in conn.execute(
+                f"SELECT categoria, SUM(total_centavos) AS total FROM despesa_mensal{where} "
+                "GROUP BY categoria HAVING total != 0 ORDER BY total DESC", params
+            )
+        }
+        receita = sum(receita_por_area.values())
+        despesa = sum(despesas_por_categoria.values())
+        return {
+            "receita": receita,
+            "despesa": despesa,
+            "saldo": receita - despesa,
+            "receita_por_area": receita_por_area,
+            "despesas_por_categoria": despesas_por_categoria,
+        }
+
+    def totais_mensais(self, ano):
+        """
+        DRE do ano a partir dos agregados: (receita, despesa), vetores int64 de 13 posições
+        (índice = mês, 0 sem uso), em centavos. Receita pelo mês de vencimento das parcelas pagas.
+        """
+        receita = np.zeros(13, dtype=np.int64)
+        despesa = np.zeros(13, dtype=np.int64)
+        conn = self.db.get_connection()
+        intervalo = (f"{int(ano):04d}-01", f"{int(ano) + 1:04d}-01")
+        for mes, total in conn.execute(
+            "SELECT mes_vencimento, SUM(total_centavos) FROM receita_mensal "
+            "WHERE mes_vencimento >= ? AND mes_vencimento < ? GROUP BY mes_vencimento", intervalo
+        ):
+            receita[int(mes[5:7])] = total
+        for mes, total in conn.execute(
+            "SELECT mes, SUM(total_centavos) FROM despesa_mensal WHERE mes >= ? AND mes < ? GROUP BY mes",
+            intervalo
+        ):
+            despesa[int(mes[5:7])] = total
+        return receita, despesa
+
+    def resumo_dashboard(self, periodo="Todo o Período", hoje=None):
+        """
+        KPIs do dashboard (AnalyticsEngine.resumo). Em períodos de meses fechados
+        ("Este Mês", "Ano Corrente", "Todo o Período") receita, despesa, saldo e as quebras por
+        área e categoria vêm dos agregados mensais.
+        """
+        resumo = self.get_analytics().resumo(periodo, hoje)
+        meses = intervalo_meses(periodo, hoje)
+        if meses is not None:
+            try:
+                resumo.update(self.totais_periodo(*meses))
+            except sqlite3.Error as e:
+                print(f"Erro ao ler agregados mensais: {e}")
+        return resumo
+
+    # ----- Score de clientes (tabela scores_clientes) -----
+    # Cada escrita recalcula, na mesma transação, só os componentes afetados dos clientes afetados.
+    # O rollover diário cobre o que muda só com o passar do tempo (parcelas que vencem, tempo de casa).
+
+    def _clientes_afetados(self, conn, table, ids):
+        """Clientes dos registros informados (contratos, ou parcelas via contrato)."""
+        if table == "contratos":
+            sql = "SELECT DISTINCT cliente FROM contratos WHERE id IN ({})"
+        elif table == "parcelas":
+            sql = ("SELECT DISTINCT c.cliente FROM parcelas p JOIN contratos c ON c.id = p.contrato_id "
+                   "WHERE p.id IN ({})")
+        else:
+            return set()
+        clientes = set()
+        ids = list(ids)
+        for i in range(0, len(ids), IDS_POR_CONSULTA):
+            chunk = ids[i:i + IDS_POR_CONSULTA]
+            cursor = conn.execute(sql.format(", ".join("?" for _ in chunk)), chunk)
+            clientes.update(row[0] for row in cursor.fetchall())
+        clientes.discard(None)
+        return clientes
+
+    def _dados_cliente(self, conn, cliente, com_parcelas=True):
+        """Contratos e parcelas de um cliente, pelos índices de cliente e de contrato."""
+        cursor = conn.execute(self._select_sql("contratos") + " WHERE t.cliente = ?", (cliente,))
+        contratos = RECORD_TYPES["contratos"].from_rows(cursor.description, cursor.fetchall())
+        parcelas = []
+        if com_parcelas and contratos:
+            cursor = conn.execute(self._select_sql("parcelas") + " WHERE c.cliente = ?", (cliente,))
+            parcelas = RECORD_TYPES["parcelas"].from_rows(cursor.description, cursor.fetchall())
+        return contratos, parcelas
+
+    @staticmethod
+    def _componentes_da_linha(row):
+        return {
+            "pontualidade": (row["pontualidade"], json.loads(row["detalhes_pontualidade"] or "[]")),
+            "volume": (row["volume"], json.loads(row["detalhes_volume"] or "[]")),
+            "total_pago_centavos": row["total_pago_centavos"],
+            "relacionamento": (row["relacionamento"], json.loads(row["detalhes_relacionamento"] or "[]")),
+        }
+
+    @staticmethod
+    def _gravar_score(conn, cliente, componentes, hoje):
+        score = montar_score(componentes)["score"]
+        conn.execute("""
+            INSERT INTO scores_clientes (
+                cliente, score, pontualidade, detalhes_pontualidade, volume, detalhes_volume,
+                total_pago_centavos, relacionamento, detalhes_relacionamento, atualizado_em
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(cliente) DO UPDATE SET
+                score = excluded.score,
+                pontualidade = excluded.pontualidade,
+                detalhes_pontualidade = excluded.detalhes_pontualidade,
+                volume = excluded.volume,
+                detalhes_volume = excluded.detalhes_volume,
+                total_pago_centavos = excluded.total_pago_centavos,
+                relacionamento = excluded.relacionamento,
+                detalhes_relacionamento = excluded.detalhes_relacionamento,
+                atualizado_em = excluded.atualizado_em
+        """, (
+            cliente, score,
+            componentes["pontualidade"][0], json.dumps(componentes["pontualidade"][1], ensure_ascii=False),
+            componentes["volume"][0], json.dumps(componentes["volume"][1], ensure_ascii=False),
+            componentes["total_pago_centavos"],
+            componentes["relacionamento"][0], json.dumps(componentes["relacionamento"][1], ensure_ascii=False),
+            hoje.isoformat()
+        ))
+
+    def _atualizar_scores(self, conn, clientes, componentes, hoje=None):
+        """
+        Recalcula os componentes informados do score de cada cliente, dentro da transação do chamador.
+        Clientes sem linha ainda recebem o cálculo completo; clientes sem contratos saem da tabela.
+        """
+        if not clientes or not componentes:
+            return
+        hoje = hoje or date.today()
+        com_parcelas = "pontualidade" in componentes or "volume" in componentes
+        for cliente in clientes:
+            contratos, parcelas = self._dados_cliente(conn, cliente, com_parcelas)
+            if not contratos:
+                conn.execute("DELETE FROM scores_clientes WHERE cliente = ?", (cliente,))
+                continue
+            row = conn.execute("SELECT * FROM scores_clientes WHERE cliente = ?", (cliente,)).fetchone()
+            if row is None:
+                if not com_parcelas:
+                    contratos, parcelas = self._dados_cliente(conn, cliente)
+                atuais = calcular_componentes(contratos, parcelas, hoje)
+            else:
+                atuais = self._componentes_da_linha(row)
+                atuais.update(calcular_componentes(contratos, parcelas, hoje, componentes))
+            self._gravar_score(conn, cliente, atuais, hoje)
+
+    def rebuild_scores(self, hoje=None):
+        """Recalcula do zero o score de todos os clientes (carga inicial ou após importação em massa)."""
+        hoje = hoje or date.today()
+        with self.db.transaction() as conn:
+            por_cliente = {}
+            cursor = conn.execute(self._select_sql("contratos"))
+            for c in RECORD_TYPES["contratos"].from_rows(cursor.description, cursor.fetchall()):
+                por_cliente.setdefault(c["cliente"], ([], []))[0].append(c)
+            cursor = conn.execute(self._select_sql("parcelas"))
+            for p in RECORD_TYPES["parcelas"].from_rows(cursor.description, cursor.fetchall()):
+                if p["cliente"] in por_cliente:
+                    por_cliente[p["cliente"]][1].append(p)
+            conn.execute("DELETE FROM scores_clientes")
+            for cliente, (contratos, parcelas) in por_cliente.items():
+                if cliente is not None:
+                    self._gravar_score(conn, cliente, calcular_componentes(contratos, parcelas, hoje), hoje)
+        return len(por_cliente)
+
+    def rollover_scores(self, hoje=None):
+        """
+        Rollover diário: aplica ao score o que muda só com o tempo desde a última conferência.
+        - pontualidade dos clientes com parcelas em aberto que venceram nesse intervalo
+        - relacionamento (tempo de casa) de todos os clientes
+        Retorna a quantidade de clientes com pontualidade recalculada (None se já estava em dia).
+        """
+        hoje = hoje or date.today()
+        with self.db.transaction() as conn:
+            ultimo = conn.execute("SELECT MIN(atualizado_em) FROM scores_clientes").fetchone()[0]
+            if ultimo is None or ultimo >= hoje.isoformat():
+                return None
+            # Status literal para o SQLite usar o índice parcial de parcelas em aberto
+            cursor = conn.execute("""
+                SELECT DISTINCT c.cliente FROM parcelas t JOIN contratos c ON c.id = t.contrato_id
+                WHERE t.status = 'em_aberto' AND t.data_vencimento >= ? AND t.data_vencimento < ?
+            """, (ultimo, hoje.isoformat()))
+            vencidos = {row[0] for row in cursor.fetchall()} - {None}
+            self._atualizar_scores(conn, vencidos, ("pontualidade",), hoje)
+
+            # Tempo de casa: só depende dos contratos (tabela pequena), recalculado para todos
+            cursor = conn.execute(self._select_sql("contratos"))
+            por_cliente = {}
+            for c in RECORD_TYPES["contratos"].from_rows(cursor.description, cursor.fetchall()):
+                por_cliente.setdefault(c["cliente"], []).append(c)
+            for row in conn.execute("SELECT * FROM scores_clientes").fetchall():
+                contratos = por_cliente.get(row["cliente"])
+                if not contratos:
+                    continue
+                atuais = self._componentes_da_linha(row)
+                atuais.update(calcular_componentes(contratos, [], hoje, ("relacionamento",)))
+                self._gravar_score(conn, row["cliente"], atuais, hoje)
+            conn.execute("UPDATE scores_clientes SET atualizado_em = ?", (hoje.isoformat(),))
+        return len(vencidos)
+
+    def get_client_scores(self, hoje=None, atualizar=True):
+        """
+        Scores persistidos de todos os clientes, do maior para o menor: {cliente: dados}
+        (mesmo formato de calcular_score_cliente). Na primeira chamada do dia aplica o rollover;
+        se a tabela ainda estiver vazia, calcula tudo uma vez.
+        atualizar=False só lê a tabela (quem chama agenda atualizar_scores à parte).
+        """
+        hoje = hoje or date.today()
+        try:
+            conn = self._scores_em_dia(hoje) if atualizar else self.db.get_connection()
+            rows = conn.execute("SELECT * FROM scores_clientes ORDER BY score DESC, cliente").fetchall()
+        except sqlite3.Error as e:
+            print(f"Erro ao carregar scores de clientes: {e}")
+            return {}
+        return {row["cliente"]: montar_score(self._componentes_da_linha(row)) for row in rows}
+
+    def atualizar_scores(self, hoje=None):
+        """
+        Deixa a tabela de scores em dia: calcula tudo se ela estiver vazia, senão aplica o rollover.
+        É uma transação de escrita; retorna o resultado de rebuild_scores/rollover_scores
+        (None se não havia nada a fazer).
+        """
+        hoje = hoje or date.today()
+        conn = self.db.get_connection()
+        vazia = conn.execute("SELECT 1 FROM scores_clientes LIMIT 1").fetchone() is None
+        if vazia:
+            if conn.execute("SELECT 1 FROM contratos LIMIT 1").fetchone() is not None:
+                return self.rebuild_scores(hoje)
+            return None
+        return self.rollover_scores(hoje)
+
+    def _scores_em_dia(self, hoje):
+        """Garante a tabela de scores calculada e com o rollover do dia aplicado; retorna a conexão."""
+        self.atualizar_scores(hoje)
+        return self.db.get_connection()
+
+    def get_pontualidade_clientes(self, hoje=None, atualizar=True):
+        """
+        Pontos de pontualidade persistidos de cada cliente: {cliente: pontos} (máx. PONTUALIDADE_MAX).
+        atualizar=False só lê a tabela, como em get_client_scores.
+        """
+        hoje = hoje or date.today()
+        try:
+            conn = self._scores_em_dia(hoje) if atualizar else self.db.get_connection()
+            return dict(conn.execute("SELECT cliente, pontualidade FROM scores_clientes").fetchall())
+        except sqlite3.Error as e:
+            print(f"Erro ao carregar pontualidade dos clientes: {e}")
+            return {}
+
+    def get_forecast(self, meses=HORIZONTE_MESES, hoje=None, atualizar=True):
+        """
+        Previsão de recebimentos (forecast.calcular_previsao) das parcelas em aberto, ponderadas
+        pela pontualidade persistida de cada cliente, descontadas as despesas recorrentes.
+        atualizar=False não aplica o rollover dos scores (só leituras; seguro no pool do desktop).
+        """
+        hoje = hoje or date.today()
+        parcelas = self.query_data("parcelas", status="em_aberto")
+        pontualidade = self.get_pontualidade_clientes(hoje, atualizar=atualizar)
+        return calcular_previsao(parcelas, self.query_data("despesas"), pontualidade, meses, hoje)
+
     def backup_data(self):
         """
         Realiza backup do arquivo SQLite.
@@ -0,0 +1,115 @@
+from src.database.db_manager import IDS_POR_CONSULTA
+from src.utils.dates import parse_date
+
+# Agregados mensais materializados (tabelas receita_mensal e despesa_mensal).
+# Guardam, por combinação de dimensões, o total em centavos e a quantidade de lançamentos.
+# O DataManager os mantém na mesma transação de cada escrita: lê a contribuição das linhas
+# afetadas antes e depois da escrita e aplica só a diferença. rebuild_aggregates refaz tudo.
+#
+# Meses são gravados como 'AAAA-MM' e dimensões ausentes como '' (fazem parte da chave primária).
+
+# Colunas de dimensão de cada agregado, na ordem da chave primária
+RECEITA_DIMENSOES = ("mes_pagamento", "mes_vencimento", "area_direito", "origem", "responsavel")
+DESPESA_DIMENSOES = ("mes", "categoria")
+
+# Colunas de cada tabela que mudam os agregados (um UPDATE só nas outras não mexe neles)
+AGGREGATE_FIELDS = {
+    "contratos": {"area_direito", "origem", "responsavel"},
+    "parcelas": {"contrato_id", "valor", "valor_centavos", "data_vencimento", "data_pagamento", "status"},
+    "despesas": {"categoria", "valor", "valor_centavos", "data"}
+}
+
+# Receita: só parcelas pagas. Status literal para o SQLite poder usar o índice parcial de pagas.
+_RECEITA_SQL = """
+    SELECT p.data_pagamento, p.data_vencimento, c.area_direito, c.origem, c.responsavel, p.valor_centavos
+    FROM parcelas p LEFT JOIN contratos c ON c.id = p.contrato_id
+    WHERE p.status = 'paga'
+"""
+_DESPESA_SQL = "SELECT data, categoria, valor_centavos FROM despesas"
+
+# Filtro das linhas afetadas por uma escrita em cada tabela: (consulta, condição com {})
+_FILTROS = {
+    "parcelas": (_RECEITA_SQL, "p.id IN ({})"),
+    # Área, origem e responsável vêm do contrato: mudar o contrato move todas as suas parcelas pagas
+    "contratos": (_RECEITA_SQL, "p.contrato_id IN ({})"),
+    "despesas": (_DESPESA_SQL, "id IN ({})"),
+}
+
+def mes_de(valor):
+    """Data em qualquer formato aceito -> 'AAAA-MM' ('' se vazia ou inválida)."""
+    data = parse_date(valor)
+    return data.strftime("%Y-%m") if data else ""
+
+def _acumular(totais, chave, centavos):
+    atual = totais.get(chave)
+    if atual is None:
+        totais[chave] = [centavos or 0, 1]
+    else:
+        atual[0] += centavos or 0
+        atual[1] += 1
+
+def _acumular_linhas(destino, table, rows):
+    if table == "despesas":
+        for data, categoria, centavos in rows:
+            _acumular(destino, (mes_de(data), categoria or ""), centavos)
+    else:
+        for pagamento, vencimento, area, origem, responsavel, centavos in rows:
+            chave = (mes_de(pagamento), mes_de(vencimento), area or "", origem or "", responsavel or "")
+            _acumular(destino, chave, centavos)
+
+def contribuicoes(conn, table, ids):
+    """
+    Contribuição atual das linhas afetadas aos agregados: {chave de dimensões: [centavos, qtd]}.
+    Chamada antes e depois de uma escrita; a diferença entre as duas vai para aplicar_diferenca.
+    """
+    ids = list(ids)
+    totais = {}
+    if table not in _FILTROS or not ids:
+        return totais
+    sql, condicao = _FILTROS[table]
+    conector = " AND " if "WHERE" in sql else " WHERE "
+    for i in range(0, len(ids), IDS_POR_CONSULTA):
+        chunk = ids[i:i + IDS_POR_CONSULTA]
+        cursor = conn.execute(sql + conector + condicao.format(", ".join("?" for _ in chunk)), chunk)
+        _acumular_linhas(totais, table, cursor.fetchall())
+    return totais
+
+def _tabela_e_dimensoes(table):
+    if table == "despesas":
+        return "despesa_mensal", DESPESA_DIMENSOES
+    return "receita_mensal", RECEITA_DIMENSOES
+
+def aplicar_diferenca(conn, table, antes, depois):
+    """Soma aos agregados (depois - antes), dentro da transação do chamador. Grupos zerados saem da tabela."""
+    deltas = []
+    for chave in antes.keys() | depois.keys():
+        cent_antes, qtd_antes = antes.get(chave, (0, 0))
+        cent_depois, qtd_depois = depois.get(chave, (0, 0))
+        if cent_antes != cent_depois or qtd_antes != qtd_depois:
+            deltas.append((*chave, cent_depois - cent_antes, qtd_depois - qtd_antes))
+    if not deltas:
+        return 0
+    agregado, dimensoes = _tabela_e_dimensoes(table)
+    colunas = ", ".join(dimensoes)
+    conn.executemany(f"""
+        INSERT INTO {agregado} ({colunas}, total_centavos, qtd)
+        VALUES ({", ".join("?" for _ in dimensoes)}, ?, ?)
+        ON CONFLICT({colunas}) DO UPDATE SET
+            total_centavos = total_centavos + excluded.total_centavos,
+            qtd = qtd + excluded.qtd
+    """, deltas)
+    conn.execute(f"DELETE FROM {agregado} WHERE qtd <= 0")
+    return len(deltas)
+
+def rebuild_aggregates(conn):
+    """Recalcula os dois agregados a partir de parcelas e despesas (dentro da transação do chamador)."""
+    for table, sql in (("parcelas", _RECEITA_SQL), ("despesas", _DESPESA_SQL)):
+        agregado, dimensoes = _tabela_e_dimensoes(table)
+        totais = {}
+        _acumular_linhas(totais, table, conn.execute(sql))
+        conn.execute(f"DELETE FROM {agregado}")
+        conn.executemany(
+            f"INSERT INTO {agregado} ({', '.join(dimensoes)}, total_centavos, qtd) "
+            f"VALUES ({', '.join('?' for _ in dimensoes)}, ?, ?)",
+            [(*chave, centavos, qtd) for chave, (centavos, qtd) in totais.items()]
+        )
@@ -0,0 +1,88 @@
+from itertools import islice
+
+from src.database.db_manager import TABLE_COLUMNS, MONEY_COLUMNS
+from src.utils.money import to_centavos, from_centavos
+
+# Quantidade de linhas enviadas por chamada a executemany
+DEFAULT_CHUNK_SIZE = 5000
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+# Posições (reais, centavos) das colunas monetárias dentro de TABLE_COLUMNS[tabela]
+_MONEY_POSITIONS = {
+    table: [(columns.index(reais), columns.index(centavos)) for reais, centavos in MONEY_COLUMNS[table].items()]
+    for table, columns in TABLE_COLUMNS.items()
+}
+
+def row_values(table, item):
+    """
+    Converte um registro (dict) na tupla de valores das colunas persistidas da tabela.
+    Os centavos são a fonte da verdade: se o registro só trouxer o valor em reais (ou se os reais
+    tiverem sido alterados depois da leitura), os centavos são recalculados a partir deles;
+    a coluna em reais é sempre gravada como centavos / 100.
+    """
+    values = list(map(item.get, TABLE_COLUMNS[table]))
+    for reais_pos, cent_pos in _MONEY_POSITIONS[table]:
+        reais, centavos = values[reais_pos], values[cent_pos]
+        if reais is not None and (centavos is None or centavos / 100 != reais):
+            centavos = to_centavos(reais)
+        values[cent_pos] = centavos
+        values[reais_pos] = from_centavos(centavos)
+    return tuple(values)
+
+def bulk_upsert(conn, table, rows, chunk_size=DEFAULT_CHUNK_SIZE, commit=True):
+    """
+    Grava registros na tabela com UPSERT (INSERT ... ON CONFLICT DO UPDATE) usando executemany em blocos.
+    Diferente do INSERT OR REPLACE, o UPSERT atualiza a linha no lugar, sem apagar e reinserir
+    (mantém o rowid, não mexe nos índices das colunas inalteradas e não dispara ON DELETE CASCADE).
+    rows: iterável de dicts ou de tuplas já na ordem de TABLE_COLUMNS[table] (tuplas vêm de row_values,
+    com os centavos já resolvidos).
+    Tudo roda em uma única transação; em caso de erro nada é gravado e a exceção é propagada.
+    Com commit=False a gravação entra na transação já aberta pelo chamador (ex.: DBManager.transaction).
+    Retorna a quantidade de linhas gravadas.
+    """
+    columns = TABLE_COLUMNS[table]
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT({columns[0]}) DO UPDATE SET "
+        + ", ".join(f"{c} = excluded.{c}" for c in columns[1:])
+    )
+    values = (r if isinstance(r, tuple) else row_values(table, r) for r in rows)
+
+    count = 0
+    cursor = conn.cursor()
+    try:
+        for chunk in _chunks(values, chunk_size):
+            cursor.executemany(sql, chunk)
+            count += len(chunk)
+        if commit:
+            conn.commit()
+    except Exception:
+        # Com commit=False a transação pertence ao chamador, que decide o rollback
+        if commit:
+            conn.rollback()
+        raise
+    return count
+
+def bulk_delete(conn, table, ids, chunk_size=DEFAULT_CHUNK_SIZE, commit=True):
+    """Exclui registros pela chave primária, em blocos e em uma única transação."""
+    count = 0
+    cursor = conn.cursor()
+    try:
+        for chunk in _chunks(((i,) for i in ids), chunk_size):
+            cursor.executemany(f"DELETE FROM {table} WHERE id = ?", chunk)
+            count += cursor.rowcount
+        if commit:
+            conn.commit()
+    except Exception:
+        # Com commit=False a transação pertence ao chamador, que decide o rollback
+        if commit:
+            conn.rollback()
+        raise
+    return count
@@ -1,34 +1,164 @@
 import sqlite3
 import os
+import threading
+from contextlib import contextmanager
+
+from src.utils.money import to_centavos, from_centavos, dividir_centavos
+
+# Colunas persistidas de cada tabela, na ordem usada pelos INSERTs.
+# A primeira coluna é sempre a chave primária.
+TABLE_COLUMNS = {
+    "contratos": (
+        "id", "cliente", "telefone", "area_direito", "tipo_honorario",
+        "valor_total", "num_parcelas", "data_inicio", "status",
+        "origem", "forma_pagamento", "responsavel", "valor_total_centavos"
+    ),
+    "parcelas": (
+        "id", "contrato_id", "numero", "valor",
+        "data_vencimento", "data_pagamento", "status", "valor_centavos"
+    ),
+    "despesas": (
+        "id", "descricao", "categoria", "tipo", "valor", "data", "comprovante", "valor_centavos"
+    )
+}
+
+# Colunas monetárias: {tabela: {coluna em reais: coluna em centavos}}.
+# A coluna em centavos (INTEGER) é a fonte da verdade; a coluna REAL é gravada a partir dela
+# (centavos / 100) e mantida para exibição e para quem ainda lê o valor em reais.
+MONEY_COLUMNS = {
+    "contratos": {"valor_total": "valor_total_centavos"},
+    "parcelas": {"valor": "valor_centavos"},
+    "despesas": {"valor": "valor_centavos"}
+}
+
+# Versão do esquema (PRAGMA user_version); migrate_schema aplica os passos que faltarem
+SCHEMA_VERSION = 2
+
+# Índices secundários para os caminhos de acesso usados pelas telas.
+# Os parciais (WHERE status = ...) só entram no plano se a query repetir o mesmo filtro literal.
+INDEXES = (
+    # Parcelas de um contrato (edição de contrato, cobrança, JOIN com contratos)
+    "CREATE INDEX IF NOT EXISTS idx_parcelas_contrato ON parcelas (contrato_id)",
+    # Atrasadas / vencendo em breve: só parcelas em aberto.
+    # Cobre as colunas lidas (status incluso para o SQLite tratá-lo como covering index)
+    "CREATE INDEX IF NOT EXISTS idx_parcelas_abertas_venc ON parcelas (data_vencimento, contrato_id, valor_centavos, id, status) "
+    "WHERE status = 'em_aberto'",
+    # Receita por mês de pagamento: só parcelas pagas, também cobrindo as colunas lidas
+    "CREATE INDEX IF NOT EXISTS idx_parcelas_pagas_pagamento ON parcelas (data_pagamento, contrato_id, valor_centavos, id, status) "
+    "WHERE status = 'paga'",
+    # Lista paginada do fluxo de caixa (ORDER BY data_vencimento, id com LIMIT/OFFSET)
+    "CREATE INDEX IF NOT EXISTS idx_parcelas_venc ON parcelas (data_vencimento, id)",
+    # Despesas por período
+    "CREATE INDEX IF NOT EXISTS idx_despesas_data ON despesas (data)",
+    # Contratos de um cliente (score, timeline)
+    "CREATE INDEX IF NOT EXISTS idx_contratos_cliente ON contratos (cliente)",
+    # Ranking de clientes
+    "CREATE INDEX IF NOT EXISTS idx_scores_score ON scores_clientes (score DESC, cliente)",
+)
+
+# Queries canônicas do sistema com parâmetros de exemplo, usadas para conferir o plano de execução.
+# Datas sempre comparadas por intervalo (>= / <) para que o índice possa ser usado.
+CANONICAL_QUERIES = {
+    "parcelas_do_contrato": (
+        "SELECT * FROM parcelas WHERE contrato_id = ?",
+        ("CNT_001",)
+    ),
+    "parcelas_atrasadas": (
+        "SELECT id, contrato_id, valor_centavos, data_vencimento FROM parcelas "
+        "WHERE status = 'em_aberto' AND data_vencimento < ?",
+        ("2026-01-08",)
+    ),
+    "parcelas_vencendo": (
+        "SELECT id, contrato_id, valor_centavos, data_vencimento FROM parcelas "
+        "WHERE status = 'em_aberto' AND data_vencimento >= ? AND data_vencimento <= ?",
+        ("2026-01-08", "2026-02-07")
+    ),
+    "receita_do_mes": (
+        "SELECT SUM(valor_centavos) FROM parcelas "
+        "WHERE status = 'paga' AND data_pagamento >= ? AND data_pagamento < ?",
+        ("2026-01-01", "2026-02-01")
+    ),
+    "despesas_do_periodo": (
+        "SELECT * FROM despesas WHERE data >= ? AND data < ?",
+        ("2026-01-01", "2026-02-01")
+    ),
+    "contratos_do_cliente": (
+        "SELECT * FROM contratos WHERE cliente = ?",
+        ("Maria",)
+    ),
+}
+
+# Ajustes aplicados a cada conexão nova
+BUSY_TIMEOUT_MS = 5000      # espera por locks de outros processos (desktop x web) antes de falhar
+CACHE_SIZE_KB = 16384       # cache de páginas por conexão (valor negativo no PRAGMA = KiB)
+# Ids por consulta "WHERE id IN (...)" ao buscar linhas afetadas (abaixo do limite de variáveis do SQLite)
+IDS_POR_CONSULTA = 500
 
 class DBManager:
     def __init__(self, db_name="dados_advocacia.db"):
         """
         Inicializa o gerenciador de banco de dados SQLite.
         O arquivo .db será criado na raiz do projeto.
+        Cada thread recebe sua própria conexão (pool por thread); escritas são serializadas
+        pelo write_lock e pelo BEGIN IMMEDIATE de transaction(). A conexão de uma thread que
+        terminou (ex.: cada rerun do Streamlit roda numa thread nova) é fechada na próxima vez
+        que outra thread pede uma conexão.
         """
         # Caminho absoluto para a raiz do projeto (2 níveis acima de src/database)
         base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         self.db_path = os.path.join(base_dir, db_name)
-        self.conn = None
-        self.create_connection()
+        self._local = threading.local()
+        # Conexões abertas: [(thread dona ou None, conexão)]; None = conexão avulsa (só close() fecha)
+        self._connections = []
+        self._pool_lock = threading.Lock()
+        self.write_lock = threading.RLock()
         self.create_tables()
 
-    def create_connection(self):
-        """Cria conexão com o banco SQLite"""
+    def create_connection(self, dono=None):
+        """
+        Cria uma conexão nova com o banco SQLite, já configurada (WAL, busy_timeout, cache).
+        dono: thread à qual a conexão pertence; ela é fechada depois que essa thread terminar.
+        """
         try:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # check_same_thread=False apenas para permitir que close() feche conexões de outras threads;
+            # no uso normal cada conexão fica restrita à thread que a criou.
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
             # Permite acessar colunas por nome (row['coluna'])
-            self.conn.row_factory = sqlite3.Row
+            conn.row_factory = sqlite3.Row
+            # WAL: leitores não bloqueiam o escritor e vice-versa
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            # Em WAL, NORMAL é seguro contra corrupção e evita um fsync por commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+            conn.execute("PRAGMA temp_store=MEMORY")
         except sqlite3.Error as e:
             print(f"Erro ao conectar ao banco: {e}")
+            return None
+
+        with self._pool_lock:
+            self._connections.append((dono, conn))
+        return conn
+
+    def _fechar_conexoes_orfas(self):
+        """Fecha as conexões de threads que já terminaram."""
+        with self._pool_lock:
+            orfas = [conn for dono, conn in self._connections if dono is not None and not dono.is_alive()]
+            self._connections = [(dono, conn) for dono, conn in self._connections
+                                 if dono is None or dono.is_alive()]
+        for conn in orfas:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
 
     def create_tables(self):
         """Cria as tabelas se não existirem"""
-        if not self.conn:
+        conn = self.get_connection()
+        if not conn:
             return
 
-        cursor = self.conn.cursor()
+        cursor = conn.cursor()
 
         # --- Tabela Contratos ---
         # PK é TEXT para manter compatibilidade com IDs "CNT_001" existentes
@@ -45,7 +175,8 @@ class DBManager:
             status TEXT DEFAULT 'ativo',
             origem TEXT,
             forma_pagamento TEXT,
-            responsavel TEXT
+            responsavel TEXT,
+            valor_total_centavos INTEGER
         );
         """)
 
@@ -63,6 +194,7 @@ class DBManager:
             data_vencimento TEXT,
             data_pagamento TEXT,
             status TEXT DEFAULT 'em_aberto',
+            valor_centavos INTEGER,
             FOREIGN KEY (contrato_id) REFERENCES contratos (id) ON DELETE CASCADE
         );
         """)
@@ -76,7 +208,8 @@ class DBManager:
             tipo TEXT,
             valor REAL,
             data TEXT,
-            comprovante TEXT
+            comprovante TEXT,
+            valor_centavos INTEGER
         );
         """)
         
@@ -87,20 +220,234 @@ class DBManager:
             # Coluna já existe
             pass
 
-        self.conn.commit()
+        # --- Revisões (change feed) ---
+        # Um contador por tabela, incrementado em toda transação que grava nela.
+        # Os frontends (desktop e web) comparam as revisões para saber o que precisa recarregar.
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS revisoes (
+            tabela TEXT PRIMARY KEY,
+            revisao INTEGER NOT NULL DEFAULT 0
+        );
+        """)
+        cursor.executemany(
+            "INSERT OR IGNORE INTO revisoes (tabela, revisao) VALUES (?, 0)",
+            [(t,) for t in TABLE_COLUMNS]
+        )
+
+        # --- Score de clientes (persistido) ---
+        # Componentes do score de cada cliente (ver client_score.calcular_componentes), mantidos
+        # incrementalmente pelo DataManager a cada escrita e por um rollover diário.
+        # atualizado_em: último dia em que a linha foi conferida (rollover ou escrita).
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS scores_clientes (
+            cliente TEXT PRIMARY KEY,
+            score INTEGER NOT NULL,
+            pontualidade INTEGER NOT NULL,
+            detalhes_pontualidade TEXT,
+            volume INTEGER NOT NULL,
+            detalhes_volume TEXT,
+            total_pago_centavos INTEGER NOT NULL,
+            relacionamento INTEGER NOT NULL,
+            detalhes_relacionamento TEXT,
+            atualizado_em TEXT NOT NULL
+        );
+        """)
+
+        # --- Agregados mensais (materializados) ---
+        # Receita paga e despesas por mês e dimensões, mantidas pelo DataManager a cada escrita
+        # (ver src/database/aggregates.py). Dimensões ausentes são gravadas como ''.
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS receita_mensal (
+            mes_pagamento TEXT NOT NULL,
+            mes_vencimento TEXT NOT NULL,
+            area_direito TEXT NOT NULL,
+            origem TEXT NOT NULL,
+            responsavel TEXT NOT NULL,
+            total_centavos INTEGER NOT NULL,
+            qtd INTEGER NOT NULL,
+            PRIMARY KEY (mes_pagamento, mes_vencimento, area_direito, origem, responsavel)
+        );
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS despesa_mensal (
+            mes TEXT NOT NULL,
+            categoria TEXT NOT NULL,
+            total_centavos INTEGER NOT NULL,
+            qtd INTEGER NOT NULL,
+            PRIMARY KEY (mes, categoria)
+        );
+        """)
+
+        self.migrate_schema(conn)
+
+        # --- Índices ---
+        for ddl in INDEXES:
+            cursor.execute(ddl)
+
+        conn.commit()
+
+    def migrate_schema(self, conn):
+        """
+        Aplica as migrações pendentes, controladas por PRAGMA user_version.
+        v1: valores monetários em centavos (INTEGER). Cria as colunas *_centavos, preenche a partir
+            dos valores em reais, normaliza a coluna REAL para centavos / 100 e distribui o resto
+            das parcelas que não somavam o total do contrato (divisões antigas em float).
+        v2: agregados mensais (receita_mensal, despesa_mensal), preenchidos com os dados existentes.
+        """
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
+        if version < 1:
+            for table, money in MONEY_COLUMNS.items():
+                for reais_col, cent_col in money.items():
+                    try:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {cent_col} INTEGER")
+                    except sqlite3.OperationalError:
+                        # Coluna já existe (banco criado com o esquema novo)
+                        pass
+                    # Conversão em Python para usar o mesmo arredondamento (meio centavo para cima) do app
+                    rows = conn.execute(
+                        f"SELECT id, {reais_col} FROM {table} WHERE {cent_col} IS NULL AND {reais_col} IS NOT NULL"
+                    ).fetchall()
+                    centavos = [(to_centavos(row[1]), row[0]) for row in rows]
+                    conn.executemany(
+                        f"UPDATE {table} SET {cent_col} = ?, {reais_col} = ? / 100.0 WHERE id = ?",
+                        [(c, c, id_) for c, id_ in centavos]
+                    )
+            self._fix_installment_remainders(conn)
+            # Os índices cobrindo parcelas passam a incluir valor_centavos; são recriados em seguida
+            conn.execute("DROP INDEX IF EXISTS idx_parcelas_abertas_venc")
+            conn.execute("DROP INDEX IF EXISTS idx_parcelas_pagas_pagamento")
+            conn.execute("UPDATE revisoes SET revisao = revisao + 1")
+
+        if version < 2:
+            # Import local: aggregates importa constantes deste módulo
+            from src.database.aggregates import rebuild_aggregates
+            rebuild_aggregates(conn)
+
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _fix_installment_remainders(self, conn):
+        """
+        Redistribui os centavos de contratos cujas parcelas (todas de mesmo valor) não somam o total
+        por diferença de arredondamento, ex.: 1000 / 3 gravado como 333,33 x 3 = 999,99.
+        O ajuste vai só para as parcelas em aberto; parcelas pagas mantêm o valor recebido.
+        Diferenças maiores que um centavo por parcela são mantidas (foram editadas de propósito).
+        """
+        rows = conn.execute("""
+            SELECT c.id, c.valor_total_centavos, COUNT(p.id), SUM(p.valor_centavos),
+                   MIN(p.valor_centavos), MAX(p.valor_centavos)
+            FROM contratos c JOIN parcelas p ON p.contrato_id = c.id
+            WHERE c.valor_total_centavos IS NOT NULL
+            GROUP BY c.id
+        """).fetchall()
+        updates = []
+        for contrato_id, total, qtd, soma, menor, maior in rows:
+            if soma is None or soma == total or menor != maior or abs(total - soma) >= qtd:
+                continue
+            parcelas = conn.execute(
+                "SELECT id, status, valor_centavos FROM parcelas WHERE contrato_id = ? ORDER BY numero, id",
+                (contrato_id,)
+            ).fetchall()
+            abertas = [row[0] for row in parcelas if row[1] != 'paga']
+            if not abertas:
+                continue
+            restante = total - sum(row[2] for row in parcelas if row[1] == 'paga')
+            for parcela_id, centavos in zip(abertas, dividir_centavos(restante, len(abertas))):
+                updates.append((centavos, from_centavos(centavos), parcela_id))
+        conn.executemany("UPDATE parcelas SET valor_centavos = ?, valor = ? WHERE id = ?", updates)
+
+    def bump_revision(self, conn, table):
+        """Incrementa a revisão da tabela dentro da transação corrente e retorna o novo valor."""
+        conn.execute("UPDATE revisoes SET revisao = revisao + 1 WHERE tabela = ?", (table,))
+        return conn.execute("SELECT revisao FROM revisoes WHERE tabela = ?", (table,)).fetchone()[0]
+
+    def get_revisions(self):
+        """Revisão atual de cada tabela: {tabela: revisao}"""
+        cursor = self.get_connection().execute("SELECT tabela, revisao FROM revisoes")
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def explain_queries(self, queries=None):
+        """
+        Executa EXPLAIN QUERY PLAN para cada query canônica.
+        Retorna {nome: (linhas_do_plano, full_scan)}; full_scan é True se alguma tabela
+        for percorrida inteira (linha "SCAN ..." em vez de "SEARCH ...").
+        """
+        queries = queries or CANONICAL_QUERIES
+        cursor = self.get_connection().cursor()
+        result = {}
+        for name, (sql, params) in queries.items():
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = [row[3] for row in cursor.fetchall()]
+            full_scan = any(line.startswith("SCAN ") for line in plan)
+            result[name] = (plan, full_scan)
+        return result
+
+    def print_query_plans(self):
+        """Imprime o plano de execução de cada query canônica."""
+        for name, (plan, full_scan) in self.explain_queries().items():
+            flag = "⚠️ FULL SCAN" if full_scan else "OK"
+            print(f"[{flag}] {name}")
+            for line in plan:
+                print(f"    {line}")
 
     def get_connection(self):
-        """Retorna a conexão ativa"""
-        return self.conn
+        """Retorna a conexão da thread atual (criada na primeira chamada de cada thread)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self._fechar_conexoes_orfas()
+            conn = self.create_connection(dono=threading.current_thread())
+            self._local.conn = conn
+        return conn
+
+    @property
+    def conn(self):
+        # Compatibilidade com código que acessava db.conn diretamente
+        return self.get_connection()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Transação de escrita: serializa os escritores deste processo (write_lock) e reserva o
+        banco com BEGIN IMMEDIATE, para que outro processo espere pelo busy_timeout em vez de
+        falhar com "database is locked" no meio da transação.
+        Chamadas aninhadas na mesma thread participam da transação externa.
+        """
+        conn = self.get_connection()
+        with self.write_lock:
+            depth = getattr(self._local, "tx_depth", 0)
+            self._local.tx_depth = depth + 1
+            try:
+                if depth:
+                    yield conn
+                    return
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    yield conn
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+            finally:
+                self._local.tx_depth = depth
 
     def close(self):
-        """Fecha a conexão"""
-        if self.conn:
-            self.conn.close()
+        """Fecha todas as conexões do pool"""
+        with self._pool_lock:
+            connections, self._connections = self._connections, []
+        for _, conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
 
 if __name__ == "__main__":
     # Teste rápido: Cria o banco e imprime confirmação
     print("Iniciando setup do SQLite...")
     db = DBManager()
     print(f"Banco de dados criado/conectado em: {db.db_path}")
+    print("\nPlanos de execução das queries principais:")
+    db.print_query_plans()
     db.close()
@@ -6,6 +6,8 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.database.db_manager import DBManager
+from src.database.bulk_writer import bulk_upsert
+from src.database.aggregates import rebuild_aggregates
 
 def load_json(file_path):
     if not os.path.exists(file_path):
@@ -18,104 +20,37 @@ def load_json(file_path):
         print(f"Erro ao ler {file_path}: {e}")
         return []
 
+def migrate_table(db, data_dir, table):
+    """Lê <table>.json e grava todos os registros de uma vez com o bulk writer."""
+    path = os.path.join(data_dir, f"{table}.json")
+    dados = load_json(path)
+
+    try:
+        with db.transaction() as conn:
+            count = bulk_upsert(conn, table, dados, commit=False)
+            # Carga em massa não passa pelo DataManager: o score de clientes é recalculado
+            # do zero na próxima leitura (DataManager.get_client_scores) e os agregados mensais agora
+            conn.execute("DELETE FROM scores_clientes")
+            rebuild_aggregates(conn)
+            db.bump_revision(conn, table)
+        return count
+    except Exception as e:
+        print(f"Erro ao migrar {table}: {e}")
+        return 0
+
 def migrate_contratos(db, data_dir):
     print("Migrando Contratos...")
-    path = os.path.join(data_dir, "contratos.json")
-    dados = load_json(path)
-    
-    count = 0
-    conn = db.get_connection()
-    cursor = conn.cursor()
-    
-    for item in dados:
-        try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO contratos (
-                    id, cliente, telefone, area_direito, tipo_honorario, 
-                    valor_total, num_parcelas, data_inicio, status, 
-                    origem, forma_pagamento, responsavel
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                item.get('id'),
-                item.get('cliente'),
-                item.get('telefone'),
-                item.get('area_direito'),
-                item.get('tipo_honorario'),
-                item.get('valor_total'),
-                item.get('num_parcelas'),
-                item.get('data_inicio'),
-                item.get('status'),
-                item.get('origem'),
-                item.get('forma_pagamento'),
-                item.get('responsavel')
-            ))
-            count += 1
-        except Exception as e:
-            print(f"Erro ao migrar contrato {item.get('id')}: {e}")
-            
-    conn.commit()
+    count = migrate_table(db, data_dir, "contratos")
     print(f"Contratos migrados: {count}")
 
 def migrate_parcelas(db, data_dir):
     print("Migrando Parcelas...")
-    path = os.path.join(data_dir, "parcelas.json")
-    dados = load_json(path)
-    
-    count = 0
-    conn = db.get_connection()
-    cursor = conn.cursor()
-    
-    for item in dados:
-        try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO parcelas (
-                    id, contrato_id, numero, valor, 
-                    data_vencimento, data_pagamento, status
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                item.get('id'),
-                item.get('contrato_id'),
-                item.get('numero'),
-                item.get('valor'),
-                item.get('data_vencimento'),
-                item.get('data_pagamento'),
-                item.get('status')
-            ))
-            count += 1
-        except Exception as e:
-            print(f"Erro ao migrar parcela {item.get('id')}: {e}")
-            
-    conn.commit()
+    count = migrate_table(db, data_dir, "parcelas")
     print(f"Parcelas migradas: {count}")
 
 def migrate_despesas(db, data_dir):
     print("Migrando Despesas...")
-    path = os.path.join(data_dir, "despesas.json")
-    dados = load_json(path)
-    
-    count = 0
-    conn = db.get_connection()
-    cursor = conn.cursor()
-    
-    for item in dados:
-        try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO despesas (
-                    id, descricao, categoria, tipo, valor, data
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                item.get('id'),
-                item.get('descricao'),
-                item.get('categoria'),
-                item.get('tipo'),
-                item.get('valor'),
-                item.get('data')
-            ))
-            count += 1
-        except Exception as e:
-            print(f"Erro ao migrar despesa {item.get('id')}: {e}")
-            
-    conn.commit()
+    count = migrate_table(db, data_dir, "despesas")
     print(f"Despesas migradas: {count}")
 
 def main():
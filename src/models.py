@@ -0,0 +1,190 @@
+from collections.abc import MutableMapping
+from datetime import date
+
+from src.utils.dates import parse_date
+from src.utils.money import to_centavos, from_centavos
+
+def _parse_date(value):
+    """Converte 'AAAA-MM-DD' (ou o legado 'DD-MM-AAAA') em date. Valores inválidos voltam como estão."""
+    return parse_date(value) or value
+
+def _to_float(value):
+    if value is None or isinstance(value, float):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+def _to_int(value):
+    if value is None or isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+class Record(MutableMapping):
+    """
+    Registro tipado com __slots__ (sem __dict__ por instância).
+    - Atributos têm o tipo nativo: datas como date, valores como float (ex.: parcela.data_vencimento).
+    - O acesso por chave mantém a interface de dict usada pelas telas: p['valor'], p.get('cliente'),
+      dict(p), pd.DataFrame(lista). Datas lidas por chave voltam como texto 'AAAA-MM-DD',
+      igual ao que está gravado no banco.
+    - Chaves fora do esquema são aceitas e guardadas à parte (_extra), só quando usadas.
+    - Valores monetários ficam em dois slots sincronizados: centavos (int, usado nas somas) e
+      reais (float, para exibição). Atribuir qualquer um dos dois atualiza o outro.
+    """
+    __slots__ = ("_extra",)
+    fields = ()
+    _field_set = frozenset()
+    _money_pairs = {}
+    date_fields = frozenset()
+    float_fields = frozenset()
+    int_fields = frozenset()
+    money_fields = {}       # {campo em reais: campo em centavos}
+
+    def __init__(self, dados=None, /, **kwargs):
+        # dados é só posicional: Despesa tem um campo chamado "data", que pode vir em kwargs
+        self._extra = None
+        for name in self.fields:
+            object.__setattr__(self, name, None)
+        if dados:
+            self.update(dados)
+        if kwargs:
+            self.update(kwargs)
+
+    @classmethod
+    def _converter(cls, name):
+        if name in cls.date_fields:
+            return _parse_date
+        if name in cls.float_fields:
+            return _to_float
+        if name in cls.int_fields:
+            return _to_int
+        return None
+
+    @classmethod
+    def from_rows(cls, description, rows):
+        """Constrói registros direto das tuplas do cursor, convertendo cada coluna uma única vez."""
+        names = [d[0] for d in description]
+        plan = [(name, cls._converter(name)) for name in names]
+        missing = [name for name in cls.fields if name not in names]
+        setter = object.__setattr__
+        records = []
+        for row in rows:
+            obj = cls.__new__(cls)
+            obj._extra = None
+            for (name, conv), value in zip(plan, row):
+                if name in cls._field_set:
+                    setter(obj, name, conv(value) if conv else value)
+                else:
+                    obj[name] = value
+            for name in missing:
+                setter(obj, name, None)
+            records.append(obj)
+        return records
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            value = getattr(self, key)
+            # Só campos de data guardam date (o conversor garante), então basta checar o tipo
+            return value.isoformat() if type(value) is date else value
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        # Mesmo resultado do Mapping.get, sem o try/except em volta de __getitem__ (caminho quente)
+        if key in self._field_set:
+            value = getattr(self, key)
+            return value.isoformat() if type(value) is date else value
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __setitem__(self, key, value):
+        if key in self._money_pairs:
+            reais_col, cent_col = self._money_pairs[key]
+            centavos = _to_int(value) if key == cent_col else to_centavos(value)
+            object.__setattr__(self, cent_col, centavos)
+            object.__setattr__(self, reais_col, from_centavos(centavos))
+        elif key in self._field_set:
+            conv = self._converter(key)
+            object.__setattr__(self, key, conv(value) if conv else value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._field_set:
+            object.__setattr__(self, key, None)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        yield from self.fields
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return len(self.fields) + (len(self._extra) if self._extra else 0)
+
+    def __contains__(self, key):
+        return key in self._field_set or (self._extra is not None and key in self._extra)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def to_dict(self):
+        return dict(self)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.fields)
+        # campo (reais ou centavos) -> (campo em reais, campo em centavos)
+        cls._money_pairs = {}
+        for reais_col, cent_col in cls.money_fields.items():
+            cls._money_pairs[reais_col] = cls._money_pairs[cent_col] = (reais_col, cent_col)
+
+class Contrato(Record):
+    fields = (
+        "id", "cliente", "telefone", "area_direito", "tipo_honorario",
+        "valor_total", "num_parcelas", "data_inicio", "status",
+        "origem", "forma_pagamento", "responsavel", "valor_total_centavos"
+    )
+    __slots__ = fields
+    date_fields = frozenset({"data_inicio"})
+    float_fields = frozenset({"valor_total"})
+    int_fields = frozenset({"num_parcelas", "valor_total_centavos"})
+    money_fields = {"valor_total": "valor_total_centavos"}
+
+class Parcela(Record):
+    # cliente e tipo_honorario vêm do contrato (JOIN), não da tabela parcelas
+    fields = (
+        "id", "contrato_id", "numero", "valor",
+        "data_vencimento", "data_pagamento", "status", "valor_centavos",
+        "cliente", "tipo_honorario"
+    )
+    __slots__ = fields
+    date_fields = frozenset({"data_vencimento", "data_pagamento"})
+    float_fields = frozenset({"valor"})
+    int_fields = frozenset({"numero", "valor_centavos"})
+    money_fields = {"valor": "valor_centavos"}
+
+class Despesa(Record):
+    fields = ("id", "descricao", "categoria", "tipo", "valor", "data", "comprovante", "valor_centavos")
+    __slots__ = fields
+    date_fields = frozenset({"data"})
+    float_fields = frozenset({"valor"})
+    int_fields = frozenset({"valor_centavos"})
+    money_fields = {"valor": "valor_centavos"}
+
+RECORD_TYPES = {
+    "contratos": Contrato,
+    "parcelas": Parcela,
+    "despesas": Despesa
+}
@@ -0,0 +1,205 @@
+from datetime import date
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+from src.utils.dates import to_datetime64
+from src.utils.money import array_centavos
+
+# Motor analítico colunar dos dashboards (desktop e web).
+# As listas de registros são convertidas uma única vez em arrays NumPy:
+#   - valores em centavos (int64)
+#   - datas em datetime64[D] (NaT quando vazia ou inválida)
+#   - status como máscaras booleanas
+#   - cliente / área / categoria como códigos inteiros (categóricos)
+# Cada KPI e cada série dos gráficos vira uma operação vetorizada sobre esses arrays.
+
+PERIODOS = ("Este Mês", "Últimos 3 Meses", "Ano Corrente", "Todo o Período")
+
+TOP_N = 5
+
+# Aging da carteira em aberto: faixas de dias de atraso e o primeiro dia de cada faixa de atraso
+# (np.searchsorted(LIMITES_AGING, dias, side="right") dá o índice da faixa; 0 = ainda não venceu)
+FAIXAS_AGING = ("A vencer", "1-30 dias", "31-60 dias", "61-90 dias", "90+ dias")
+LIMITES_AGING = np.array([1, 31, 61, 91], dtype=np.int64)
+
+def _codificar(rotulos):
+    """Rótulos -> (códigos int64, lista de rótulos distintos na ordem em que aparecem)."""
+    indices = {}
+    codigos = np.fromiter(
+        (indices.setdefault(r, len(indices)) for r in rotulos), dtype=np.int64, count=len(rotulos)
+    )
+    return codigos, list(indices)
+
+def _somar_por_codigo(codigos, valores, mascara, n):
+    """Soma exata (int64) de valores[mascara] agrupada por código: array de tamanho n."""
+    totais = np.zeros(n, dtype=np.int64)
+    np.add.at(totais, codigos[mascara], valores[mascara])
+    return totais
+
+def _como_dict(totais, rotulos):
+    """Array de totais por código -> {rótulo: centavos}, só com os grupos que têm valor."""
+    return {rotulos[i]: int(totais[i]) for i in np.flatnonzero(totais)}
+
+def _top(totais, rotulos, n=TOP_N):
+    """Os n maiores grupos: [(rótulo, centavos)] em ordem decrescente."""
+    ordem = np.argsort(-totais, kind="stable")[:n]
+    return [(rotulos[i], int(totais[i])) for i in ordem if totais[i] > 0]
+
+def limites_periodo(periodo, hoje=None):
+    """
+    Intervalo [inicio, fim) de um período do dashboard como date.
+    None em uma das pontas significa sem limite ("Todo o Período" não tem nenhuma).
+    """
+    hoje = hoje or date.today()
+    if periodo == "Este Mês":
+        inicio = hoje.replace(day=1)
+        return inicio, inicio + relativedelta(months=1)
+    if periodo == "Últimos 3 Meses":
+        return hoje - relativedelta(months=3), None
+    if periodo == "Ano Corrente":
+        return date(hoje.year, 1, 1), date(hoje.year + 1, 1, 1)
+    return None, None
+
+def intervalo_periodo(periodo, hoje=None):
+    """Mesmo intervalo de limites_periodo como datetime64[D], para comparar com os arrays do motor."""
+    return tuple(None if d is None else np.datetime64(d, "D") for d in limites_periodo(periodo, hoje))
+
+def intervalo_meses(periodo, hoje=None):
+    """
+    Intervalo [inicio, fim) do período em meses 'AAAA-MM' (None = sem limite), para os agregados mensais.
+    Retorna None se o período não começa no primeiro dia de um mês ("Últimos 3 Meses").
+    """
+    hoje = hoje or date.today()
+    if periodo == "Este Mês":
+        inicio = hoje.replace(day=1)
+        return inicio.strftime("%Y-%m"), (inicio + relativedelta(months=1)).strftime("%Y-%m")
+    if periodo == "Ano Corrente":
+        return f"{hoje.year:04d}-01", f"{hoje.year + 1:04d}-01"
+    if periodo == "Últimos 3 Meses":
+        return None
+    return None, None
+
+def _no_intervalo(datas, inicio, fim):
+    """Máscara das datas dentro de [inicio, fim); NaT nunca entra (exceto sem limite algum)."""
+    mascara = ~np.isnat(datas)
+    if inicio is None and fim is None:
+        return np.ones(len(datas), dtype=bool)
+    if inicio is not None:
+        mascara &= datas >= inicio
+    if fim is not None:
+        mascara &= datas < fim
+    return mascara
+
+class AnalyticsEngine:
+    """
+    Arrays colunares de parcelas, despesas e contratos para o cálculo dos dashboards.
+    Construir custa uma passada por registro; depois disso cada período do dashboard é
+    calculado só com operações NumPy (sem strptime e sem laços em Python por linha).
+    """
+
+    def __init__(self, contratos, parcelas, despesas):
+        # --- Contratos ---
+        self.c_valor_total = array_centavos(contratos, "valor_total")
+        area_do_contrato = {c.get("id"): c.get("area_direito") or "Outros" for c in contratos}
+        responsavel_do_contrato = {c.get("id"): c.get("responsavel") or "Sem responsável" for c in contratos}
+
+        # --- Parcelas ---
+        self.p_valor = array_centavos(parcelas)
+        self.p_vencimento = to_datetime64([p.get("data_vencimento") for p in parcelas])
+        self.p_pagamento = to_datetime64([p.get("data_pagamento") for p in parcelas])
+        status = [p.get("status") for p in parcelas]
+        self.p_paga = np.fromiter((s == "paga" for s in status), dtype=bool, count=len(status))
+        self.p_aberta = np.fromiter((s == "em_aberto" for s in status), dtype=bool, count=len(status))
+        self.p_cliente, self.clientes = _codificar([p.get("cliente") or "Desconhecido" for p in parcelas])
+        self.p_area, self.areas = _codificar(
+            [area_do_contrato.get(p.get("contrato_id"), "Outros") for p in parcelas]
+        )
+        self.p_responsavel, self.responsaveis = _codificar(
+            [responsavel_do_contrato.get(p.get("contrato_id"), "Sem responsável") for p in parcelas]
+        )
+
+        # --- Despesas ---
+        self.d_valor = array_centavos(despesas)
+        self.d_data = to_datetime64([d.get("data") for d in despesas])
+        self.d_categoria, self.categorias = _codificar([d.get("categoria") or "Sem categoria" for d in despesas])
+
+    def resumo(self, periodo="Todo o Período", hoje=None):
+        """
+        Todos os KPIs e séries dos dashboards para o período, em centavos:
+        - receita (parcelas pagas por data_pagamento), despesa e saldo do período
+        - despesas_por_categoria, receita_por_area, top_clientes (receita do período)
+        - independentes do período: ticket_medio, a_receber_30, qtd_atraso, total_atrasado,
+          total_a_vencer, top_inadimplentes
+        """
+        hoje = hoje or date.today()
+        dia = np.datetime64(hoje, "D")
+        inicio, fim = intervalo_periodo(periodo, hoje)
+
+        receitas = self.p_paga & _no_intervalo(self.p_pagamento, inicio, fim)
+        despesas = _no_intervalo(self.d_data, inicio, fim)
+
+        venc_valido = ~np.isnat(self.p_vencimento)
+        atrasadas = self.p_aberta & venc_valido & (self.p_vencimento < dia)
+        a_vencer = self.p_aberta & venc_valido & (self.p_vencimento >= dia)
+        proximos_30 = a_vencer & (self.p_vencimento <= dia + np.timedelta64(30, "D"))
+
+        receita = int(self.p_valor[receitas].sum())
+        despesa = int(self.d_valor[despesas].sum())
+        qtd_contratos = len(self.c_valor_total)
+
+        receita_cliente = _somar_por_codigo(self.p_cliente, self.p_valor, receitas, len(self.clientes))
+        atraso_cliente = _somar_por_codigo(self.p_cliente, self.p_valor, atrasadas, len(self.clientes))
+
+        return {
+            "periodo": periodo,
+            "receita": receita,
+            "despesa": despesa,
+            "saldo": receita - despesa,
+            "ticket_medio": round(int(self.c_valor_total.sum()) / qtd_contratos) if qtd_contratos else 0,
+            "a_receber_30": int(self.p_valor[proximos_30].sum()),
+            "qtd_atraso": int(atrasadas.sum()),
+            "total_atrasado": int(self.p_valor[atrasadas].sum()),
+            "total_a_vencer": int(self.p_valor[a_vencer].sum()),
+            "despesas_por_categoria": _como_dict(
+                _somar_por_codigo(self.d_categoria, self.d_valor, despesas, len(self.categorias)), self.categorias
+            ),
+            "receita_por_area": _como_dict(
+                _somar_por_codigo(self.p_area, self.p_valor, receitas, len(self.areas)), self.areas
+            ),
+            "top_clientes": _top(receita_cliente, self.clientes),
+            "top_inadimplentes": _top(atraso_cliente, self.clientes),
+        }
+
+    def aging(self, hoje=None):
+        """
+        Aging das parcelas em aberto por faixa de atraso (FAIXAS_AGING), em centavos.
+        Uma única searchsorted classifica a carteira inteira; os totais por grupo saem de um np.add.at
+        numa matriz (grupo x faixa).
+        Retorna faixas, total e qtd (listas por faixa) e por_cliente / por_area / por_responsavel:
+        [(rótulo, [centavos por faixa])], do maior valor atrasado para o menor, só grupos com saldo.
+        """
+        hoje = hoje or date.today()
+        abertas = self.p_aberta & ~np.isnat(self.p_vencimento)
+        dias = (np.datetime64(hoje, "D") - self.p_vencimento[abertas]).astype(np.int64)
+        faixa = np.searchsorted(LIMITES_AGING, dias, side="right")
+        valores = self.p_valor[abertas]
+        n_faixas = len(FAIXAS_AGING)
+
+        def por_grupo(codigos, rotulos):
+            matriz = np.zeros((len(rotulos), n_faixas), dtype=np.int64)
+            np.add.at(matriz, (codigos[abertas], faixa), valores)
+            atrasado = matriz[:, 1:].sum(axis=1)
+            ordem = np.lexsort((-matriz.sum(axis=1), -atrasado))
+            return [(rotulos[i], [int(v) for v in matriz[i]]) for i in ordem if matriz[i].any()]
+
+        total = np.zeros(n_faixas, dtype=np.int64)
+        np.add.at(total, faixa, valores)
+        return {
+            "faixas": FAIXAS_AGING,
+            "total": [int(v) for v in total],
+            "qtd": [int(v) for v in np.bincount(faixa, minlength=n_faixas)],
+            "por_cliente": por_grupo(self.p_cliente, self.clientes),
+            "por_area": por_grupo(self.p_area, self.areas),
+            "por_responsavel": por_grupo(self.p_responsavel, self.responsaveis),
+        }
@@ -1,134 +1,178 @@
+from collections import defaultdict
 from datetime import datetime
 
-def parse_date(date_str):
-    if not date_str: return None
-    for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
-        try:
-            return datetime.strptime(date_str, fmt).date()
-        except ValueError:
-            continue
-    return None
+from src.utils.dates import parse_date
+from src.utils.money import from_centavos, somar_centavos
 
-def calcular_score_cliente(cliente_nome, contratos, parcelas):
+def calcular_score_cliente(cliente_nome, contratos, parcelas, hoje=None):
     """
     Calcula o score do cliente de 0 a 100 e retorna as estrelas e detalhes.
+    Para a tela de ranking (todos os clientes) use calcular_scores_clientes, que percorre
+    as listas uma única vez.
     """
     # Filtrar dados do cliente
     contratos_cli = [c for c in contratos if c.get('cliente') == cliente_nome]
     parcelas_cli = [p for p in parcelas if p.get('cliente') == cliente_nome]
-    
-    if not contratos_cli:
-        return {"score": 0, "estrelas": "☆☆☆☆☆", "texto": "Novo ou sem dados", "cor": "gray"}
+    return _pontuar_cliente(contratos_cli, parcelas_cli, hoje or datetime.now().date())
 
-    hoje = datetime.now().date()
-    pontos = 0
-    detalhes = []
-    
-    # --- 1. PONTUALIDADE (Máx 50 pontos) ---
-    # Analisar histórico de pagamentos e pendências
-    parcelas_pagas = [p for p in parcelas_cli if p.get('status') == 'paga']
-    parcelas_atrasadas_aberto = [
-        p for p in parcelas_cli 
-        if p.get('status') == 'em_aberto' 
-        and parse_date(p.get('data_vencimento')) 
-        and parse_date(p.get('data_vencimento')) < hoje
-    ]
-    
-    total_devido = len(parcelas_pagas) + len(parcelas_atrasadas_aberto)
-    
-    if total_devido == 0:
-        pontos += 50 # Benefício da dúvida se não tem nada vencido/pago ainda
-        detalhes.append("Sem histórico de cobrança")
-    else:
-        # Penalidade grave por estar devendo AGORA
-        qtd_atraso_atual = len(parcelas_atrasadas_aberto)
-        if qtd_atraso_atual > 0:
-            penalidade = min(40, qtd_atraso_atual * 15)
-            pontos += max(0, 30 - penalidade) # Começa com 30 e perde
-            detalhes.append(f"⚠️ {qtd_atraso_atual} parcelas em atraso hoje")
-        else:
-            # Analisar pagamentos passados
-            pagas_em_dia = 0
-            for p in parcelas_pagas:
-                dt_venc = parse_date(p.get('data_vencimento'))
-                dt_pag = parse_date(p.get('data_pagamento'))
-                if dt_venc and dt_pag and dt_pag <= dt_venc:
-                    pagas_em_dia += 1
-            
-            taxa_pontualidade = pagas_em_dia / len(parcelas_pagas) if parcelas_pagas else 1.0
-            pts_pontualidade = int(50 * taxa_pontualidade)
-            pontos += pts_pontualidade
-            
-            if taxa_pontualidade == 1.0:
-                detalhes.append("💎 Pagamentos 100% em dia")
-            elif taxa_pontualidade > 0.8:
-                detalhes.append("✅ Maioria dos pagamentos em dia")
-            else:
-                detalhes.append("⚠️ Histórico de atrasos")
-
-    # --- 2. VOLUME FINANCEIRO (Máx 30 pontos) ---
-    total_pago = sum(p.get('valor', 0) for p in parcelas_pagas)
-    
-    if total_pago > 15000:
-        pontos += 30
-        detalhes.append("💰 Cliente High Ticket (>15k)")
-    elif total_pago > 5000:
-        pontos += 20
-        detalhes.append("💲 Bom volume financeiro")
-    elif total_pago > 1000:
-        pontos += 10
-    else:
-        pontos += 5
-        
-    # --- 3. RELACIONAMENTO (Máx 20 pontos) ---
-    # Data do contrato mais antigo
-    datas_inicio = [parse_date(c.get('data_inicio')) for c in contratos_cli if parse_date(c.get('data_inicio'))]
-    if datas_inicio:
-        primeira_data = min(datas_inicio)
-        meses_casa = (hoje.year - primeira_data.year) * 12 + (hoje.month - primeira_data.month)
-        
-        if meses_casa >= 24:
-            pontos += 20
-            detalhes.append("🏆 Cliente Antigo (+2 anos)")
-        elif meses_casa >= 12:
-            pontos += 15
-            detalhes.append("📅 Cliente (+1 ano)")
-        elif meses_casa >= 6:
-            pontos += 10
-        else:
-            pontos += 5
-            detalhes.append("🆕 Cliente Recente")
-
-    # --- GERAÇÃO DE ESTRELAS ---
+def calcular_scores_clientes(contratos, parcelas, clientes=None, hoje=None):
+    """
+    Score de todos os clientes de uma vez: {cliente: resultado de calcular_score_cliente}.
+    Agrupa contratos e parcelas por cliente em uma única passada, em vez de refiltrar as
+    listas inteiras para cada cliente (O(clientes + registros) em vez de O(clientes x registros)).
+    clientes: nomes a pontuar (padrão: todos os clientes com contrato).
+    """
+    contratos_por_cliente = defaultdict(list)
+    for c in contratos:
+        contratos_por_cliente[c.get('cliente')].append(c)
+    parcelas_por_cliente = defaultdict(list)
+    for p in parcelas:
+        parcelas_por_cliente[p.get('cliente')].append(p)
+
+    if clientes is None:
+        clientes = contratos_por_cliente.keys()
+    hoje = hoje or datetime.now().date()
+    return {
+        cli: _pontuar_cliente(contratos_por_cliente.get(cli, []), parcelas_por_cliente.get(cli, []), hoje)
+        for cli in clientes
+    }
+
+# Componentes do score, na ordem em que os detalhes são exibidos
+COMPONENTES = ("pontualidade", "volume", "relacionamento")
+# Pontuação máxima do componente de pontualidade
+PONTUALIDADE_MAX = 50
+
+def pontualidade_clientes(parcelas, hoje=None):
+    """Pontos de pontualidade de cada cliente das parcelas: {cliente: pontos}, em uma única passada."""
+    parcelas_por_cliente = defaultdict(list)
+    for p in parcelas:
+        parcelas_por_cliente[p.get('cliente')].append(p)
+    hoje = hoje or datetime.now().date()
+    return {cli: _pontos_pontualidade(ps, hoje)[0] for cli, ps in parcelas_por_cliente.items()}
+
+def calcular_componentes(contratos_cli, parcelas_cli, hoje, componentes=COMPONENTES):
+    """
+    Calcula apenas os componentes pedidos para os dados já filtrados de um cliente:
+    {componente: (pontos, detalhes)}. Com "volume", inclui também "total_pago_centavos".
+    Usado para atualizar o score persistido só na parte afetada por um evento
+    (ex.: pagamento muda pontualidade e volume, mas não o relacionamento).
+    """
+    resultado = {}
+    if "pontualidade" in componentes:
+        resultado["pontualidade"] = _pontos_pontualidade(parcelas_cli, hoje)
+    if "volume" in componentes:
+        # Soma exata em centavos
+        total_pago_centavos = somar_centavos([p for p in parcelas_cli if p.get('status') == 'paga'])
+        resultado["volume"] = _pontos_volume(total_pago_centavos)
+        resultado["total_pago_centavos"] = total_pago_centavos
+    if "relacionamento" in componentes:
+        resultado["relacionamento"] = _pontos_relacionamento(contratos_cli, hoje)
+    return resultado
+
+def montar_score(componentes):
+    """Junta os três componentes no resultado de calcular_score_cliente."""
     # Normalizar max 100
-    pontos = min(100, max(0, pontos))
-    
-    if pontos >= 90:
-        estrelas = "⭐⭐⭐⭐⭐"
-        cor = "#2ecc71" # Verde
-        nivel = "Excelente"
-    elif pontos >= 70:
-        estrelas = "⭐⭐⭐⭐"
-        cor = "#3498db" # Azul
-        nivel = "Muito Bom"
-    elif pontos >= 50:
-        estrelas = "⭐⭐⭐"
-        cor = "#f1c40f" # Amarelo
-        nivel = "Regular"
-    elif pontos >= 30:
-        estrelas = "⭐⭐"
-        cor = "#e67e22" # Laranja
-        nivel = "Atenção"
-    else:
-        estrelas = "⭐"
-        cor = "#e74c3c" # Vermelho
-        nivel = "Crítico"
+    pontos = min(100, max(0, sum(componentes[c][0] for c in COMPONENTES)))
+    estrelas, cor, nivel = _classificar(pontos)
+    total_pago_centavos = componentes["total_pago_centavos"]
 
     return {
         "score": pontos,
         "estrelas": estrelas,
         "nivel": nivel,
         "cor": cor,
-        "detalhes": detalhes,
-        "total_pago": total_pago
+        "detalhes": [d for c in COMPONENTES for d in componentes[c][1]],
+        "total_pago": from_centavos(total_pago_centavos),
+        "total_pago_centavos": total_pago_centavos
     }
+
+def _pontos_pontualidade(parcelas_cli, hoje):
+    """Pontualidade (máx. 50 pontos). Retorna (pontos, detalhes)."""
+    detalhes = []
+    # Analisar histórico de pagamentos e pendências (cada data é convertida uma única vez)
+    parcelas_pagas = []
+    qtd_atraso_atual = 0
+    for p in parcelas_cli:
+        status = p.get('status')
+        if status == 'paga':
+            parcelas_pagas.append(p)
+        elif status == 'em_aberto':
+            dt_venc = parse_date(p.get('data_vencimento'))
+            if dt_venc and dt_venc < hoje:
+                qtd_atraso_atual += 1
+
+    total_devido = len(parcelas_pagas) + qtd_atraso_atual
+
+    if total_devido == 0:
+        detalhes.append("Sem histórico de cobrança")
+        return PONTUALIDADE_MAX, detalhes  # Benefício da dúvida se não tem nada vencido/pago ainda
+
+    # Penalidade grave por estar devendo AGORA
+    if qtd_atraso_atual > 0:
+        penalidade = min(40, qtd_atraso_atual * 15)
+        detalhes.append(f"⚠️ {qtd_atraso_atual} parcelas em atraso hoje")
+        return max(0, 30 - penalidade), detalhes  # Começa com 30 e perde
+
+    # Analisar pagamentos passados
+    pagas_em_dia = 0
+    for p in parcelas_pagas:
+        dt_venc = parse_date(p.get('data_vencimento'))
+        dt_pag = parse_date(p.get('data_pagamento'))
+        if dt_venc and dt_pag and dt_pag <= dt_venc:
+            pagas_em_dia += 1
+
+    taxa_pontualidade = pagas_em_dia / len(parcelas_pagas) if parcelas_pagas else 1.0
+
+    if taxa_pontualidade == 1.0:
+        detalhes.append("💎 Pagamentos 100% em dia")
+    elif taxa_pontualidade > 0.8:
+        detalhes.append("✅ Maioria dos pagamentos em dia")
+    else:
+        detalhes.append("⚠️ Histórico de atrasos")
+    return int(PONTUALIDADE_MAX * taxa_pontualidade), detalhes
+
+def _pontos_volume(total_pago_centavos):
+    """Volume financeiro (máx. 30 pontos). Limites em centavos (R$ 15.000,00 = 1_500_000)."""
+    if total_pago_centavos > 1_500_000:
+        return 30, ["💰 Cliente High Ticket (>15k)"]
+    if total_pago_centavos > 500_000:
+        return 20, ["💲 Bom volume financeiro"]
+    if total_pago_centavos > 100_000:
+        return 10, []
+    return 5, []
+
+def _pontos_relacionamento(contratos_cli, hoje):
+    """Relacionamento (máx. 20 pontos), pela data do contrato mais antigo."""
+    datas_inicio = [d for d in (parse_date(c.get('data_inicio')) for c in contratos_cli) if d]
+    if not datas_inicio:
+        return 0, []
+    primeira_data = min(datas_inicio)
+    meses_casa = (hoje.year - primeira_data.year) * 12 + (hoje.month - primeira_data.month)
+
+    if meses_casa >= 24:
+        return 20, ["🏆 Cliente Antigo (+2 anos)"]
+    if meses_casa >= 12:
+        return 15, ["📅 Cliente (+1 ano)"]
+    if meses_casa >= 6:
+        return 10, []
+    return 5, ["🆕 Cliente Recente"]
+
+def _classificar(pontos):
+    """Pontos (0 a 100) -> (estrelas, cor, nível)."""
+    if pontos >= 90:
+        return "⭐⭐⭐⭐⭐", "#2ecc71", "Excelente"  # Verde
+    if pontos >= 70:
+        return "⭐⭐⭐⭐", "#3498db", "Muito Bom"  # Azul
+    if pontos >= 50:
+        return "⭐⭐⭐", "#f1c40f", "Regular"  # Amarelo
+    if pontos >= 30:
+        return "⭐⭐", "#e67e22", "Atenção"  # Laranja
+    return "⭐", "#e74c3c", "Crítico"  # Vermelho
+
+def _pontuar_cliente(contratos_cli, parcelas_cli, hoje):
+    """Score a partir dos contratos e parcelas já filtrados do cliente."""
+    if not contratos_cli:
+        return {"score": 0, "estrelas": "☆☆☆☆☆", "texto": "Novo ou sem dados", "cor": "gray"}
+
+    # 1. Pontualidade (máx. 50), 2. Volume financeiro (máx. 30), 3. Relacionamento (máx. 20)
+    return montar_score(calcular_componentes(contratos_cli, parcelas_cli, hoje))
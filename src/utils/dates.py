@@ -0,0 +1,73 @@
+from datetime import date, datetime
+from functools import lru_cache
+
+import numpy as np
+
+# Conversão de datas compartilhada por todo o sistema.
+# O banco grava 'AAAA-MM-DD'; telas antigas e dados importados ainda podem trazer 'DD-MM-AAAA'.
+
+# Formatos aceitos, na ordem em que são tentados depois do caminho rápido ISO
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y")
+
+# Quantidade de textos distintos memorizados; cobre alguns anos de datas diárias
+CACHE_SIZE = 8192
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_text(text):
+    """Texto -> date ou None. Memorizado: as mesmas datas se repetem em milhares de parcelas."""
+    # Caminho rápido: 'AAAA-MM-DD'
+    if len(text) == 10 and text[4] == "-" and text[7] == "-":
+        try:
+            return date.fromisoformat(text)
+        except ValueError:
+            pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def parse_date(value):
+    """
+    Converte 'AAAA-MM-DD', 'DD-MM-AAAA', 'DD/MM/AAAA', date ou datetime em date.
+    Vazio ou inválido retorna None.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    return _parse_text(value) if value else None
+
+def parse_date_strict(value):
+    """Igual a parse_date, mas levanta ValueError("Data inválida") em vez de retornar None."""
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError("Data inválida")
+    return parsed
+
+def to_iso(value):
+    """Data em qualquer formato aceito -> 'AAAA-MM-DD' (None se vazia ou inválida)."""
+    parsed = parse_date(value)
+    return parsed.isoformat() if parsed else None
+
+def to_br(value, sep="/"):
+    """Data em qualquer formato aceito -> 'DD/MM/AAAA' (ou com outro separador). Inválida volta como está."""
+    parsed = parse_date(value)
+    return parsed.strftime(f"%d{sep}%m{sep}%Y") if parsed else value
+
+def to_datetime64(values):
+    """
+    Converte uma lista de datas em array datetime64[D] de uma vez (NaT para vazias ou inválidas).
+    Tenta primeiro a conversão vetorizada do NumPy (textos ISO e date); se algum valor estiver
+    em outro formato, refaz item a item pelo parse_date memorizado.
+    """
+    try:
+        return np.array(values, dtype="datetime64[D]")
+    except (TypeError, ValueError):
+        return np.array([parse_date(v) for v in values], dtype="datetime64[D]")
@@ -0,0 +1,136 @@
+from datetime import date
+
+import numpy as np
+
+from src.utils.client_score import PONTUALIDADE_MAX, pontualidade_clientes
+from src.utils.dates import to_datetime64
+from src.utils.money import array_centavos
+
+# Previsão de recebimentos (fluxo de caixa projetado).
+# Cada parcela em aberto que vence no horizonte entra pelo valor nominal e pelo valor esperado,
+# ponderado pela pontualidade histórica do cliente (client_score: pontos / PONTUALIDADE_MAX).
+# As despesas recorrentes (tipos Fixa / Recorrente) entram pela média mensal dos últimos meses
+# fechados, distribuída por dia. Tudo em centavos e calculado com arrays NumPy sobre a carteira toda.
+
+# Meses projetados (o mês corrente conta como o primeiro)
+HORIZONTE_MESES = 6
+# Tipos de despesa que se repetem todo mês
+TIPOS_RECORRENTES = ("Fixa", "Recorrente")
+# Meses fechados usados para estimar a despesa recorrente mensal
+MESES_BASE_DESPESAS = 3
+
+def _dias(datas):
+    """datetime64[D] -> dias desde 1970-01-01 (int64)."""
+    return datas.astype("datetime64[D]").astype(np.int64)
+
+def _pesos(clientes, pontualidade):
+    """Peso (0 a 1) de cada parcela pelo cliente; cliente sem pontuação recebe o benefício da dúvida."""
+    pesos_cliente = {}
+    for cliente in clientes:
+        if cliente not in pesos_cliente:
+            pontos = pontualidade.get(cliente)
+            pesos_cliente[cliente] = 1.0 if pontos is None else min(1.0, max(0.0, pontos / PONTUALIDADE_MAX))
+    return np.fromiter((pesos_cliente[c] for c in clientes), dtype=np.float64, count=len(clientes))
+
+def despesa_recorrente_mensal(despesas, hoje=None, meses_base=MESES_BASE_DESPESAS):
+    """Média mensal (centavos) das despesas recorrentes nos `meses_base` meses fechados antes do mês atual."""
+    hoje = hoje or date.today()
+    recorrentes = [d for d in despesas if d.get("tipo") in TIPOS_RECORRENTES]
+    if not recorrentes or meses_base <= 0:
+        return 0
+    mes_atual = np.datetime64(hoje, "M")
+    meses = to_datetime64([d.get("data") for d in recorrentes]).astype("datetime64[M]")
+    na_base = ~np.isnat(meses) & (meses >= mes_atual - meses_base) & (meses < mes_atual)
+    return round(int(array_centavos(recorrentes)[na_base].sum()) / meses_base)
+
+def calcular_previsao(parcelas, despesas, pontualidade=None, meses=HORIZONTE_MESES, hoje=None):
+    """
+    Projeção de entradas e saídas de hoje até o fim do mês hoje + meses - 1.
+    pontualidade: {cliente: pontos de pontualidade} (ex.: DataManager.get_pontualidade_clientes);
+    sem ele, os pontos são calculados a partir das próprias parcelas.
+    Retorna (valores em centavos):
+    - semanas / meses: listas de dicts com inicio (date), nominal, previsto, despesas e saldo
+      (previsto - despesas); a primeira semana começa na segunda-feira da semana atual
+    - total_nominal, total_previsto, total_despesas, saldo_previsto
+    - despesa_recorrente_mensal, atrasado_nominal, atrasado_previsto (parcelas já vencidas,
+      fora das semanas)
+    """
+    if meses <= 0:
+        raise ValueError("O horizonte da previsão deve ter ao menos um mês.")
+    hoje = hoje or date.today()
+    if pontualidade is None:
+        pontualidade = pontualidade_clientes(parcelas, hoje)
+
+    dia0 = np.datetime64(hoje, "D")
+    mes0 = np.datetime64(hoje, "M")
+    fim = (mes0 + meses).astype("datetime64[D]")
+    semana0 = dia0 - (_dias(dia0) + 3) % 7          # 1970-01-01 foi uma quinta-feira
+    n_semanas = int(-(-(fim - semana0).astype(np.int64) // 7))
+
+    # --- Entradas: parcelas em aberto ---
+    abertas = [p for p in parcelas if p.get("status") == "em_aberto"]
+    valor = array_centavos(abertas)
+    venc = to_datetime64([p.get("data_vencimento") for p in abertas])
+    peso = _pesos([p.get("cliente") for p in abertas], pontualidade)
+    esperado = valor * peso
+
+    valida = ~np.isnat(venc)
+    no_horizonte = valida & (venc >= dia0) & (venc < fim)
+    atrasadas = valida & (venc < dia0)
+
+    idx_semana = ((venc[no_horizonte] - semana0).astype(np.int64)) // 7
+    idx_mes = (venc[no_horizonte].astype("datetime64[M]") - mes0).astype(np.int64)
+
+    nominal_sem = np.zeros(n_semanas, dtype=np.int64)
+    previsto_sem = np.zeros(n_semanas, dtype=np.float64)
+    np.add.at(nominal_sem, idx_semana, valor[no_horizonte])
+    np.add.at(previsto_sem, idx_semana, esperado[no_horizonte])
+    nominal_mes = np.zeros(meses, dtype=np.int64)
+    previsto_mes = np.zeros(meses, dtype=np.float64)
+    np.add.at(nominal_mes, idx_mes, valor[no_horizonte])
+    np.add.at(previsto_mes, idx_mes, esperado[no_horizonte])
+
+    # --- Saídas: despesa recorrente mensal rateada pelos dias de cada mês ---
+    mensal = despesa_recorrente_mensal(despesas, hoje)
+    dias = np.arange(dia0, fim, dtype="datetime64[D]")
+    mes_do_dia = dias.astype("datetime64[M]")
+    dias_no_mes = ((mes_do_dia + 1).astype("datetime64[D]") - mes_do_dia.astype("datetime64[D]")).astype(np.int64)
+    por_dia = mensal / dias_no_mes
+    despesas_sem = np.zeros(n_semanas, dtype=np.float64)
+    despesas_mes = np.zeros(meses, dtype=np.float64)
+    np.add.at(despesas_sem, (dias - semana0).astype(np.int64) // 7, por_dia)
+    np.add.at(despesas_mes, (mes_do_dia - mes0).astype(np.int64), por_dia)
+
+    def linhas(inicios, nominal, previsto, saidas):
+        previsto = np.rint(previsto).astype(np.int64)
+        saidas = np.rint(saidas).astype(np.int64)
+        return [
+            {
+                "inicio": inicio,
+                "nominal": int(n),
+                "previsto": int(p),
+                "despesas": int(s),
+                "saldo": int(p - s),
+            }
+            for inicio, n, p, s in zip(inicios, nominal, previsto, saidas)
+        ]
+
+    inicios_sem = [(semana0 + 7 * i).astype(date) for i in range(n_semanas)]
+    inicios_mes = [(mes0 + i).astype("datetime64[D]").astype(date) for i in range(meses)]
+    por_mes = linhas(inicios_mes, nominal_mes, previsto_mes, despesas_mes)
+
+    total_previsto = sum(m["previsto"] for m in por_mes)
+    total_despesas = sum(m["despesas"] for m in por_mes)
+    return {
+        "hoje": hoje,
+        "fim": fim.astype(date),
+        "semanas": linhas(inicios_sem, nominal_sem, previsto_sem, despesas_sem),
+        "meses": por_mes,
+        "total_nominal": int(nominal_mes.sum()),
+        "total_previsto": total_previsto,
+        "total_despesas": total_despesas,
+        "saldo_previsto": total_previsto - total_despesas,
+        "despesa_recorrente_mensal": mensal,
+        "atrasado_nominal": int(valor[atrasadas].sum()),
+        "atrasado_previsto": int(np.rint(esperado[atrasadas].sum())),
+    }
@@ -0,0 +1,98 @@
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+
+import numpy as np
+
+# Valores monetários são guardados e somados em centavos (int).
+# A coluna REAL em reais (valor, valor_total) continua existindo só como espelho para exibição.
+
+_CENTAVO = Decimal("0.01")
+
+def to_centavos(valor):
+    """
+    Converte reais (float, int, Decimal ou texto '1234,56' / '1234.56') em centavos (int),
+    arredondando meio centavo para cima. None continua None.
+    """
+    if valor is None or valor == "":
+        return None
+    if isinstance(valor, bool):
+        raise ValueError(f"Valor monetário inválido: {valor!r}")
+    if isinstance(valor, int):
+        return valor * 100
+    if isinstance(valor, float):
+        # Caminho rápido: o float já é exatamente o double de um valor com 2 casas
+        centavos = round(valor * 100)
+        if centavos / 100 == valor:
+            return centavos
+        valor = repr(valor)
+    elif isinstance(valor, str):
+        valor = valor.strip().replace("R$", "").strip()
+        if "," in valor:
+            valor = valor.replace(".", "").replace(",", ".")
+    try:
+        return int((Decimal(valor) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError, TypeError):
+        raise ValueError(f"Valor monetário inválido: {valor!r}")
+
+def from_centavos(centavos):
+    """Centavos (int) -> reais (float), para exibição e para a coluna espelho."""
+    if centavos is None:
+        return None
+    return centavos / 100
+
+def centavos_de(registro, campo="valor"):
+    """
+    Lê o valor em centavos de um registro (Record ou dict).
+    Usa a coluna <campo>_centavos quando ela confere com o valor em reais; se o dict só tiver
+    reais (ex.: montado por uma tela) ou se os reais tiverem sido alterados depois, converte os reais.
+    """
+    centavos = registro.get(f"{campo}_centavos")
+    reais = registro.get(campo)
+    if centavos is not None and (reais is None or centavos / 100 == reais):
+        return centavos
+    return to_centavos(reais) or 0
+
+def dividir_centavos(total, partes):
+    """
+    Divide um total em centavos em `partes` inteiras que somam exatamente o total.
+    O resto da divisão vai, um centavo por vez, para as primeiras parcelas:
+    dividir_centavos(100000, 3) -> [33334, 33333, 33333].
+    """
+    if partes <= 0:
+        raise ValueError("A quantidade de parcelas deve ser maior que zero.")
+    base, resto = divmod(total, partes)
+    return [base + 1] * resto + [base] * (partes - resto)
+
+def array_centavos(registros, campo="valor"):
+    """Vetor int64 com os centavos de cada registro, na ordem da lista."""
+    try:
+        # Caminho rápido: registros tipados (src.models) mantêm reais e centavos sincronizados,
+        # então o atributo de centavos pode ser lido direto
+        atributo = f"{campo}_centavos"
+        return np.fromiter((getattr(r, atributo) for r in registros), dtype=np.int64, count=len(registros))
+    except (AttributeError, TypeError):
+        # dicts comuns, ou centavos ainda não preenchidos (None)
+        return np.fromiter((centavos_de(r, campo) for r in registros), dtype=np.int64, count=len(registros))
+
+def somar_centavos(registros, campo="valor"):
+    """Soma exata (int64) dos valores de uma lista de registros, em centavos."""
+    if not registros:
+        return 0
+    return int(array_centavos(registros, campo).sum())
+
+def somar_por_chave(registros, chave, campo="valor"):
+    """
+    Soma exata em centavos agrupada por chave: {chave: centavos}.
+    chave: nome do campo (ex.: 'cliente') ou função registro -> chave.
+    """
+    if not registros:
+        return {}
+    get_chave = chave if callable(chave) else (lambda r: r.get(chave))
+    # Índice de grupo por dict (as chaves podem misturar None e texto, que não são ordenáveis)
+    grupos = {}
+    indices = np.fromiter(
+        (grupos.setdefault(get_chave(r), len(grupos)) for r in registros),
+        dtype=np.int64, count=len(registros)
+    )
+    totais = np.zeros(len(grupos), dtype=np.int64)
+    np.add.at(totais, indices, array_centavos(registros, campo))
+    return {g: int(totais[i]) for g, i in grupos.items()}
@@ -4,7 +4,15 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet
 import os
 from datetime import datetime
-from collections import defaultdict
+
+import numpy as np
+
+from src.utils.dates import parse_date, to_br, to_datetime64
+from src.utils.money import from_centavos, centavos_de, array_centavos
+
+def _destino(filename):
+    """Caminho absoluto do PDF gerado; se filename for um buffer (ex.: BytesIO), o próprio buffer."""
+    return filename if hasattr(filename, "write") else os.path.abspath(filename)
 
 def _create_table_style():
     return TableStyle([
@@ -38,13 +46,14 @@ def gerar_relatorio_fluxo(parcelas, filename="relatorio_fluxo.pdf"):
         total_pend = 0
         
         for p in parcelas:
-            val = float(p.get('valor', 0))
+            centavos = centavos_de(p)
+            val = from_centavos(centavos)
             status = "PAGO" if p.get('status') == 'paga' else "PENDENTE"
-            if p.get('status') == 'paga': total_rec += val
-            else: total_pend += val
+            if p.get('status') == 'paga': total_rec += centavos
+            else: total_pend += centavos
             
             data.append([
-                datetime.strptime(p['data_vencimento'], '%Y-%m-%d').strftime('%d/%m/%Y'),
+                to_br(p['data_vencimento']),
                 p['cliente'],
                 f"R$ {val:,.2f}",
                 status
@@ -55,11 +64,11 @@ def gerar_relatorio_fluxo(parcelas, filename="relatorio_fluxo.pdf"):
         elements.append(t)
         
         elements.append(Spacer(1, 20))
-        elements.append(Paragraph(f"<b>Total Recebido:</b> R$ {total_rec:,.2f}", styles['Normal']))
-        elements.append(Paragraph(f"<b>Total Pendente:</b> R$ {total_pend:,.2f}", styles['Normal']))
+        elements.append(Paragraph(f"<b>Total Recebido:</b> R$ {from_centavos(total_rec):,.2f}", styles['Normal']))
+        elements.append(Paragraph(f"<b>Total Pendente:</b> R$ {from_centavos(total_pend):,.2f}", styles['Normal']))
         
         doc.build(elements)
-        return True, os.path.abspath(filename)
+        return True, _destino(filename)
     except Exception as e:
         return False, str(e)
 
@@ -83,11 +92,12 @@ def gerar_relatorio_inadimplencia(parcelas, filename="relatorio_inadimplencia.pd
                 venc_str = p.get('data_vencimento')
                 if not venc_str: continue
                 
-                venc = datetime.strptime(venc_str, '%Y-%m-%d').date()
-                if venc < hoje and p.get('status') != 'paga':
+                venc = parse_date(venc_str)
+                if venc and venc < hoje and p.get('status') != 'paga':
                     atraso = (hoje - venc).days
-                    val = float(p.get('valor', 0))
-                    total_devido += val
+                    centavos = centavos_de(p)
+                    val = from_centavos(centavos)
+                    total_devido += centavos
                     
                     data.append([
                         venc.strftime('%d/%m/%Y'),
@@ -106,10 +116,10 @@ def gerar_relatorio_inadimplencia(parcelas, filename="relatorio_inadimplencia.pd
             t.setStyle(_create_table_style())
             elements.append(t)
             elements.append(Spacer(1, 20))
-            elements.append(Paragraph(f"<b>Total Inadimplente:</b> R$ {total_devido:,.2f}", styles['Normal']))
+            elements.append(Paragraph(f"<b>Total Inadimplente:</b> R$ {from_centavos(total_devido):,.2f}", styles['Normal']))
             
         doc.build(elements)
-        return True, os.path.abspath(filename)
+        return True, _destino(filename)
     except Exception as e:
         return False, str(e)
 
@@ -128,21 +138,17 @@ def gerar_extrato_ir(parcelas, ano, filename="extrato_ir.pdf"):
         parcelas_ano = []
         for p in parcelas:
             if p.get('status') == 'paga':
-                dt_str = p.get('data_vencimento', '')
-                try:
-                    dt = datetime.strptime(dt_str, '%Y-%m-%d')
-                    if dt.year == int(ano):
-                        parcelas_ano.append(p)
-                except:
-                    continue
+                dt = parse_date(p.get('data_vencimento'))
+                if dt and dt.year == int(ano):
+                    parcelas_ano.append((dt, p))
         
         # Ordenar por data
-        parcelas_ano.sort(key=lambda x: x.get('data_vencimento'))
+        parcelas_ano.sort(key=lambda x: x[0])
         
-        for p in parcelas_ano:
-            val = float(p.get('valor', 0))
-            total_ano += val
-            dt = datetime.strptime(p['data_vencimento'], '%Y-%m-%d')
+        for dt, p in parcelas_ano:
+            centavos = centavos_de(p)
+            val = from_centavos(centavos)
+            total_ano += centavos
             
             data.append([
                 dt.strftime('%d/%m/%Y'),
@@ -159,14 +165,30 @@ def gerar_extrato_ir(parcelas, ano, filename="extrato_ir.pdf"):
             elements.append(t)
             
             elements.append(Spacer(1, 20))
-            elements.append(Paragraph(f"<b>Total Recebido em {ano}:</b> R$ {total_ano:,.2f}", styles['Normal']))
+            elements.append(Paragraph(f"<b>Total Recebido em {ano}:</b> R$ {from_centavos(total_ano):,.2f}", styles['Normal']))
         
         doc.build(elements)
-        return True, os.path.abspath(filename)
+        return True, _destino(filename)
     except Exception as e:
         return False, str(e)
 
-def gerar_dre(receitas, despesas, ano, filename="dre_gerencial.pdf"):
+def _somar_por_mes(registros, campo_data, ano):
+    """Soma em centavos por mês do ano informado: vetor int64 de 13 posições (índice 0 sem uso)."""
+    totais = np.zeros(13, dtype=np.int64)
+    if not registros:
+        return totais
+    datas = to_datetime64([r.get(campo_data) for r in registros])
+    no_ano = ~np.isnat(datas) & (datas.astype('datetime64[Y]').astype(np.int64) + 1970 == int(ano))
+    # Mês 1..12 a partir da contagem de meses desde 1970-01
+    meses = datas[no_ano].astype('datetime64[M]').astype(np.int64) % 12 + 1
+    np.add.at(totais, meses, array_centavos(registros)[no_ano])
+    return totais
+
+def gerar_dre(receitas, despesas, ano, filename="dre_gerencial.pdf", totais=None):
+    """
+    DRE mensal do ano. totais: (receita, despesa) por mês já agregados (DataManager.totais_mensais);
+    sem eles, os totais são somados a partir das listas de parcelas e despesas.
+    """
     try:
         doc = SimpleDocTemplate(filename, pagesize=letter)
         elements = []
@@ -177,39 +199,26 @@ def gerar_dre(receitas, despesas, ano, filename="dre_gerencial.pdf"):
         
         data = [['Mês', 'Receita Bruta', 'Despesas', 'Resultado Líquido']]
         
-        resumo = defaultdict(lambda: {'rec': 0.0, 'desp': 0.0})
+        # Totais mensais em centavos (int64, índice = mês); soma exata, sem erro de float
+        if totais is not None:
+            rec_mes, desp_mes = totais
+        else:
+            rec_mes = _somar_por_mes(
+                [r for r in receitas if r.get('status') == 'paga'], 'data_vencimento', ano
+            )
+            desp_mes = _somar_por_mes(despesas, 'data', ano)
+        res_mes = rec_mes - desp_mes
         
-        # Processar Receitas
-        for r in receitas:
-             if r.get('status') == 'paga':
-                try:
-                    dt = datetime.strptime(r.get('data_vencimento'), '%Y-%m-%d')
-                    if dt.year == int(ano):
-                        resumo[dt.month]['rec'] += float(r.get('valor', 0))
-                except: continue
-
-        # Processar Despesas
-        for d in despesas:
-            try:
-                dt = datetime.strptime(d.get('data'), '%Y-%m-%d')
-                if dt.year == int(ano):
-                    resumo[dt.month]['desp'] += float(d.get('valor', 0))
-            except: continue
-            
-        tot_rec = 0
-        tot_desp = 0
-        tot_res = 0
+        tot_rec = from_centavos(int(rec_mes.sum()))
+        tot_desp = from_centavos(int(desp_mes.sum()))
+        tot_res = from_centavos(int(res_mes.sum()))
         
         nomes_meses = ["", "Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
         
         for m in range(1, 13):
-            rec = resumo[m]['rec']
-            desp = resumo[m]['desp']
-            res = rec - desp
-            
-            tot_rec += rec
-            tot_desp += desp
-            tot_res += res
+            rec = from_centavos(int(rec_mes[m]))
+            desp = from_centavos(int(desp_mes[m]))
+            res = from_centavos(int(res_mes[m]))
             
             data.append([
                 nomes_meses[m],
@@ -231,6 +240,133 @@ def gerar_dre(receitas, despesas, ano, filename="dre_gerencial.pdf"):
         elements.append(t)
         
         doc.build(elements)
-        return True, os.path.abspath(filename)
+        return True, _destino(filename)
+    except Exception as e:
+        return False, str(e)
+
+def _secao_previsao(previsao, styles):
+    """Elementos da seção de previsão de recebimentos (resultado de forecast.calcular_previsao)."""
+    nomes_meses = ["", "Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho", "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
+    elements = []
+    elements.append(Paragraph("Previsão de Recebimentos", styles['Heading2']))
+    elements.append(Paragraph(
+        f"Período: {previsao['hoje'].strftime('%d/%m/%Y')} a {previsao['fim'].strftime('%d/%m/%Y')} (exclusive). "
+        "Valor previsto = parcelas em aberto ponderadas pela pontualidade histórica de cada cliente.",
+        styles['Normal']
+    ))
+    elements.append(Spacer(1, 10))
+
+    def tabela(cabecalho, rotulos, linhas, total=None):
+        data = [cabecalho]
+        for rotulo, l in zip(rotulos, linhas):
+            data.append([rotulo] + [f"R$ {from_centavos(l[c]):,.2f}" for c in ('nominal', 'previsto', 'despesas', 'saldo')])
+        if total:
+            data.append(total)
+        t = Table(data)
+        style = _create_table_style()
+        if total:
+            style.add('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold')
+            style.add('BACKGROUND', (0,-1), (-1,-1), colors.lightgrey)
+        t.setStyle(style)
+        return t
+
+    meses = previsao['meses']
+    elements.append(tabela(
+        ['Mês', 'Em Aberto', 'Previsto', 'Despesas Recorrentes', 'Saldo Previsto'],
+        [f"{nomes_meses[m['inicio'].month]}/{m['inicio'].year}" for m in meses],
+        meses,
+        ['TOTAL', f"R$ {from_centavos(previsao['total_nominal']):,.2f}",
+         f"R$ {from_centavos(previsao['total_previsto']):,.2f}",
+         f"R$ {from_centavos(previsao['total_despesas']):,.2f}",
+         f"R$ {from_centavos(previsao['saldo_previsto']):,.2f}"]
+    ))
+    elements.append(Spacer(1, 10))
+    elements.append(Paragraph(
+        f"<b>Em atraso:</b> R$ {from_centavos(previsao['atrasado_nominal']):,.2f} "
+        f"(recuperação esperada: R$ {from_centavos(previsao['atrasado_previsto']):,.2f}) — fora da projeção semanal.",
+        styles['Normal']
+    ))
+    elements.append(Paragraph(
+        f"<b>Despesa recorrente mensal estimada:</b> R$ {from_centavos(previsao['despesa_recorrente_mensal']):,.2f}",
+        styles['Normal']
+    ))
+    elements.append(Spacer(1, 20))
+
+    semanas = previsao['semanas']
+    elements.append(Paragraph("Projeção Semanal", styles['Heading3']))
+    elements.append(tabela(
+        ['Semana de', 'Em Aberto', 'Previsto', 'Despesas Recorrentes', 'Saldo Previsto'],
+        [s['inicio'].strftime('%d/%m/%Y') for s in semanas],
+        semanas
+    ))
+    return elements
+
+def gerar_previsao_caixa(previsao, filename="previsao_caixa.pdf"):
+    try:
+        doc = SimpleDocTemplate(filename, pagesize=letter)
+        elements = []
+        styles = getSampleStyleSheet()
+        
+        elements.append(Paragraph(f"Previsão de Caixa - {datetime.now().strftime('%d/%m/%Y')}", styles['Title']))
+        elements.append(Spacer(1, 20))
+        elements.extend(_secao_previsao(previsao, styles))
+        
+        doc.build(elements)
+        return True, _destino(filename)
+    except Exception as e:
+        return False, str(e)
+
+def gerar_relatorio_aging(aging, filename="relatorio_aging.pdf", max_linhas=50):
+    """Aging da carteira em aberto (AnalyticsEngine.aging): totais por faixa e quebras por cliente, área e responsável."""
+    try:
+        doc = SimpleDocTemplate(filename, pagesize=letter)
+        elements = []
+        styles = getSampleStyleSheet()
+        
+        elements.append(Paragraph("Aging da Carteira (Contas a Receber)", styles['Title']))
+        elements.append(Paragraph(f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
+        elements.append(Spacer(1, 20))
+        
+        faixas = list(aging['faixas'])
+        
+        def tabela(titulo_coluna, linhas, total=True):
+            data = [[titulo_coluna] + faixas + ['Total']]
+            for rotulo, valores in linhas:
+                data.append([rotulo] + [f"R$ {from_centavos(v):,.2f}" for v in valores] + [f"R$ {from_centavos(sum(valores)):,.2f}"])
+            if total:
+                data.append(['TOTAL'] + [f"R$ {from_centavos(v):,.2f}" for v in aging['total']] + [f"R$ {from_centavos(sum(aging['total'])):,.2f}"])
+            t = Table(data)
+            style = _create_table_style()
+            style.add('FONTSIZE', (0,1), (-1,-1), 8)
+            if total:
+                style.add('FONTNAME', (0,-1), (-1,-1), 'Helvetica-Bold')
+                style.add('BACKGROUND', (0,-1), (-1,-1), colors.lightgrey)
+            t.setStyle(style)
+            return t
+        
+        # Resumo por faixa
+        data = [['Faixa', 'Parcelas', 'Valor']]
+        for faixa, qtd, valor in zip(faixas, aging['qtd'], aging['total']):
+            data.append([faixa, str(qtd), f"R$ {from_centavos(valor):,.2f}"])
+        t = Table(data)
+        t.setStyle(_create_table_style())
+        elements.append(t)
+        elements.append(Spacer(1, 20))
+        
+        for titulo, chave, coluna in (("Por Cliente", 'por_cliente', 'Cliente'),
+                                      ("Por Área", 'por_area', 'Área'),
+                                      ("Por Responsável", 'por_responsavel', 'Responsável')):
+            linhas = aging[chave]
+            elements.append(Paragraph(titulo, styles['Heading2']))
+            if not linhas:
+                elements.append(Paragraph("Nenhum valor em aberto.", styles['Normal']))
+            else:
+                elements.append(tabela(coluna, linhas[:max_linhas]))
+                if len(linhas) > max_linhas:
+                    elements.append(Paragraph(f"... e mais {len(linhas) - max_linhas} (maiores atrasos listados primeiro).", styles['Normal']))
+            elements.append(Spacer(1, 20))
+        
+        doc.build(elements)
+        return True, _destino(filename)
     except Exception as e:
         return False, str(e)
@@ -0,0 +1,120 @@
+from dateutil.relativedelta import relativedelta
+
+from src.utils.dates import parse_date_strict, to_iso
+from src.utils.money import to_centavos, from_centavos, dividir_centavos
+
+# Cronograma de parcelas de um contrato e a diferença entre dois cronogramas.
+# Ao editar valor total, nº de parcelas ou data de início, só as parcelas que mudam
+# são gravadas: as de mesmo número são atualizadas no lugar (mantêm id, status e pagamento),
+# as que faltam são inseridas e as que sobram, excluídas.
+
+def gerar_cronograma(contrato_id, total_centavos, num_parcelas, data_inicio):
+    """
+    Parcelas mensais em aberto a partir de data_inicio (date ou texto em formato aceito).
+    Centavos exatos: o resto da divisão vai para as primeiras parcelas.
+    """
+    inicio = parse_date_strict(data_inicio)
+    return [
+        {
+            "id": f"{contrato_id}_P{i+1}",
+            "contrato_id": contrato_id,
+            "numero": i + 1,
+            "valor": from_centavos(centavos),
+            "valor_centavos": centavos,
+            "data_vencimento": (inicio + relativedelta(months=i)).strftime("%Y-%m-%d"),
+            "status": "em_aberto",
+        }
+        for i, centavos in enumerate(dividir_centavos(total_centavos, num_parcelas))
+    ]
+
+def _centavos(parcela):
+    centavos = parcela.get("valor_centavos")
+    return int(centavos) if centavos is not None else to_centavos(parcela.get("valor") or 0)
+
+def diff_cronograma(atuais, novas):
+    """
+    atuais: parcelas gravadas do contrato; novas: cronograma desejado (gerar_cronograma).
+    As parcelas são pareadas pelo número. Retorna (inserir, atualizar, excluir):
+    - inserir: parcelas de novas sem par em atuais
+    - atualizar: [(id, {campo: valor})] só para as pareadas em que valor ou vencimento mudou
+    - excluir: ids das atuais sem par (número além do novo total, ou número repetido)
+    """
+    por_numero = {}
+    excluir = []
+    for p in atuais:
+        numero = p.get("numero")
+        if numero in por_numero:
+            excluir.append(p["id"])
+        else:
+            por_numero[numero] = p
+
+    inserir, atualizar = [], []
+    for nova in novas:
+        atual = por_numero.pop(nova["numero"], None)
+        if atual is None:
+            inserir.append(nova)
+            continue
+        campos = {}
+        if _centavos(atual) != nova["valor_centavos"]:
+            campos["valor"] = nova["valor"]
+            campos["valor_centavos"] = nova["valor_centavos"]
+        if to_iso(atual.get("data_vencimento")) != nova["data_vencimento"]:
+            campos["data_vencimento"] = nova["data_vencimento"]
+        if campos:
+            atualizar.append((atual["id"], campos))
+    excluir.extend(p["id"] for p in por_numero.values())
+    return inserir, atualizar, excluir
+
+class ParcelasPorContrato:
+    """
+    Índice em memória contrato_id -> parcelas (os mesmos objetos da lista do chamador).
+    Parcelas acrescentadas ao fim da lista entram com sincronizar(); aplicar() leva à lista
+    e ao índice o resultado de diff_cronograma sem percorrer as parcelas dos outros contratos
+    (exceto para remover, que precisa refazer a lista).
+    """
+
+    def __init__(self, parcelas):
+        self.registros = parcelas
+        self.reconstruir()
+
+    def reconstruir(self):
+        self._por_contrato = {}
+        for p in self.registros:
+            self._por_contrato.setdefault(p.get("contrato_id"), []).append(p)
+        self._indexados = len(self.registros)
+
+    def sincronizar(self):
+        """Indexa as parcelas acrescentadas ao fim da lista desde a última sincronização."""
+        total = len(self.registros)
+        if total < self._indexados:
+            self.reconstruir()
+            return
+        for p in self.registros[self._indexados:]:
+            self._por_contrato.setdefault(p.get("contrato_id"), []).append(p)
+        self._indexados = total
+
+    def do_contrato(self, contrato_id):
+        return self._por_contrato.get(contrato_id, [])
+
+    def aplicar(self, contrato_id, inserir, atualizar, excluir, **extras):
+        """
+        Aplica (inserir, atualizar, excluir) às parcelas do contrato na lista e no índice.
+        extras: campos copiados para as parcelas inseridas (ex.: cliente e tipo_honorario, que vêm do contrato).
+        """
+        self.sincronizar()
+        parcelas = self.do_contrato(contrato_id)
+        por_id = {p.get("id"): p for p in parcelas}
+        for parcela_id, campos in atualizar:
+            if parcela_id in por_id:
+                por_id[parcela_id].update(campos)
+        if excluir:
+            removidas = {id(por_id[i]) for i in excluir if i in por_id}
+            self.registros[:] = [p for p in self.registros if id(p) not in removidas]
+            parcelas = [p for p in parcelas if id(p) not in removidas]
+        for nova in inserir:
+            nova = {**nova, **extras}
+            self.registros.append(nova)
+            parcelas.append(nova)
+        parcelas.sort(key=lambda p: p.get("numero") or 0)
+        self._por_contrato[contrato_id] = parcelas
+        self._indexados = len(self.registros)
@@ -1,94 +1,180 @@
+import heapq
 from datetime import datetime
+from itertools import islice
+from operator import attrgetter
 
-def parse_date(date_str):
-    if not date_str:
-        return None
-    try:
-        return datetime.strptime(date_str, "%Y-%m-%d").date()
-    except ValueError:
-        return None
+from src.utils.dates import parse_date
 
-def gerar_timeline_cliente(cliente_nome, contratos, parcelas):
+# Quantidade de eventos mostrados por vez ("Carregar mais" traz a próxima página)
+EVENTOS_POR_PAGINA = 10
+
+# tipo -> (título, ícone, cor)
+ESTILOS = {
+    'contrato': ('Contrato Iniciado', '📝', '#3498db'),      # Blue
+    'sistema': ('Parcelamento Definido', '⚙️', '#95a5a6'),   # Gray
+    'pagamento': ('Pagamento Recebido', '✅', '#2ecc71'),    # Green
+    'atraso': ('Atraso Registrado', '🚨', '#e74c3c'),        # Red
+    'futuro': ('Agendamento', '📅', '#f1c40f'),              # Yellow/Orange
+}
+
+# tipo -> função (registro, data) -> descrição; só é chamada quando o evento é exibido
+DESCRICOES = {
+    'contrato': lambda c, dt: f"{c.get('tipo_honorario')} - {c.get('area_direito')} (R$ {c.get('valor_total', 0):,.2f})",
+    'sistema': lambda c, dt: f"{c.get('num_parcelas', 0)} parcelas geradas",
+    'pagamento': lambda p, dt: f"Parcela {p.get('numero')} quitada (R$ {p.get('valor', 0):,.2f})",
+    'atraso': lambda p, dt: f"Parcela {p.get('numero')} venceu dia {dt.strftime('%d/%m/%Y')}",
+    'futuro': lambda p, dt: f"Parcela {p.get('numero')} vence em {dt.strftime('%d/%m/%Y')}",
+}
+
+class Evento:
     """
-    Gera uma lista de eventos cronológicos para o cliente.
-    Retorna lista de dicts ordenados por data (mais recente primeiro).
+    Evento da timeline. Guarda só a data, o tipo e o registro de origem;
+    título, ícone, cor e descrição são derivados quando lidos (evento['descricao'] ou evento.descricao).
     """
-    events = []
-    
-    # Filtrar dados
-    contratos_cli = [c for c in contratos if c.get('cliente') == cliente_nome]
-    parcelas_cli = [p for p in parcelas if p.get('cliente') == cliente_nome]
-    
-    hoje = datetime.now().date()
-    
-    # Eventos de Contrato
-    for c in contratos_cli:
+    __slots__ = ('data', 'tipo', '_registro', '_descricao')
+
+    def __init__(self, data, tipo, registro):
+        self.data = data
+        self.tipo = tipo
+        self._registro = registro
+        self._descricao = None
+
+    @property
+    def titulo(self):
+        return ESTILOS[self.tipo][0]
+
+    @property
+    def icone(self):
+        return ESTILOS[self.tipo][1]
+
+    @property
+    def cor(self):
+        return ESTILOS[self.tipo][2]
+
+    @property
+    def descricao(self):
+        if self._descricao is None:
+            self._descricao = DESCRICOES[self.tipo](self._registro, self.data)
+        return self._descricao
+
+    # Acesso no estilo dict, como os eventos antigos (evento['titulo'])
+    def __getitem__(self, campo):
+        if campo.startswith('_'):
+            raise KeyError(campo)
+        try:
+            return getattr(self, campo)
+        except AttributeError:
+            raise KeyError(campo) from None
+
+    def get(self, campo, default=None):
+        try:
+            return self[campo]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return f"Evento({self.data.isoformat()}, {self.tipo!r})"
+
+def _mais_recentes_primeiro(entradas):
+    """
+    entradas: [(data, ordem, ...)] em qualquer ordem.
+    Gera as entradas da data mais recente para a mais antiga (empate: menor ordem primeiro).
+    heapify é O(n); cada item consumido custa O(log n), então ler só a primeira página
+    não paga a ordenação da lista inteira.
+    """
+    heap = [(-entrada[0].toordinal(), entrada[1], entrada) for entrada in entradas]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+def _eventos_contratos(contratos_cli):
+    entradas = []
+    for ordem, c in enumerate(contratos_cli):
         dt_inicio = parse_date(c.get('data_inicio'))
         if dt_inicio:
-            # Evento: Contrato Criado
-            events.append({
-                'data': dt_inicio,
-                'tipo': 'contrato',
-                'titulo': 'Contrato Iniciado',
-                'descricao': f"{c.get('tipo_honorario')} - {c.get('area_direito')} (R$ {c.get('valor_total', 0):,.2f})",
-                'icone': '📝',
-                'cor': '#3498db' # Blue
-            })
-            
-            # Evento: Parcelas Geradas
-            num_p = c.get('num_parcelas', 0)
-            if num_p > 0:
-                events.append({
-                    'data': dt_inicio,
-                    'tipo': 'sistema',
-                    'titulo': 'Parcelamento Definido',
-                    'descricao': f"{num_p} parcelas geradas",
-                    'icone': '⚙️',
-                    'cor': '#95a5a6' # Gray
-                })
-
-    # Eventos de Parcelas
-    for p in parcelas_cli:
-        dt_venc = parse_date(p.get('data_vencimento'))
-        dt_pag = parse_date(p.get('data_pagamento'))
-        status = p.get('status')
-        num = p.get('numero')
-        valor = p.get('valor', 0)
-        
+            entradas.append((dt_inicio, ordem, c))
+    for dt_inicio, _, c in _mais_recentes_primeiro(entradas):
+        # Contrato Criado e, no mesmo dia, Parcelas Geradas
+        yield Evento(dt_inicio, 'contrato', c)
+        if (c.get('num_parcelas') or 0) > 0:
+            yield Evento(dt_inicio, 'sistema', c)
+
+def _tipo_evento_parcela(p, hoje):
+    """(tipo, data) do evento de uma parcela, ou None se ela não gera evento."""
+    status = p.get('status')
+    if status == 'paga':
         # Pagamento Realizado
-        if status == 'paga' and dt_pag:
-            events.append({
-                'data': dt_pag,
-                'tipo': 'pagamento',
-                'titulo': 'Pagamento Recebido',
-                'descricao': f"Parcela {num} quitada (R$ {valor:,.2f})",
-                'icone': '✅',
-                'cor': '#2ecc71' # Green
-            })
-        
-        # Atraso (Vencida e não paga)
-        elif status == 'em_aberto' and dt_venc and dt_venc < hoje:
-             events.append({
-                'data': dt_venc,
-                'tipo': 'atraso',
-                'titulo': 'Atraso Registrado',
-                'descricao': f"Parcela {num} venceu dia {dt_venc.strftime('%d/%m/%Y')}",
-                'icone': '🚨',
-                'cor': '#e74c3c' # Red
-            })
-             
-        # Futuro (Vencimento próximo ou distante)
-        elif status == 'em_aberto' and dt_venc and dt_venc >= hoje:
-             events.append({
-                'data': dt_venc,
-                'tipo': 'futuro',
-                'titulo': 'Agendamento',
-                'descricao': f"Parcela {num} vence em {dt_venc.strftime('%d/%m/%Y')}",
-                'icone': '📅',
-                'cor': '#f1c40f' # Yellow/Orange
-            })
-
-    # Ordenação: Mais recente primeiro
-    events.sort(key=lambda x: x['data'], reverse=True)
-    
-    return events
+        dt_pag = parse_date(p.get('data_pagamento'))
+        return ('pagamento', dt_pag) if dt_pag else None
+    if status == 'em_aberto':
+        dt_venc = parse_date(p.get('data_vencimento'))
+        if dt_venc:
+            # Atraso (vencida e não paga) ou Futuro (vencimento próximo ou distante)
+            return ('atraso', dt_venc) if dt_venc < hoje else ('futuro', dt_venc)
+    return None
+
+def _eventos_parcelas(parcelas_cli, hoje):
+    entradas = []
+    for ordem, p in enumerate(parcelas_cli):
+        evento = _tipo_evento_parcela(p, hoje)
+        if evento:
+            tipo, dt = evento
+            entradas.append((dt, ordem, tipo, p))
+    for dt, _, tipo, p in _mais_recentes_primeiro(entradas):
+        yield Evento(dt, tipo, p)
+
+def iterar_timeline_cliente(contratos_cli, parcelas_cli, hoje=None):
+    """
+    Gera os eventos do cliente do mais recente para o mais antigo, sob demanda.
+    contratos_cli / parcelas_cli: só os registros do cliente (ex.: query_data(..., cliente=...),
+    que usa os índices), para que abrir uma timeline não percorra as tabelas inteiras.
+    Cada fonte (contratos, parcelas) é um fluxo já ordenado por data e os fluxos são
+    intercalados com heapq.merge; em datas iguais, eventos de contrato vêm antes.
+    """
+    hoje = hoje or datetime.now().date()
+    return heapq.merge(
+        _eventos_contratos(contratos_cli),
+        _eventos_parcelas(parcelas_cli, hoje),
+        key=attrgetter('data'), reverse=True
+    )
+
+class TimelineCursor:
+    """
+    Posição de leitura na timeline de um cliente, para paginação do tipo "Carregar mais".
+    contratos_cli / parcelas_cli: só os registros do cliente (ver iterar_timeline_cliente).
+    cursor.proximos() devolve a próxima página; cursor.tem_mais indica se ainda há eventos.
+    """
+
+    def __init__(self, cliente_nome, contratos_cli, parcelas_cli, hoje=None, por_pagina=EVENTOS_POR_PAGINA):
+        self.cliente = cliente_nome
+        self.por_pagina = por_pagina
+        self.carregados = 0
+        self._eventos = iterar_timeline_cliente(contratos_cli, parcelas_cli, hoje)
+        self._seguinte = next(self._eventos, None)
+
+    @property
+    def tem_mais(self):
+        return self._seguinte is not None
+
+    def proximos(self, n=None):
+        """Próximos n eventos (padrão: uma página). Lista vazia quando a timeline acabou."""
+        n = self.por_pagina if n is None else n
+        if n <= 0 or self._seguinte is None:
+            return []
+        pagina = [self._seguinte]
+        pagina.extend(islice(self._eventos, n - 1))
+        self._seguinte = next(self._eventos, None)
+        self.carregados += len(pagina)
+        return pagina
+
+def gerar_timeline_cliente(cliente_nome, contratos, parcelas, limite=None):
+    """
+    Gera uma lista de eventos cronológicos para o cliente.
+    Retorna lista de eventos ordenados por data (mais recente primeiro); com limite,
+    só os `limite` mais recentes. Recebe as listas completas e separa as do cliente;
+    para paginar, use TimelineCursor com os registros do cliente.
+    """
+    contratos_cli = [c for c in contratos if c.get('cliente') == cliente_nome]
+    parcelas_cli = [p for p in parcelas if p.get('cliente') == cliente_nome]
+    eventos = iterar_timeline_cliente(contratos_cli, parcelas_cli)
+    return list(eventos if limite is None else islice(eventos, limite))
@@ -0,0 +1,187 @@
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+from src.utils.analytics import FAIXAS_AGING
+from src.utils.money import from_centavos
+
+# Gráficos do dashboard. A figura e os oito eixos são criados uma vez e reaproveitados:
+# - balanço e aging têm barras fixas, atualizadas com set_height;
+# - os demais (pizzas e rankings, com quantidade variável de itens) só são redesenhados
+#   quando os dados daquele eixo mudam;
+# - os últimos bitmaps renderizados ficam em cache por (período, revisões dos dados, tamanho),
+#   então voltar ao período anterior não renderiza a figura de novo.
+
+CORES_AGING = ['#F1C40F', '#E67E22', '#D35400', '#C0392B', '#7B241C']
+# Bitmaps guardados: cada um é a figura inteira em RGBA (10x16 pol. a 100 dpi, ~6 MB), então só
+# o atual e o anterior (ex.: alternar entre dois períodos)
+MAX_BITMAPS = 2
+
+def _estilo(ax, titulo):
+    ax.set_title(titulo, fontsize=10, color="#2C3E50", pad=10)
+    ax.set_facecolor('#FFFFFF')
+    ax.tick_params(colors='gray', labelsize=8)
+    for spine in ax.spines.values(): spine.set_color('#E0E0E0')
+
+def _pizza(ax, dados, titulo, vazio, cores=None, titulo_vazio=None):
+    ax.clear()
+    if dados and sum(dados.values()) > 0:
+        wedges, texts, autotexts = ax.pie(dados.values(), labels=dados.keys(), autopct='%1.1f%%', startangle=90,
+                                          colors=cores, textprops={'color': "#2C3E50"})
+        plt.setp(autotexts, size=8, weight="bold", color="white")
+        _estilo(ax, titulo)
+    else:
+        ax.text(0.5, 0.5, vazio, ha='center', color="gray")
+        _estilo(ax, titulo_vazio or titulo)
+
+def _ranking(ax, itens, titulo, cor, vazio, cor_vazio="gray", titulo_vazio=None):
+    """Barras horizontais (cliente, centavos), do maior para o menor."""
+    ax.clear()
+    if itens:
+        clientes = [x[0] for x in itens]
+        valores = [from_centavos(x[1]) for x in itens]
+        y_pos = range(len(clientes))
+        ax.barh(y_pos, valores, color=cor)
+        ax.set_yticks(y_pos)
+        ax.set_yticklabels(clientes)
+        ax.invert_yaxis()
+        for i, v in enumerate(valores):
+            ax.text(v, i, f' R$ {v:,.0f}', va='center', fontsize=9, color="#2C3E50")
+        _estilo(ax, titulo)
+    else:
+        ax.text(0.5, 0.5, vazio, ha='center', color=cor_vazio)
+        _estilo(ax, titulo_vazio or titulo)
+
+class DashboardCharts:
+    """
+    Figura do dashboard mantida entre visitas e trocas de período.
+    atualizar(resumo, aging, periodo) leva os dados aos eixos (só os que mudaram);
+    anexar(master) cria o canvas Tk quando a tela é montada; desenhar(chave) renderiza
+    ou reaproveita o bitmap já renderizado para a mesma chave.
+    """
+
+    def __init__(self):
+        self.fig = plt.Figure(figsize=(10, 16), dpi=100)
+        self.fig.patch.set_facecolor('#FFFFFF') # Background da figura
+        self.fig.subplots_adjust(hspace=0.5, wspace=0.3)
+        self.axes = [self.fig.add_subplot(421 + i) for i in range(8)]
+        self.canvas = None
+        self._assinaturas = [None] * len(self.axes)
+        self._bitmaps = OrderedDict()
+
+        # 1. Balanço: duas barras fixas e seus rótulos
+        ax1 = self.axes[0]
+        self._barras_balanco = ax1.bar(['Receita', 'Despesas'], [0, 0], color=['#27AE60', '#C0392B'])
+        self._rotulos_balanco = [
+            ax1.text(rect.get_x() + rect.get_width() / 2., 0, '', ha='center', va='bottom', fontsize=9, color="#2C3E50")
+            for rect in self._barras_balanco
+        ]
+
+        # 7. Aging: uma barra por faixa
+        ax7 = self.axes[6]
+        self._barras_aging = ax7.bar(range(len(FAIXAS_AGING)), [0] * len(FAIXAS_AGING), color=CORES_AGING)
+        ax7.set_xticks(range(len(FAIXAS_AGING)))
+        ax7.set_xticklabels(FAIXAS_AGING, fontsize=8)
+        self._vazio_aging = ax7.text(0.5, 0.5, "Sem valores em aberto", ha='center', color="gray", transform=ax7.transAxes)
+        _estilo(ax7, "Aging da Carteira")
+
+    # ----- Dados -----
+
+    def _balanco(self, ax, periodo, receita, despesa):
+        for rect, rotulo, valor in zip(self._barras_balanco, self._rotulos_balanco, (receita, despesa)):
+            rect.set_height(valor)
+            rotulo.set_position((rect.get_x() + rect.get_width() / 2., valor))
+            rotulo.set_text(f'R$ {valor:,.0f}')
+        ax.relim()
+        ax.autoscale_view()
+        _estilo(ax, f"Balanço: {periodo}")
+
+    def _aging(self, ax, totais):
+        valores = [from_centavos(v) for v in totais]
+        tem_valores = sum(valores) > 0
+        for rect, valor in zip(self._barras_aging, valores):
+            rect.set_height(valor)
+            rect.set_visible(tem_valores)
+        self._vazio_aging.set_visible(not tem_valores)
+        ax.relim(visible_only=True)
+        ax.autoscale_view()
+
+    def _aging_por_area(self, ax, por_area):
+        ax.clear()
+        if por_area:
+            y_pos = range(len(por_area))
+            base = [0.0] * len(por_area)
+            for f in range(1, len(FAIXAS_AGING)):
+                largura = [from_centavos(vals[f]) for _, vals in por_area]
+                ax.barh(y_pos, largura, left=base, color=CORES_AGING[f], label=FAIXAS_AGING[f])
+                base = [b + w for b, w in zip(base, largura)]
+            ax.set_yticks(y_pos)
+            ax.set_yticklabels([area for area, _ in por_area])
+            ax.invert_yaxis()
+            ax.legend(fontsize=7)
+        else:
+            ax.text(0.5, 0.5, "Nenhuma Inadimplência", ha='center', color="green")
+        _estilo(ax, "Atraso por Área (Aging)")
+
+    def atualizar(self, resumo, aging, periodo):
+        """Leva os dados aos eixos. Retorna quantos eixos mudaram (0: a figura já mostra esses dados)."""
+        receita = from_centavos(resumo['receita'])
+        despesa = from_centavos(resumo['despesa'])
+        carteira = {
+            'Atrasado': from_centavos(resumo['total_atrasado']),
+            'A Vencer': from_centavos(resumo['total_a_vencer']),
+        }
+        # Aging por área: só as 5 primeiras áreas com algum valor em atraso
+        por_area = [(area, tuple(vals)) for area, vals in aging['por_area'] if any(vals[1:])][:5]
+
+        # (assinatura dos dados do eixo, função que o atualiza)
+        partes = [
+            ((periodo, receita, despesa), lambda ax: self._balanco(ax, periodo, receita, despesa)),
+            (tuple(resumo['despesas_por_categoria'].items()),
+             lambda ax: _pizza(ax, resumo['despesas_por_categoria'], "Despesas por Categoria", "Sem dados")),
+            (tuple(resumo['receita_por_area'].items()),
+             lambda ax: _pizza(ax, resumo['receita_por_area'], "Receita por Área", "Sem receitas")),
+            (tuple(map(tuple, resumo['top_clientes'])),
+             lambda ax: _ranking(ax, resumo['top_clientes'], "Top 5 Clientes (Receita)", '#2980B9', "Sem dados")),
+            (tuple(map(tuple, resumo['top_inadimplentes'])),
+             lambda ax: _ranking(ax, resumo['top_inadimplentes'], "Top 5 Inadimplentes (Atrasado)", '#C0392B',
+                                 "Nenhuma Inadimplência", cor_vazio="green", titulo_vazio="Top 5 Inadimplentes")),
+            (tuple(carteira.items()),
+             lambda ax: _pizza(ax, carteira, "Status da Carteira (A Receber)", "Sem pendências",
+                               cores=['#C0392B', '#F1C40F'], titulo_vazio="Status da Carteira")), # Vermelho, Amarelo
+            (tuple(aging['total']), lambda ax: self._aging(ax, aging['total'])),
+            (tuple(por_area), lambda ax: self._aging_por_area(ax, por_area)),
+        ]
+        mudaram = 0
+        for i, (assinatura, desenhar) in enumerate(partes):
+            if self._assinaturas[i] != assinatura:
+                desenhar(self.axes[i])
+                self._assinaturas[i] = assinatura
+                mudaram += 1
+        return mudaram
+
+    # ----- Renderização -----
+
+    def anexar(self, master):
+        """Cria o canvas Tk da figura em master (a tela do dashboard foi montada de novo)."""
+        self.canvas = FigureCanvasTkAgg(self.fig, master=master)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        return self.canvas
+
+    def desenhar(self, chave):
+        """
+        Renderiza a figura no canvas. chave identifica os dados exibidos (ex.: período e revisões);
+        se a mesma chave já foi renderizada com o mesmo tamanho, o bitmap guardado é copiado de volta.
+        """
+        chave = (chave, tuple(self.fig.bbox.size))
+        bitmap = self._bitmaps.get(chave)
+        if bitmap is not None:
+            self._bitmaps.move_to_end(chave)
+            self.canvas.restore_region(bitmap)
+            self.canvas.blit(self.fig.bbox)
+            return
+        self.canvas.draw()
+        self._bitmaps[chave] = self.canvas.copy_from_bbox(self.fig.bbox)
+        while len(self._bitmaps) > MAX_BITMAPS:
+            self._bitmaps.popitem(last=False)
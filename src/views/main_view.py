@@ -1,18 +1,42 @@
 import customtkinter as ctk
 from tkinter import messagebox, ttk, filedialog
 from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from src.utils.pdf_generator import gerar_relatorio_fluxo, gerar_relatorio_inadimplencia, gerar_extrato_ir, gerar_dre
-from src.utils.client_score import calcular_score_cliente
+from src.utils.pdf_generator import gerar_relatorio_fluxo, gerar_relatorio_inadimplencia, gerar_extrato_ir, gerar_dre, gerar_previsao_caixa, gerar_relatorio_aging
+from src.utils.client_score import calcular_scores_clientes
 from src.utils.timeline import gerar_timeline_cliente
+from src.utils.money import to_centavos, from_centavos
+from src.utils.dates import parse_date, parse_date_strict
+from src.utils.analytics import limites_periodo
+from src.utils.schedule import gerar_cronograma, ParcelasPorContrato
+from src.views.virtual_grid import VirtualGrid, Paginador, TAMANHO_PAGINA
+from src.views.worker_pool import TkWorkerPool
+from src.views.dashboard_charts import DashboardCharts
 import os
 import shutil
 import webbrowser
 import urllib.parse
 
 class SistemaAdvocacia(ctk.CTk):
+    # Intervalo de verificação de mudanças feitas por outro processo (ex.: versão web)
+    POLL_INTERVAL_MS = 5000
+    # Tabelas exibidas por cada tela (para saber se ela precisa ser atualizada)
+    VIEW_TABLES = {
+        "dashboard": {"contratos", "parcelas", "despesas"},
+        "contratos": {"contratos"},
+        "fluxo": {"contratos", "parcelas"},
+        "despesas": {"despesas"},
+        "clientes": {"contratos", "parcelas"},
+    }
+    # Cor do badge de cada categoria de despesa
+    CORES_CATEGORIAS = {
+        "Aluguel": "#FADBD8",
+        "Energia": "#FCF3CF",
+        "Pessoal": "#D6EAF8",
+        "Marketing": "#D1F2EB",
+        "Software": "#E8DAEF",
+        "Outros": "#EAEDED"
+    }
+
     def __init__(self, data_manager):
         super().__init__()
         self.dm = data_manager
@@ -26,8 +50,24 @@ class SistemaAdvocacia(ctk.CTk):
         self.parcelas = self.dm.load_data("parcelas")
         self.despesas = self.dm.load_data("despesas")
         
+        # Revisões conhecidas de cada tabela (change feed do DataManager)
+        self.revisoes = self.dm.get_revisions()
+        self.current_view = None
+        # Telas montadas: {nome: (frame, assinatura)}; ver _mostrar_tela
+        self._telas = {}
+        
         # Estado do Dashboard
         self.dashboard_period = "Este Mês"
+        # Figura do dashboard (criada na primeira visita) e widgets preenchidos a cada período
+        self._graficos_dashboard = None
+        self._widgets_dashboard = None
+        # Registros por página nas listas de contratos, fluxo e despesas
+        self.tamanho_pagina = TAMANHO_PAGINA
+        # contrato_id -> parcelas de self.parcelas (edição do parcelamento de um contrato)
+        self._parcelas_por_contrato = None
+        
+        # Cálculos pesados rodam em threads; os resultados voltam à thread do Tk por after()
+        self.workers = TkWorkerPool(self)
         
         # Realizar Backup na inicialização
         self.dm.backup_data()
@@ -37,6 +77,97 @@ class SistemaAdvocacia(ctk.CTk):
         
         # Verificar Notificações após carregar interface
         self.after(1000, self.check_notifications)
+        self.after(self.POLL_INTERVAL_MS, self._poll_changes)
+        self._rollover_scores()
+
+    def destroy(self):
+        self.workers.shutdown()
+        super().destroy()
+
+    def _agendar_rollover_scores(self):
+        """Agenda o rollover diário do score de clientes para logo após a meia-noite."""
+        agora = datetime.now()
+        amanha = datetime.combine(agora.date() + timedelta(days=1), datetime.min.time())
+        ms = int((amanha - agora).total_seconds() * 1000) + 1000
+        self.after(ms, self._rollover_scores)
+
+    def _rollover_scores(self):
+        """
+        Deixa os scores em dia (cálculo inicial ou rollover do dia) em uma tarefa própria do pool,
+        e reagenda para amanhã. É a única escrita nos scores fora das gravações: dashboard e
+        ranking só leem a tabela, então nenhum cálculo de tela segura o write_lock.
+        """
+        self.workers.submit(self.dm.atualizar_scores, on_done=self._scores_atualizados,
+                            on_error=lambda e: print(f"Erro no rollover dos scores: {e}"))
+        self._agendar_rollover_scores()
+
+    def _scores_atualizados(self, resultado):
+        """Thread do Tk: scores recalculados; atualiza as telas que os exibem."""
+        if resultado is None:
+            return
+        # O rollover não muda as revisões das tabelas: a tela de clientes é remontada à força
+        exibida = self.current_view == "clientes"
+        self._descartar_tela("clientes")
+        if exibida:
+            self.show_clientes()
+        # A previsão do dashboard é ponderada pela pontualidade
+        if self.current_view == "dashboard" and self._widgets_dashboard is not None:
+            self.workers.cancelar("dashboard")
+            self.workers.submit(self._dados_dashboard, self.dashboard_period, grupo="dashboard",
+                                on_done=self._preencher_dashboard)
+
+    def _poll_changes(self):
+        """Recarrega apenas as tabelas que outro processo alterou e atualiza a tela se ela as exibe"""
+        try:
+            # Recarga anterior ainda no pool: as revisões só avançam quando ela termina
+            if self.workers.pendentes("recarga"):
+                return
+            changed, revisoes = self.dm.poll_changes(self.revisoes)
+            if changed:
+                # Parcelas trazem o cliente do contrato, então mudanças em contratos também as afetam
+                if "contratos" in changed:
+                    changed.add("parcelas")
+                # As tabelas são lidas no pool; a thread do Tk só troca as listas quando elas chegam
+                self.workers.submit(
+                    self._recarregar_tabelas, sorted(changed), grupo="recarga",
+                    on_done=lambda listas: self._tabelas_recarregadas(listas, revisoes),
+                    on_error=lambda e: print(f"Erro ao recarregar tabelas: {e}")
+                )
+        except Exception as e:
+            print(f"Erro ao verificar alterações: {e}")
+        finally:
+            self.after(self.POLL_INTERVAL_MS, self._poll_changes)
+
+    def _recarregar_tabelas(self, tabelas):
+        """Roda no pool: {tabela: lista recarregada do banco}."""
+        return {key: self.dm.load_data(key) for key in tabelas}
+
+    def _tabelas_recarregadas(self, listas, revisoes):
+        """Thread do Tk: troca as listas em memória e atualiza as telas que exibem as tabelas alteradas."""
+        self.revisoes = revisoes
+        changed = set(listas)
+        for key, registros in listas.items():
+            setattr(self, key, registros)
+
+        # Telas montadas enquanto a recarga rodava já têm a assinatura nova, mas foram feitas
+        # com as listas antigas: as que não são a atual são remontadas na próxima visita
+        for nome in list(self._telas):
+            if nome != self.current_view and changed & self.VIEW_TABLES.get(nome, set()):
+                self._descartar_tela(nome)
+
+        if not changed & self.VIEW_TABLES.get(self.current_view, set()):
+            return
+        if self.current_view == "contratos":
+            self._filter_contratos(reiniciar=False)  # só a lista, sem apagar o formulário
+            self._tela_atualizada("contratos")
+        elif self.current_view == "fluxo":
+            self._atualizar_fluxo()  # na página atual
+        elif self.current_view == "despesas":
+            self._atualizar_despesas()
+        elif self.current_view in ("dashboard", "clientes"):
+            nome = self.current_view
+            self._descartar_tela(nome)
+            {"dashboard": self.show_dashboard, "clientes": self.show_clientes}[nome]()
 
     def center_window(self):
         self.update_idletasks()
@@ -51,15 +182,18 @@ class SistemaAdvocacia(ctk.CTk):
         hoje = datetime.now().date()
         alertas = []
         
-        for p in self.parcelas:
-            if p['status'] == 'em_aberto':
-                venc = self._parse_date_input(p['data_vencimento'])
-                dias = (venc - hoje).days
-                
-                if dias < 0:
-                    alertas.append(f"🔴 ATRASADO: {p['cliente']} (R$ {p['valor']:.2f})")
-                elif 0 <= dias <= 3:
-                    alertas.append(f"🟡 VENCE EM BREVE: {p['cliente']} ({dias} dias)")
+        # Apenas parcelas em aberto que vencem até daqui a 3 dias (filtro no SQLite)
+        pendentes = self.dm.query_data(
+            "parcelas", status="em_aberto", date_to=hoje + timedelta(days=3), order_by="data_vencimento"
+        )
+        for p in pendentes:
+            venc = self._parse_date_input(p['data_vencimento'])
+            dias = (venc - hoje).days
+            
+            if dias < 0:
+                alertas.append(f"🔴 ATRASADO: {p['cliente']} (R$ {p['valor']:.2f})")
+            elif 0 <= dias <= 3:
+                alertas.append(f"🟡 VENCE EM BREVE: {p['cliente']} ({dias} dias)")
         
         if alertas:
             # Mostra apenas os 5 primeiros alertas para não poluir
@@ -111,23 +245,75 @@ class SistemaAdvocacia(ctk.CTk):
         ctk.CTkLabel(self.sidebar, text="v2.0 - 2026", text_color="#BDC3C7").grid(row=11, column=0, pady=20)
         
         # === CONTEÚDO ===
-        self.content_frame = ctk.CTkFrame(self, corner_radius=0, fg_color="transparent")
-        self.content_frame.grid(row=0, column=1, sticky="nsew", padx=20, pady=20)
+        # Cada tela é um frame filho de content_host; content_frame aponta para o da tela atual
+        self.content_host = ctk.CTkFrame(self, corner_radius=0, fg_color="transparent")
+        self.content_host.grid(row=0, column=1, sticky="nsew", padx=20, pady=20)
+        self.content_frame = self.content_host
         
         self.show_dashboard()
 
-    def clear_content(self):
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+    def _assinatura_tela(self, nome, chave=None):
+        """O que uma tela montada reflete: o dia, a revisão das tabelas que ela exibe e a chave (ex.: período)."""
+        revisoes = self.dm.get_revisions()
+        tabelas = sorted(self.VIEW_TABLES.get(nome, ()))
+        return (datetime.now().date(), tuple(revisoes[t] for t in tabelas), chave)
+
+    def _mostrar_tela(self, nome, chave=None):
+        """
+        Troca para a tela `nome`. As telas ficam montadas e escondidas (pack_forget) ao sair delas;
+        se a montada ainda reflete os dados atuais (mesma assinatura), só volta a ser exibida e
+        retorna True. Senão é descartada, content_frame passa a ser um frame novo e vazio e retorna
+        False: o chamador monta a tela nele.
+        """
+        atual = self._telas.get(self.current_view)
+        if atual is not None and self.current_view != nome:
+            atual[0].pack_forget()
+            # Cálculo ainda em andamento: cancela e descarta a tela (ela ficaria só com o placeholder)
+            if self.workers.cancelar(self.current_view):
+                self._descartar_tela(self.current_view)
+        self.current_view = nome
+
+        assinatura = self._assinatura_tela(nome, chave)
+        tela = self._telas.get(nome)
+        if tela is not None and tela[1] == assinatura:
+            self.content_frame = tela[0]
+            self.content_frame.pack(fill="both", expand=True)
+            return True
+        if tela is not None:
+            tela[0].destroy()
+        # Resultados pendentes da montagem anterior iriam para widgets que não existem mais
+        self.workers.cancelar(nome)
+        self.content_frame = ctk.CTkFrame(self.content_host, corner_radius=0, fg_color="transparent")
+        self.content_frame.pack(fill="both", expand=True)
+        self._telas[nome] = (self.content_frame, assinatura)
+        return False
+
+    def _placeholder(self, parent, texto):
+        """Aviso de carregamento exibido enquanto o pool calcula o conteúdo da tela."""
+        label = ctk.CTkLabel(parent, text=texto, text_color="gray", font=ctk.CTkFont(size=14))
+        label.pack(pady=30)
+        return label
+
+    def _tela_atualizada(self, nome, chave=None):
+        """Registra que a tela montada foi atualizada no lugar (sem remontar) e reflete os dados atuais."""
+        tela = self._telas.get(nome)
+        if tela is not None:
+            self._telas[nome] = (tela[0], self._assinatura_tela(nome, chave))
+
+    def _tela_exibida(self, nome):
+        """A tela `nome` está montada e é a atual (pode ser atualizada no lugar)."""
+        return self.current_view == nome and nome in self._telas
+
+    def _descartar_tela(self, nome):
+        """Força a remontagem da tela na próxima vez em que for exibida."""
+        tela = self._telas.pop(nome, None)
+        if tela is not None:
+            if self.current_view == nome:
+                self.current_view = None
+            tela[0].destroy()
 
     def _parse_date_input(self, value):
-        value = (value or "").strip()
-        for fmt in ("%d-%m-%Y", "%Y-%m-%d"):
-            try:
-                return datetime.strptime(value, fmt).date()
-            except ValueError:
-                continue
-        raise ValueError("Data inválida")
+        return parse_date_strict(value)
 
     def _format_date_br(self, value):
         try:
@@ -140,34 +326,33 @@ class SistemaAdvocacia(ctk.CTk):
 
     def _update_period_filter(self, choice):
         self.dashboard_period = choice
-        self.show_dashboard()
+        if self.current_view == "dashboard" and self._widgets_dashboard is not None:
+            # Tela já montada: recalcula só os dados e atualiza cards e gráficos no lugar
+            self.workers.cancelar("dashboard")
+            self.workers.submit(self._dados_dashboard, choice, grupo="dashboard", on_done=self._preencher_dashboard)
+            self._tela_atualizada("dashboard", chave=choice)
+        else:
+            self.show_dashboard()
+
+    def _indice_contratos(self):
+        """ParcelasPorContrato de self.parcelas, reaproveitado enquanto a lista for a mesma."""
+        indice = self._parcelas_por_contrato
+        if indice is None or indice.registros is not self.parcelas:
+            indice = self._parcelas_por_contrato = ParcelasPorContrato(self.parcelas)
+        else:
+            indice.sincronizar()
+        return indice
 
     def _filter_data_by_period(self, data_list, date_key, period):
         if period == "Todo o Período":
             return data_list
-            
-        hoje = datetime.now().date()
+        # Limites do período calculados uma vez, e não a cada registro
+        inicio, fim = limites_periodo(period)
         filtered = []
-        
         for item in data_list:
-            try:
-                date_str = item.get(date_key)
-                if not date_str: continue
-                dt = self._parse_date_input(date_str)
-                
-                if period == "Este Mês":
-                    if dt.month == hoje.month and dt.year == hoje.year:
-                        filtered.append(item)
-                elif period == "Últimos 3 Meses":
-                    start_date = hoje - relativedelta(months=3)
-                    if dt >= start_date:
-                        filtered.append(item)
-                elif period == "Ano Corrente":
-                    if dt.year == hoje.year:
-                        filtered.append(item)
-            except:
-                continue
-                
+            dt = parse_date(item.get(date_key))
+            if dt and (inicio is None or dt >= inicio) and (fim is None or dt < fim):
+                filtered.append(item)
         return filtered
 
     def _get_card_frame(self, parent=None, width=None, height=None):
@@ -201,64 +386,10 @@ class SistemaAdvocacia(ctk.CTk):
                                width=width, anchor="w")
             lbl.pack(side="left", padx=10)
             
-    def _create_datagrid_row(self, parent, values, columns, command=None):
-        """
-        Cria uma linha da tabela customizada.
-        values: Lista de valores correspondentes às colunas. Se for uma tupla (texto, tipo, cor), renderiza badge.
-        columns: Lista de tuplas (nome, largura) para manter alinhamento.
-        """
-        row = ctk.CTkFrame(parent, fg_color="#FFFFFF", height=55, corner_radius=8, border_color="#EEEEEE", border_width=1)
-        row.pack(fill="x", pady=2)
-        row.pack_propagate(False)
-        
-        def on_enter(e): row.configure(border_color="#BBBBBB")
-        def on_leave(e): row.configure(border_color="#EEEEEE")
-        
-        row.bind("<Enter>", on_enter)
-        row.bind("<Leave>", on_leave)
-        
-        if command:
-            row.bind("<Button-1>", command)
-        
-        for i, (val) in enumerate(values):
-            col_width = columns[i][1]
-            
-            # Container para a célula para garantir largura fixa e alinhamento
-            cell_frame = ctk.CTkFrame(row, fg_color="transparent", width=col_width, height=40)
-            cell_frame.pack(side="left", padx=10)
-            cell_frame.pack_propagate(False) # Importante para manter a largura
-            
-            if command:
-                cell_frame.bind("<Button-1>", command)
-            
-            # Verifica se é um Badge: tupla (texto, "badge", cor_fundo, cor_texto)
-            if isinstance(val, tuple) and len(val) >= 2 and val[1] == "badge":
-                text, _, bg_color, txt_color = val
-                badge = ctk.CTkFrame(cell_frame, fg_color=bg_color, corner_radius=12, height=24)
-                badge.place(relx=0, rely=0.5, anchor="w") # Centralizado verticalmente
-                
-                lbl = ctk.CTkLabel(badge, text=f" {text} ", text_color=txt_color, font=("Arial", 10, "bold"))
-                lbl.pack(padx=8, pady=2)
-                
-                if command:
-                    badge.bind("<Button-1>", command)
-                    lbl.bind("<Button-1>", command)
-            else:
-                # Texto normal
-                lbl = ctk.CTkLabel(cell_frame, text=str(val), text_color="#333333", font=("Arial", 12), anchor="w")
-                lbl.place(relx=0, rely=0.5, anchor="w")
-                if command:
-                    lbl.bind("<Button-1>", command)
-
     # ================= DASHBOARD COM GRÁFICOS =================
     def show_dashboard(self):
-        self.clear_content()
-
-        def style_ax(ax, title):
-            ax.set_title(title, fontsize=10, color="#2C3E50", pad=10)
-            ax.set_facecolor('#FFFFFF')
-            ax.tick_params(colors='gray', labelsize=8)
-            for spine in ax.spines.values(): spine.set_color('#E0E0E0')
+        if self._mostrar_tela("dashboard", chave=self.dashboard_period):
+            return
 
         # --- Header e Filtros ---
         header = ctk.CTkFrame(self.content_frame, fg_color="transparent")
@@ -282,220 +413,111 @@ class SistemaAdvocacia(ctk.CTk):
         combo_periodo.set(self.dashboard_period)
         combo_periodo.pack(side="left")
 
-        # --- Filtragem de Dados ---
-        # Receitas: parcelas pagas dentro do período (usa data_pagamento)
-        receitas_filtradas = [p for p in self.parcelas if p.get('status') == 'paga']
-        receitas_filtradas = self._filter_data_by_period(receitas_filtradas, 'data_pagamento', self.dashboard_period)
-        
-        # Despesas: despesas dentro do período
-        despesas_filtradas = self._filter_data_by_period(self.despesas, 'data', self.dashboard_period)
+        # --- Cálculo dos Dados (em segundo plano) ---
+        self._widgets_dashboard = None
+        tela = self.content_frame
+        carregando = self._placeholder(tela, "⏳ Calculando indicadores...")
+        self.workers.submit(
+            self._dados_dashboard, self.dashboard_period, grupo="dashboard",
+            on_done=lambda dados: self._montar_dashboard(tela, carregando, dados)
+        )
+
+    def _dados_dashboard(self, periodo):
+        """Roda no pool: KPIs, previsão e aging do dashboard (nada de widgets aqui)."""
+        # KPIs e séries do motor analítico (arrays NumPy, valores em centavos); receita e despesa
+        # de meses fechados vêm dos agregados mensais.
+        # receitas = parcelas pagas no período (data_pagamento); despesas = despesas do período
+        revisoes = self.dm.get_revisions()
+        return {
+            "periodo": periodo,
+            "hoje": datetime.now().date(),
+            # Revisões lidas antes do cálculo: identificam os dados no cache de bitmaps dos gráficos
+            "revisoes": tuple(revisoes[t] for t in sorted(self.VIEW_TABLES["dashboard"])),
+            "resumo": self.dm.resumo_dashboard(periodo),
+            # Previsão ponderada pela pontualidade de cada cliente, já descontadas as despesas recorrentes
+            "previsao": self.dm.get_forecast(meses=3, atualizar=False),
+            "aging": self.dm.get_analytics().aging(),
+        }
+
+    def _montar_dashboard(self, tela, carregando, dados):
+        """Thread do Tk: troca o placeholder pelos cards e gráficos e os preenche com _dados_dashboard."""
+        carregando.destroy()
 
         # === INSIGHTS NARRATIVOS (Operacional - Curto Prazo) ===
-        insights_card = self._get_card_frame(self.content_frame)
+        insights_card = self._get_card_frame(tela)
         insights_card.pack(fill="x", pady=(0, 20), padx=0)
-        
-        hoje = datetime.now().date()
-        daqui_30_dias = hoje + timedelta(days=30)
-        
-        # Cálculo de A Receber (30 dias) - Independente do filtro visual
-        a_receber_30 = sum(
-            p['valor'] for p in self.parcelas 
-            if p.get('status') == 'em_aberto' 
-            and p.get('data_vencimento')
-            and hoje <= self._parse_date_input(p['data_vencimento']) <= daqui_30_dias
-        )
-        
-        # Parcelas em Atraso (Total)
-        qtd_atraso = sum(
-            1 for p in self.parcelas 
-            if p.get('status') == 'em_aberto' 
-            and p.get('data_vencimento')
-            and self._parse_date_input(p['data_vencimento']) < hoje
-        )
-        
-        lbl_insight = ctk.CTkLabel(
-            insights_card, 
-            text=f"💡 Operacional: R$ {a_receber_30:,.2f} a receber nos próximos 30 dias. "
-                 f"{'⚠️ Há ' + str(qtd_atraso) + ' parcelas atrasadas.' if qtd_atraso > 0 else '✅ Nenhuma pendência atrasada.'} "
-                 f"(Visualizando: {self.dashboard_period})",
-            font=ctk.CTkFont(size=14),
-            text_color="#2C3E50",
-            anchor="w"
-        )
+
+        lbl_insight = ctk.CTkLabel(insights_card, text="", font=ctk.CTkFont(size=14), text_color="#2C3E50", anchor="w")
         lbl_insight.pack(padx=15, pady=10, fill="x")
+        lbl_previsao = ctk.CTkLabel(insights_card, text="", font=ctk.CTkFont(size=13), text_color="#2C3E50", anchor="w")
+        lbl_previsao.pack(padx=15, pady=(0, 10), fill="x")
 
         # === KPIs (Baseados no Filtro) ===
-        kpi_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+        kpi_frame = ctk.CTkFrame(tela, fg_color="transparent")
         kpi_frame.pack(fill="x", pady=10)
-        
-        total_receita = sum(p['valor'] for p in receitas_filtradas)
-        total_despesa = sum(d['valor'] for d in despesas_filtradas)
-        saldo = total_receita - total_despesa
-        
-        # Ticket Médio (Geral - Estrutural)
-        total_contratos_val = sum(c['valor_total'] for c in self.contratos)
-        qtd_contratos = len(self.contratos)
-        ticket_medio = total_contratos_val / qtd_contratos if qtd_contratos > 0 else 0
-        
-        kpis = [
-            (f"Receita", f"R$ {total_receita:,.2f}", "#27AE60"),
-            (f"Despesas", f"R$ {total_despesa:,.2f}", "#C0392B"),
-            (f"Saldo", f"R$ {saldo:,.2f}", "#2980B9"),
-            ("Ticket Médio", f"R$ {ticket_medio:,.2f}", "#8E44AD")
-        ]
-        
-        for label, valor, cor in kpis:
+
+        kpis = {}
+        for label, cor in (("Receita", "#27AE60"), ("Despesas", "#C0392B"), ("Saldo", "#2980B9"), ("Ticket Médio", "#8E44AD")):
             card = self._get_card_frame(kpi_frame)
             card.pack(side="left", expand=True, fill="both", padx=5)
             ctk.CTkLabel(card, text=label, text_color="gray", font=ctk.CTkFont(size=12)).pack(pady=(15, 5))
-            ctk.CTkLabel(card, text=valor, text_color=cor, font=ctk.CTkFont(size=20, weight="bold")).pack(pady=(0, 15))
+            kpis[label] = ctk.CTkLabel(card, text="", text_color=cor, font=ctk.CTkFont(size=20, weight="bold"))
+            kpis[label].pack(pady=(0, 15))
 
         # === GRÁFICOS ===
         # Container branco para gráficos
-        charts_container = self._get_card_frame(self.content_frame)
+        charts_container = self._get_card_frame(tela)
         charts_container.pack(fill="both", expand=True, pady=10)
 
         charts_scroll = ctk.CTkScrollableFrame(charts_container, fg_color="transparent")
         charts_scroll.pack(fill="both", expand=True, padx=5, pady=5)
-        
-        fig = plt.Figure(figsize=(10, 12), dpi=100)
-        fig.patch.set_facecolor('#FFFFFF') # Background da figura
-        fig.subplots_adjust(hspace=0.5, wspace=0.3)
-        
-        # 1. Balanço (Barra)
-        ax1 = fig.add_subplot(321)
-        bars = ax1.bar(['Receita', 'Despesas'], [total_receita, total_despesa], color=['#27AE60', '#C0392B'])
-        style_ax(ax1, f"Balanço: {self.dashboard_period}")
-        
-        for rect in bars:
-            height = rect.get_height()
-            ax1.text(rect.get_x() + rect.get_width()/2., height,
-                    f'R$ {height:,.0f}', ha='center', va='bottom', fontsize=9, color="#2C3E50")
-        
-        # 2. Despesas por Categoria (Pizza)
-        ax2 = fig.add_subplot(322)
-        cat_data = {}
-        for d in despesas_filtradas:
-            cat_data[d['categoria']] = cat_data.get(d['categoria'], 0) + d['valor']
-            
-        if cat_data:
-            wedges, texts, autotexts = ax2.pie(cat_data.values(), labels=cat_data.keys(), autopct='%1.1f%%', startangle=90,
-                                              textprops={'color': "#2C3E50"})
-            style_ax(ax2, "Despesas por Categoria")
-            plt.setp(autotexts, size=8, weight="bold", color="white")
-        else:
-            ax2.text(0.5, 0.5, "Sem dados", ha='center', color="gray")
-            style_ax(ax2, "Despesas por Categoria")
-
-        # 3. Receita por Área (Pizza)
-        ax3 = fig.add_subplot(323)
-        area_data = {}
-        contrato_map = {c['id']: c for c in self.contratos}
-        
-        for p in receitas_filtradas:
-            contrato = contrato_map.get(p['contrato_id'])
-            area = contrato.get('area_direito', 'Outros') if contrato else 'Outros'
-            area_data[area] = area_data.get(area, 0) + p['valor']
-            
-        if area_data:
-            wedges, texts, autotexts = ax3.pie(area_data.values(), labels=area_data.keys(), autopct='%1.1f%%', startangle=90,
-                                              textprops={'color': "#2C3E50"})
-            style_ax(ax3, "Receita por Área")
-            plt.setp(autotexts, size=8, weight="bold", color="white")
-        else:
-            ax3.text(0.5, 0.5, "Sem receitas", ha='center', color="gray")
-            style_ax(ax3, "Receita por Área")
-
-        # 4. Top 5 Clientes (Barra Horizontal)
-        ax4 = fig.add_subplot(324)
-        cli_data = {}
-        for p in receitas_filtradas:
-            cli = p.get('cliente', 'Desconhecido')
-            cli_data[cli] = cli_data.get(cli, 0) + p['valor']
-            
-        top_clientes = sorted(cli_data.items(), key=lambda x: x[1], reverse=True)[:5]
-        
-        if top_clientes:
-            clientes = [x[0] for x in top_clientes]
-            valores = [x[1] for x in top_clientes]
-            y_pos = range(len(clientes))
-            
-            ax4.barh(y_pos, valores, color='#2980B9')
-            ax4.set_yticks(y_pos)
-            ax4.set_yticklabels(clientes)
-            ax4.invert_yaxis()
-            style_ax(ax4, "Top 5 Clientes (Receita)")
-            
-            for i, v in enumerate(valores):
-                ax4.text(v, i, f' R$ {v:,.0f}', va='center', fontsize=9, color="#2C3E50")
-        else:
-            ax4.text(0.5, 0.5, "Sem dados", ha='center', color="gray")
-            style_ax(ax4, "Top 5 Clientes (Receita)")
 
-        # 5. Top 5 Inadimplentes (Barra Horizontal)
-        ax5 = fig.add_subplot(325)
-        inad_data = {}
-        hoje = datetime.now().date()
-        
-        for p in self.parcelas:
-            if p.get('status') == 'em_aberto' and p.get('data_vencimento'):
-                try:
-                    venc = self._parse_date_input(p['data_vencimento'])
-                    if venc < hoje:
-                        cli = p.get('cliente', 'Desconhecido')
-                        inad_data[cli] = inad_data.get(cli, 0) + p['valor']
-                except:
-                    continue
-        
-        top_inad = sorted(inad_data.items(), key=lambda x: x[1], reverse=True)[:5]
-        
-        if top_inad:
-            clientes = [x[0] for x in top_inad]
-            valores = [x[1] for x in top_inad]
-            y_pos = range(len(clientes))
-            
-            ax5.barh(y_pos, valores, color='#C0392B') # Vermelho para alerta
-            ax5.set_yticks(y_pos)
-            ax5.set_yticklabels(clientes)
-            ax5.invert_yaxis()
-            style_ax(ax5, "Top 5 Inadimplentes (Atrasado)")
-            
-            for i, v in enumerate(valores):
-                ax5.text(v, i, f' R$ {v:,.0f}', va='center', fontsize=9, color="#2C3E50")
-        else:
-            ax5.text(0.5, 0.5, "Nenhuma Inadimplência", ha='center', color="green")
-            style_ax(ax5, "Top 5 Inadimplentes")
-
-        # 6. Status Carteira (Pizza)
-        ax6 = fig.add_subplot(326)
-        total_atrasado = sum(inad_data.values())
-        total_a_vencer = sum(
-            p['valor'] for p in self.parcelas 
-            if p.get('status') == 'em_aberto' 
-            and self._parse_date_input(p['data_vencimento']) >= hoje
+        # A figura e os eixos são criados uma vez; cada montagem da tela só cria um canvas novo para ela
+        if self._graficos_dashboard is None:
+            self._graficos_dashboard = DashboardCharts()
+        self._graficos_dashboard.anexar(charts_scroll)
+
+        self._widgets_dashboard = {"insight": lbl_insight, "previsao": lbl_previsao, "kpis": kpis}
+        self._preencher_dashboard(dados)
+
+    def _preencher_dashboard(self, dados):
+        """Atualiza textos, KPIs e gráficos da tela já montada com os dados de um período."""
+        widgets = self._widgets_dashboard
+        resumo = dados['resumo']
+        previsao = dados['previsao']
+
+        # A Receber (30 dias) e Atrasadas - Independentes do filtro visual
+        a_receber_30 = from_centavos(resumo['a_receber_30'])
+        qtd_atraso = resumo['qtd_atraso']
+        widgets["insight"].configure(
+            text=f"💡 Operacional: R$ {a_receber_30:,.2f} a receber nos próximos 30 dias. "
+                 f"{'⚠️ Há ' + str(qtd_atraso) + ' parcelas atrasadas.' if qtd_atraso > 0 else '✅ Nenhuma pendência atrasada.'} "
+                 f"(Visualizando: {dados['periodo']})"
+        )
+        # Previsão ponderada pela pontualidade de cada cliente, já descontadas as despesas recorrentes
+        widgets["previsao"].configure(
+            text=f"🔮 Previsão (mês atual + 2): R$ {from_centavos(previsao['total_previsto']):,.2f} esperados "
+                 f"de R$ {from_centavos(previsao['total_nominal']):,.2f} em aberto; "
+                 f"saldo previsto após despesas recorrentes: R$ {from_centavos(previsao['saldo_previsto']):,.2f}."
         )
-        
-        status_vals = [total_atrasado, total_a_vencer]
-        status_labels = ['Atrasado', 'A Vencer']
-        colors = ['#C0392B', '#F1C40F'] # Vermelho, Amarelo
-        
-        if sum(status_vals) > 0:
-            wedges, texts, autotexts = ax6.pie(status_vals, labels=status_labels, autopct='%1.1f%%', 
-                                              startangle=90, colors=colors, textprops={'color': "#2C3E50"})
-            style_ax(ax6, "Status da Carteira (A Receber)")
-            plt.setp(autotexts, size=8, weight="bold", color="white")
-        else:
-            ax6.text(0.5, 0.5, "Sem pendências", ha='center', color="gray")
-            style_ax(ax6, "Status da Carteira")
 
-        # Renderizar
-        canvas = FigureCanvasTkAgg(fig, master=charts_scroll)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
+        # Ticket Médio (Geral - Estrutural)
+        kpis = widgets["kpis"]
+        kpis["Receita"].configure(text=f"R$ {from_centavos(resumo['receita']):,.2f}")
+        kpis["Despesas"].configure(text=f"R$ {from_centavos(resumo['despesa']):,.2f}")
+        kpis["Saldo"].configure(text=f"R$ {from_centavos(resumo['saldo']):,.2f}")
+        kpis["Ticket Médio"].configure(text=f"R$ {from_centavos(resumo['ticket_medio']):,.2f}")
+
+        # Só os eixos cujos dados mudaram são atualizados; o bitmap de (período, revisões) já
+        # renderizado é reaproveitado
+        graficos = self._graficos_dashboard
+        graficos.atualizar(resumo, dados['aging'], dados['periodo'])
+        graficos.desenhar((dados['periodo'], dados['hoje'], dados['revisoes']))
 
     # ================= CLIENTES =================
     def show_clientes(self):
-        self.clear_content()
+        if self._mostrar_tela("clientes"):
+            return
         
         # Header
         header = ctk.CTkFrame(self.content_frame, fg_color="transparent")
@@ -508,22 +530,37 @@ class SistemaAdvocacia(ctk.CTk):
         scroll = ctk.CTkScrollableFrame(self.content_frame)
         scroll.pack(fill="both", expand=True)
         
+        # Scores lidos/calculados em segundo plano
+        carregando = self._placeholder(scroll, "⏳ Calculando scores...")
+        # Cópias das listas: a thread do Tk pode trocá-las ou alterá-las enquanto o pool calcula
+        self.workers.submit(
+            self._ranking_clientes, list(self.contratos), list(self.parcelas), grupo="clientes",
+            on_done=lambda ranking: self._montar_clientes(scroll, carregando, ranking)
+        )
+
+    def _ranking_clientes(self, contratos, parcelas):
+        """Roda no pool: [(cliente, score)] do maior score para o menor."""
         # Get unique clients
-        clientes = sorted(list(set(c['cliente'] for c in self.contratos)))
-        
-        if not clientes:
-            ctk.CTkLabel(scroll, text="Nenhum cliente encontrado.").pack(pady=20)
-            return
+        clientes = sorted(list(set(c['cliente'] for c in contratos)))
+
+        # Scores persistidos (mantidos a cada escrita; o rollover diário roda em _rollover_scores);
+        # clientes ainda sem linha na tabela são calculados na hora, em uma única passada pelas listas
+        scores = self.dm.get_client_scores(atualizar=False)
+        faltando = [cli for cli in clientes if cli not in scores]
+        if faltando:
+            scores.update(calcular_scores_clientes(contratos, parcelas, faltando))
+        ranking = [(cli, scores[cli]) for cli in clientes]
 
-        # Calculate scores
-        ranking = []
-        for cli in clientes:
-            dados = calcular_score_cliente(cli, self.contratos, self.parcelas)
-            ranking.append((cli, dados))
-            
         # Sort by score desc
         ranking.sort(key=lambda x: x[1]['score'], reverse=True)
-        
+        return ranking
+
+    def _montar_clientes(self, scroll, carregando, ranking):
+        carregando.destroy()
+        if not ranking:
+            ctk.CTkLabel(scroll, text="Nenhum cliente encontrado.").pack(pady=20)
+            return
+
         for cli, dados in ranking:
             card = ctk.CTkFrame(scroll, fg_color=("gray90", "gray20"))
             card.pack(fill="x", pady=5, padx=5)
@@ -575,7 +612,8 @@ class SistemaAdvocacia(ctk.CTk):
 
     # ================= CONTRATOS =================
     def show_contratos(self):
-        self.clear_content()
+        if self._mostrar_tela("contratos"):
+            return
         ctk.CTkLabel(self.content_frame, text="📝 Gestão de Contratos", font=ctk.CTkFont(size=24, weight="bold")).pack(pady=20)
         
         tabview = ctk.CTkTabview(self.content_frame)
@@ -687,9 +725,14 @@ class SistemaAdvocacia(ctk.CTk):
         # Header
         self._create_datagrid_header(list_tab, self.cols_contratos)
         
-        # Scrollable Area para Rows
-        self.scroll_contratos = ctk.CTkScrollableFrame(list_tab, fg_color="transparent")
-        self.scroll_contratos.pack(fill="both", expand=True, padx=0, pady=5)
+        # Linhas virtualizadas: só as visíveis existem como widgets
+        self.grid_contratos = VirtualGrid(list_tab, self.cols_contratos)
+        self.grid_contratos.pack(fill="both", expand=True, padx=0, pady=5)
+
+        # Só a página atual é consultada (LIMIT/OFFSET no SQLite)
+        self.pag_contratos = Paginador(list_tab, lambda: self._filter_contratos(reiniciar=False),
+                                       tamanho=self.tamanho_pagina, rotulo="contratos")
+        self.pag_contratos.pack(fill="x", pady=(0, 5))
         
         # Popular Inicialmente
         self._filter_contratos()
@@ -697,46 +740,50 @@ class SistemaAdvocacia(ctk.CTk):
     def _on_contrato_click(self, contrato_id):
         self._open_contrato_modal(contrato_id)
 
-    def _filter_contratos(self):
+    def _filter_contratos(self, reiniciar=True):
+        """Recarrega a página atual da lista; reiniciar=True volta à primeira (ex.: nova busca)."""
         # Fallback se search_entry não estiver definida ainda
         try:
             query = self.search_var.get().lower()
         except AttributeError:
             query = ""
-            
-        # Limpar Rows Antigos
-        for widget in self.scroll_contratos.winfo_children():
-            widget.destroy()
-        
-        for c in self.contratos:
-            cliente = str(c.get('cliente', '')).lower()
-            if query in cliente:
-                origem = c.get('origem', '-')
-                valor_fmt = self._format_currency(c.get('valor_total', 0))
-                
-                # Status Badge Logic
-                status_raw = c.get('status', 'ativo')
-                if status_raw == 'ativo':
-                    status_badge = ("ATIVO", "badge", "#D1F2EB", "#117864") # Verde Claro/Escuro
-                else:
-                    status_badge = ("ENCERRADO", "badge", "#EAECEE", "#566573") # Cinza
-                
-                values = [
-                    c['id'], 
-                    c['cliente'], 
-                    c['area_direito'], 
-                    origem, 
-                    valor_fmt, 
-                    c['num_parcelas'],
-                    status_badge
-                ]
-                
-                self._create_datagrid_row(
-                    self.scroll_contratos, 
-                    values, 
-                    self.cols_contratos, 
-                    command=lambda e, cid=c['id']: self._on_contrato_click(cid)
-                )
+
+        paginador = self.pag_contratos
+        self.tamanho_pagina = paginador.tamanho
+        if reiniciar:
+            paginador.reiniciar()
+
+        # Busca por nome feita no SQLite (LIKE), contando o total e lendo só a página
+        filtros = {"cliente_contains": query or None}
+        paginador.set_total(self.dm.count_data("contratos", **filtros))
+        self.grid_contratos.set_data(
+            self.dm.query_data("contratos", **filtros, order_by="id",
+                               limit=paginador.tamanho, offset=paginador.offset),
+            self._linha_contrato,
+            on_click=lambda c: self._on_contrato_click(c['id'])
+        )
+
+    def _linha_contrato(self, c):
+        """Valores das colunas de cols_contratos para um contrato."""
+        origem = c.get('origem', '-')
+        valor_fmt = self._format_currency(c.get('valor_total', 0))
+
+        # Status Badge Logic
+        status_raw = c.get('status', 'ativo')
+        if status_raw == 'ativo':
+            status_badge = ("ATIVO", "badge", "#D1F2EB", "#117864") # Verde Claro/Escuro
+        else:
+            status_badge = ("ENCERRADO", "badge", "#EAECEE", "#566573") # Cinza
+
+        return [
+            c['id'],
+            c['cliente'],
+            c['area_direito'],
+            origem,
+            valor_fmt,
+            c['num_parcelas'],
+            status_badge
+        ]
 
     def _open_contrato_modal(self, contrato_id):
         contrato = next((c for c in self.contratos if c.get("id") == contrato_id), None)
@@ -762,7 +809,10 @@ class SistemaAdvocacia(ctk.CTk):
                 novo_resp = entries["Responsável"].get().strip()
                 novo_status = entries["Status"].get().strip() or "ativo"
 
-                novo_valor_total = float(entries["Valor Total (R$)"].get().replace(",", "."))
+                novo_valor_centavos = to_centavos(entries["Valor Total (R$)"].get())
+                if novo_valor_centavos is None:
+                    raise ValueError("Valor Total vazio")
+                novo_valor_total = from_centavos(novo_valor_centavos)
                 novo_num_parcelas = int(entries["Nº Parcelas"].get())
                 nova_data_inicio_br = entries["Data Início (DD-MM-AAAA)"].get().strip()
                 nova_data_inicio_iso = self._format_date_iso(nova_data_inicio_br)
@@ -776,12 +826,12 @@ class SistemaAdvocacia(ctk.CTk):
                     return
 
                 mudou_financeiro = (
-                    float(contrato.get("valor_total", 0)) != novo_valor_total
+                    to_centavos(contrato.get("valor_total") or 0) != to_centavos(novo_valor_total)
                     or int(contrato.get("num_parcelas", 0)) != novo_num_parcelas
                     or str(contrato.get("data_inicio", "")) != nova_data_inicio_iso
                 )
 
-                parcelas_contrato = [p for p in self.parcelas if p.get("contrato_id") == contrato_id]
+                parcelas_contrato = self.dm.query_data("parcelas", contrato_id=contrato_id)
                 tem_pagamento = any(p.get("status") == "paga" for p in parcelas_contrato)
 
                 if mudou_financeiro and tem_pagamento:
@@ -795,43 +845,39 @@ class SistemaAdvocacia(ctk.CTk):
                     nova_data_inicio_iso = str(contrato.get("data_inicio", ""))
                     nova_data_inicio = self._parse_date_input(nova_data_inicio_iso)
 
-                contrato["cliente"] = novo_cliente
-                contrato["telefone"] = novo_telefone
-                contrato["tipo_honorario"] = novo_tipo
-                contrato["area_direito"] = nova_area
-                contrato["origem"] = nova_origem
-                contrato["forma_pagamento"] = novo_pag
-                contrato["responsavel"] = novo_resp
-                contrato["status"] = novo_status
-                contrato["valor_total"] = novo_valor_total
-                contrato["num_parcelas"] = novo_num_parcelas
-                contrato["data_inicio"] = nova_data_inicio_iso
-
+                campos = {
+                    "cliente": novo_cliente,
+                    "telefone": novo_telefone,
+                    "tipo_honorario": novo_tipo,
+                    "area_direito": nova_area,
+                    "origem": nova_origem,
+                    "forma_pagamento": novo_pag,
+                    "responsavel": novo_resp,
+                    "status": novo_status,
+                    "valor_total": novo_valor_total,
+                    "num_parcelas": novo_num_parcelas,
+                    "data_inicio": nova_data_inicio_iso,
+                }
+                indice = self._indice_contratos()
                 if mudou_financeiro:
-                    self.parcelas = [p for p in self.parcelas if p.get("contrato_id") != contrato_id]
-                    valor_p = novo_valor_total / novo_num_parcelas
-                    for i in range(novo_num_parcelas):
-                        venc = nova_data_inicio + relativedelta(months=i)
-                        self.parcelas.append(
-                            {
-                                "id": f"{contrato_id}_P{i+1}",
-                                "contrato_id": contrato_id,
-                                "cliente": novo_cliente,
-                                "numero": i + 1,
-                                "valor": valor_p,
-                                "data_vencimento": venc.strftime("%Y-%m-%d"),
-                                "status": "em_aberto",
-                                "tipo_honorario": novo_tipo,
-                            }
-                        )
-
-                for p in self.parcelas:
-                    if p.get("contrato_id") == contrato_id:
-                        p["cliente"] = novo_cliente
-                        p["tipo_honorario"] = novo_tipo
-
-                self.dm.save_data("contratos", self.contratos)
-                self.dm.save_data("parcelas", self.parcelas)
+                    cronograma = gerar_cronograma(
+                        contrato_id, to_centavos(novo_valor_total), novo_num_parcelas, nova_data_inicio
+                    )
+                    # Só as parcelas que mudam são gravadas, junto com o contrato, em uma transação
+                    diff = self.dm.update_contract_schedule(contrato_id, cronograma, **campos)
+                    if diff is None:
+                        messagebox.showerror("Erro", "Não foi possível gravar o novo parcelamento.")
+                        return
+                    indice.aplicar(contrato_id, *diff, cliente=novo_cliente, tipo_honorario=novo_tipo)
+                else:
+                    self.dm.update_contract_fields(contrato_id, **campos)
+                contrato.update(campos)
+
+                # cliente/tipo_honorario das parcelas vêm do contrato (JOIN); só a memória precisa de ajuste
+                for p in indice.do_contrato(contrato_id):
+                    p["cliente"] = novo_cliente
+                    p["tipo_honorario"] = novo_tipo
+
                 self.show_contratos()
                 modal.destroy()
                 messagebox.showinfo("Sucesso", "Contrato atualizado!")
@@ -892,7 +938,10 @@ class SistemaAdvocacia(ctk.CTk):
     def salvar_contrato(self):
         try:
             dados = {k: v.get() for k, v in self.entries_contrato.items()}
-            valor = float(dados["Valor Total (R$)"].replace(',', '.'))
+            valor_centavos = to_centavos(dados["Valor Total (R$)"])
+            if valor_centavos is None:
+                raise ValueError("Valor Total vazio")
+            valor = from_centavos(valor_centavos)
             parcelas = int(dados["Nº Parcelas"])
             data_inicio_iso = self._format_date_iso(dados["Data Início (DD-MM-AAAA)"])
             
@@ -905,31 +954,23 @@ class SistemaAdvocacia(ctk.CTk):
                 'forma_pagamento': dados["Pagamento"],
                 'responsavel': dados["Responsável"],
                 'valor_total': valor,
+                'valor_total_centavos': valor_centavos,
                 'num_parcelas': parcelas,
                 'data_inicio': data_inicio_iso,
                 'status': 'ativo'
             }
             
+            # Gerar Parcelas (centavos exatos: a soma das parcelas é sempre o valor total)
+            novas_parcelas = [
+                {**p, 'cliente': contrato['cliente'], 'tipo_honorario': contrato['tipo_honorario']}
+                for p in gerar_cronograma(contrato['id'], valor_centavos, parcelas, data_inicio_iso)
+            ]
+            # Contrato e parcelas na mesma transação: nunca fica um contrato sem parcelas
+            if not self.dm.insert_contract(contrato, novas_parcelas):
+                messagebox.showerror("Erro", "Não foi possível gravar o contrato.")
+                return
             self.contratos.append(contrato)
-            self.dm.save_data("contratos", self.contratos)
-            
-            # Gerar Parcelas
-            valor_p = valor / parcelas
-            data_ini = datetime.strptime(data_inicio_iso, '%Y-%m-%d')
-            
-            for i in range(parcelas):
-                venc = data_ini + relativedelta(months=i)
-                self.parcelas.append({
-                    'id': f"{contrato['id']}_P{i+1}",
-                    'contrato_id': contrato['id'],
-                    'cliente': contrato['cliente'],
-                    'numero': i+1,
-                    'valor': valor_p,
-                    'data_vencimento': venc.strftime('%Y-%m-%d'),
-                    'status': 'em_aberto',
-                    'tipo_honorario': contrato['tipo_honorario']
-                })
-            self.dm.save_data("parcelas", self.parcelas)
+            self.parcelas.extend(novas_parcelas)
             
             messagebox.showinfo("Sucesso", "Contrato e Parcelas gerados!")
             self.show_contratos() # Refresh
@@ -939,7 +980,8 @@ class SistemaAdvocacia(ctk.CTk):
 
     # ================= FLUXO DE CAIXA =================
     def show_fluxo(self):
-        self.clear_content()
+        if self._mostrar_tela("fluxo"):
+            return
         ctk.CTkLabel(self.content_frame, text="💰 Fluxo de Caixa", font=ctk.CTkFont(size=24, weight="bold")).pack(pady=20)
         
         # Filtros
@@ -958,65 +1000,82 @@ class SistemaAdvocacia(ctk.CTk):
         
         self._create_datagrid_header(self.content_frame, self.cols_fluxo)
         
-        self.scroll_fluxo = ctk.CTkScrollableFrame(self.content_frame, fg_color="transparent")
-        self.scroll_fluxo.pack(fill="both", expand=True, padx=0, pady=5)
-            
+        carregando = self._placeholder(self.content_frame, "⏳ Carregando parcelas...")
+        self.grid_fluxo = VirtualGrid(self.content_frame, self.cols_fluxo)
+        self.grid_fluxo.pack(fill="both", expand=True, padx=0, pady=5)
+
         hoje = datetime.now().date()
-        
-        # Função auxiliar segura para data
-        def safe_get_date(p):
-            try:
-                return self._parse_date_input(p.get('data_vencimento'))
-            except ValueError:
-                return datetime.max.date() 
+        grid = self.grid_fluxo
+
+        def exibir(resultado):
+            total, parcelas = resultado
+            if carregando.winfo_exists():
+                carregando.destroy()
+            pagina = paginador.pagina
+            paginador.set_total(total)
+            if paginador.pagina != pagina:
+                # O total diminuiu e a página consultada deixou de existir: consulta a nova última página
+                carregar()
+                return
+            grid.set_data(parcelas, lambda p: self._linha_fluxo(p, hoje),
+                          on_click=lambda p: self._on_parcela_click(p['id']))
 
-        # Ordenar por vencimento
-        parcelas_sorted = sorted(self.parcelas, key=safe_get_date)
-        
-        for p in parcelas_sorted:
-            try:
-                status_raw = p.get('status', 'em_aberto')
-                venc_str = p.get('data_vencimento', '')
-                if not venc_str: continue
-                    
-                venc = self._parse_date_input(venc_str)
-                dias_diff = (venc - hoje).days
-                
-                # Badge Logic
-                if status_raw == 'paga':
-                    status_badge = ("PAGO", "badge", "#D1F2EB", "#117864") # Verde
-                elif dias_diff < 0:
-                    status_badge = (f"ATRASADO ({abs(dias_diff)}d)", "badge", "#FADBD8", "#943126") # Vermelho
-                elif dias_diff <= 5:
-                    status_badge = (f"VENCE EM {dias_diff}d", "badge", "#FCF3CF", "#B7950B") # Laranja
-                else:
-                    status_badge = ("EM ABERTO", "badge", "#EBF5FB", "#2874A6") # Azul
+        def carregar():
+            # Cada página é uma consulta no pool (LIMIT/OFFSET); a anterior, se ainda pendente, é descartada
+            self.tamanho_pagina = paginador.tamanho
+            self.workers.cancelar("fluxo")
+            self.workers.submit(self._parcelas_fluxo, paginador.tamanho, paginador.offset,
+                                grupo="fluxo", on_done=exibir)
+
+        paginador = self.pag_fluxo = Paginador(self.content_frame, carregar, tamanho=self.tamanho_pagina, rotulo="parcelas")
+        paginador.pack(fill="x", pady=(0, 5))
+        carregar()
 
-                val_str = f"R$ {p.get('valor', 0):.2f}"
-                
-                values = [
-                    p.get('id'), 
-                    venc.strftime('%d/%m/%Y'), 
-                    p.get('cliente', 'Cliente'), 
-                    val_str, 
-                    status_badge
-                ]
-                
-                self._create_datagrid_row(
-                    self.scroll_fluxo, 
-                    values, 
-                    self.cols_fluxo,
-                    command=lambda e, pid=p['id']: self._on_parcela_click(pid)
-                )
-                
-            except Exception as e:
-                print(f"Erro ao exibir parcela {p.get('id')}: {e}")
-                continue
-        
         ctk.CTkLabel(self.content_frame, text="* Clique na linha para opções de pagamento/cobrança", text_color="gray", font=("Arial", 10)).pack(pady=5)
 
+    def _atualizar_fluxo(self):
+        """Recarrega a página atual do fluxo sem remontar a tela (mantém a página em que o usuário está)."""
+        if not self._tela_exibida("fluxo"):
+            self.show_fluxo()
+            return
+        self.pag_fluxo.on_change()
+        self._tela_atualizada("fluxo")
+
+    def _parcelas_fluxo(self, limite, offset):
+        """Roda no pool: (total de parcelas, página ordenada por vencimento), tudo no SQLite."""
+        return (
+            self.dm.count_data("parcelas"),
+            self.dm.query_data("parcelas", order_by=["data_vencimento", "id"], limit=limite, offset=offset),
+        )
+
+    def _linha_fluxo(self, p, hoje):
+        """Valores das colunas de cols_fluxo para uma parcela."""
+        status_raw = p.get('status', 'em_aberto')
+        venc = parse_date(p.get('data_vencimento'))
+        dias_diff = (venc - hoje).days if venc else None
+
+        # Badge Logic
+        if status_raw == 'paga':
+            status_badge = ("PAGO", "badge", "#D1F2EB", "#117864") # Verde
+        elif dias_diff is None:
+            status_badge = ("EM ABERTO", "badge", "#EBF5FB", "#2874A6") # Sem vencimento válido
+        elif dias_diff < 0:
+            status_badge = (f"ATRASADO ({abs(dias_diff)}d)", "badge", "#FADBD8", "#943126") # Vermelho
+        elif dias_diff <= 5:
+            status_badge = (f"VENCE EM {dias_diff}d", "badge", "#FCF3CF", "#B7950B") # Laranja
+        else:
+            status_badge = ("EM ABERTO", "badge", "#EBF5FB", "#2874A6") # Azul
+
+        return [
+            p.get('id'),
+            venc.strftime('%d/%m/%Y') if venc else (p.get('data_vencimento') or '-'),
+            p.get('cliente', 'Cliente'),
+            f"R$ {p.get('valor', 0):.2f}",
+            status_badge
+        ]
+
     def _on_parcela_click(self, parcela_id):
-        parcela = next((p for p in self.parcelas if p['id'] == parcela_id), None)
+        parcela = self.dm.get_record("parcelas", parcela_id)
         if not parcela: return
         
         # Modal de Ações
@@ -1050,11 +1109,11 @@ class SistemaAdvocacia(ctk.CTk):
         pid = parcela_id
         
         # Encontrar parcela
-        parcela = next((p for p in self.parcelas if p['id'] == pid), None)
+        parcela = self.dm.get_record("parcelas", pid)
         if not parcela: return
         
         # Encontrar contrato para pegar telefone
-        contrato = next((c for c in self.contratos if c['id'] == parcela['contrato_id']), None)
+        contrato = self.dm.get_record("contratos", parcela['contrato_id'])
         
         telefone = contrato.get('telefone', '') if contrato else ''
         
@@ -1094,28 +1153,30 @@ class SistemaAdvocacia(ctk.CTk):
         if not parcela_id: return
         
         pid = parcela_id
+        data_pagamento = datetime.now().strftime('%Y-%m-%d')
+        
+        # UPDATE de uma única linha no banco
+        if not self.dm.mark_installment_paid(pid, data_pagamento):
+            messagebox.showwarning("Atenção", "Parcela não encontrada ou já paga.")
+            return
         
+        # Manter a lista em memória coerente com o banco
         for p in self.parcelas:
             if p['id'] == pid:
                 p['status'] = 'paga'
-                p['data_pagamento'] = datetime.now().strftime('%Y-%m-%d')
+                p['data_pagamento'] = data_pagamento
                 break
         
-        self.dm.save_data("parcelas", self.parcelas)
-        self.show_fluxo()
+        self._atualizar_fluxo()
         messagebox.showinfo("Sucesso", "Pagamento registrado!")
 
     def exportar_pdf_fluxo(self):
-        sucesso, msg = gerar_relatorio_fluxo(self.parcelas)
-        if sucesso:
-            messagebox.showinfo("PDF Gerado", f"Arquivo salvo em:\n{msg}")
-            os.startfile(msg) # Abre o PDF automaticamente
-        else:
-            messagebox.showerror("Erro", f"Falha ao gerar PDF: {msg}")
+        self._gerar_pdf(gerar_relatorio_fluxo, list(self.parcelas))
 
     # ================= DESPESAS =================
     def show_despesas(self):
-        self.clear_content()
+        if self._mostrar_tela("despesas"):
+            return
         ctk.CTkLabel(self.content_frame, text="📉 Controle de Despesas", font=ctk.CTkFont(size=24, weight="bold")).pack(pady=20)
         
         # Botão Nova Despesa (Topo)
@@ -1137,51 +1198,61 @@ class SistemaAdvocacia(ctk.CTk):
         
         self._create_datagrid_header(self.content_frame, self.cols_despesas)
         
-        self.scroll_despesas = ctk.CTkScrollableFrame(self.content_frame, fg_color="transparent")
-        self.scroll_despesas.pack(fill="both", expand=True, padx=0, pady=5)
+        self.grid_despesas = VirtualGrid(self.content_frame, self.cols_despesas)
+        self.grid_despesas.pack(fill="both", expand=True, padx=0, pady=5)
         
-        for d in self.despesas:
-            # Garantir que existe ID para dados antigos
-            if 'id' not in d:
-                d['id'] = f"DSP_{self.despesas.index(d)}"
-            
-            # Badge para Comprovante
-            if d.get('comprovante'):
-                comp_badge = ("VER", "badge", "#EAECEE", "#2C3E50") # Cinza
-            else:
-                comp_badge = "-"
-            
-            # Badge para Categoria (Opcional, apenas texto colorido por enquanto ou badge simples)
-            cat_map = {
-                "Aluguel": "#FADBD8",
-                "Energia": "#FCF3CF", 
-                "Pessoal": "#D6EAF8",
-                "Marketing": "#D1F2EB",
-                "Software": "#E8DAEF",
-                "Outros": "#EAEDED"
-            }
-            bg_cat = cat_map.get(d['categoria'], "#EAEDED")
-            cat_badge = (d['categoria'], "badge", bg_cat, "#333333")
-
-            values = [
-                d['id'], 
-                d['descricao'], 
-                cat_badge, 
-                d.get('tipo', '-'), 
-                f"R$ {d['valor']:.2f}", 
-                self._format_date_br(d.get('data', '')),
-                comp_badge
-            ]
-            
-            self._create_datagrid_row(
-                self.scroll_despesas, 
-                values, 
-                self.cols_despesas,
-                command=lambda e, did=d['id']: self._open_despesa_modal(did)
-            )
-            
+        self.pag_despesas = Paginador(self.content_frame, lambda: self._filter_despesas(reiniciar=False),
+                                      tamanho=self.tamanho_pagina, rotulo="despesas")
+        self.pag_despesas.pack(fill="x", pady=(0, 5))
+        self._filter_despesas()
+
         ctk.CTkLabel(self.content_frame, text="* Clique na linha para editar ou ver comprovante", text_color="gray", font=("Arial", 10)).pack(pady=5)
 
+    def _filter_despesas(self, reiniciar=True):
+        """Exibe a página atual das despesas; reiniciar=True volta à primeira."""
+        paginador = self.pag_despesas
+        self.tamanho_pagina = paginador.tamanho
+        if reiniciar:
+            paginador.reiniciar()
+
+        # Como contratos e fluxo: total por COUNT e só a página lida do SQLite (LIMIT/OFFSET)
+        paginador.set_total(self.dm.count_data("despesas"))
+        self.grid_despesas.set_data(
+            self.dm.query_data("despesas", order_by="id", limit=paginador.tamanho, offset=paginador.offset),
+            self._linha_despesa,
+            on_click=lambda d: self._open_despesa_modal(d['id'])
+        )
+
+    def _atualizar_despesas(self):
+        """Refaz a página atual das despesas no lugar, mantendo o paginador (e a página) da tela."""
+        if not self._tela_exibida("despesas"):
+            self.show_despesas()
+            return
+        self._filter_despesas(reiniciar=False)
+        self._tela_atualizada("despesas")
+
+    def _linha_despesa(self, d):
+        """Valores das colunas de cols_despesas para uma despesa."""
+        # Badge para Comprovante
+        if d.get('comprovante'):
+            comp_badge = ("VER", "badge", "#EAECEE", "#2C3E50") # Cinza
+        else:
+            comp_badge = "-"
+
+        # Badge para Categoria (Opcional, apenas texto colorido por enquanto ou badge simples)
+        bg_cat = self.CORES_CATEGORIAS.get(d['categoria'], "#EAEDED")
+        cat_badge = (d['categoria'], "badge", bg_cat, "#333333")
+
+        return [
+            d['id'],
+            d['descricao'],
+            cat_badge,
+            d.get('tipo', '-'),
+            f"R$ {d['valor']:.2f}",
+            self._format_date_br(d.get('data', '')),
+            comp_badge
+        ]
+
     def _on_despesa_double_click(self, event):
         # Deprecated
         pass
@@ -1255,7 +1326,7 @@ class SistemaAdvocacia(ctk.CTk):
                     shutil.copy2(self.temp_comprovante_path, dest_path)
                     final_path = dest_path
                 
-                self.despesas.append({
+                nova_despesa = {
                     'id': new_id,
                     'descricao': desc,
                     'categoria': entries["Categoria"].get(),
@@ -1263,10 +1334,10 @@ class SistemaAdvocacia(ctk.CTk):
                     'valor': val,
                     'data': data_iso,
                     'comprovante': final_path
-                })
-                
-                self.dm.save_data("despesas", self.despesas)
-                self.show_despesas()
+                }
+                self.despesas.append(nova_despesa)
+                self.dm.insert_records("despesas", [nova_despesa])
+                self._atualizar_despesas()
                 modal.destroy()
                 messagebox.showinfo("Sucesso", "Despesa adicionada!")
                 
@@ -1372,8 +1443,15 @@ class SistemaAdvocacia(ctk.CTk):
                     shutil.copy2(self.temp_comprovante_path_edit, dest_path)
                     despesa['comprovante'] = dest_path
                 
-                self.dm.save_data("despesas", self.despesas)
-                self.show_despesas()
+                self.dm.update_fields("despesas", despesa['id'], {
+                    'descricao': despesa['descricao'],
+                    'categoria': despesa['categoria'],
+                    'tipo': despesa['tipo'],
+                    'valor': despesa['valor'],
+                    'data': despesa['data'],
+                    'comprovante': despesa.get('comprovante'),
+                })
+                self._atualizar_despesas()
                 modal.destroy()
                 messagebox.showinfo("Sucesso", "Despesa atualizada!")
             except ValueError:
@@ -1381,9 +1459,9 @@ class SistemaAdvocacia(ctk.CTk):
 
         def on_delete():
             if messagebox.askyesno("Confirmar", "Tem certeza que deseja excluir esta despesa?"):
+                self.dm.delete_expense(despesa['id'])
                 self.despesas.remove(despesa)
-                self.dm.save_data("despesas", self.despesas)
-                self.show_despesas()
+                self._atualizar_despesas()
                 modal.destroy()
                 messagebox.showinfo("Sucesso", "Despesa removida!")
 
@@ -1410,7 +1488,8 @@ class SistemaAdvocacia(ctk.CTk):
 
     # ================= RELATÓRIOS =================
     def show_relatorios(self):
-        self.clear_content()
+        if self._mostrar_tela("relatorios"):
+            return
         ctk.CTkLabel(self.content_frame, text="📈 Relatórios e Documentos", font=ctk.CTkFont(size=24, weight="bold"), text_color="#2C3E50").pack(pady=20)
         
         grid_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
@@ -1452,14 +1531,43 @@ class SistemaAdvocacia(ctk.CTk):
         # Card 4: DRE Gerencial
         c4 = create_card(row2, "DRE Gerencial", "Resultado operacional (Receita - Despesa) mês a mês.", "📊", self._ask_ano_dre, "#8E44AD")
         c4.pack(side="left", padx=20)
+        
+        # Linha 3
+        row3 = ctk.CTkFrame(grid_frame, fg_color="transparent")
+        row3.pack(pady=15)
+        
+        # Card 5: Previsão de Caixa
+        c5 = create_card(row3, "Previsão de Caixa", "Recebimentos esperados por semana e mês, descontadas as despesas recorrentes.", "🔮", self._gerar_previsao, "#16A085")
+        c5.pack(side="left", padx=20)
+        
+        # Card 6: Aging
+        c6 = create_card(row3, "Aging da Carteira", "Valores em aberto por faixa de atraso, por cliente, área e responsável.", "⏳", self._gerar_aging, "#D35400")
+        c6.pack(side="left", padx=20)
+
+    def _gerar_pdf(self, gerador, *args):
+        """Gera um PDF no pool (gerador(*args) -> (sucesso, caminho ou erro)) e avisa ao terminar."""
+        def concluir(resultado):
+            sucesso, msg = resultado
+            if sucesso:
+                self._notify_pdf(msg)
+            else:
+                messagebox.showerror("Erro", f"Erro ao gerar PDF: {msg}")
+
+        # Sem grupo: o PDF continua sendo gerado se o usuário mudar de tela
+        self.workers.submit(
+            gerador, *args, on_done=concluir,
+            on_error=lambda e: messagebox.showerror("Erro", f"Erro ao gerar PDF: {e}")
+        )
+
+    def _gerar_previsao(self):
+        self._gerar_pdf(lambda: gerar_previsao_caixa(self.dm.get_forecast(atualizar=False)))
+
+    def _gerar_aging(self):
+        self._gerar_pdf(lambda: gerar_relatorio_aging(self.dm.get_analytics().aging()))
 
     def _gerar_inadimplencia(self):
-        sucesso, msg = gerar_relatorio_inadimplencia(self.parcelas)
-        if sucesso:
-            self._notify_pdf(msg)
-        else:
-            messagebox.showerror("Erro", f"Erro ao gerar PDF: {msg}")
-            
+        self._gerar_pdf(gerar_relatorio_inadimplencia, list(self.parcelas))
+
     def _ask_ano_ir(self):
         dialog = ctk.CTkInputDialog(text="Digite o Ano (ex: 2025):", title="Ano Base IR")
         ano = dialog.get_input()
@@ -1469,11 +1577,7 @@ class SistemaAdvocacia(ctk.CTk):
              messagebox.showerror("Erro", "Ano inválido.")
              return
             
-        sucesso, msg = gerar_extrato_ir(self.parcelas, ano)
-        if sucesso:
-            self._notify_pdf(msg)
-        else:
-            messagebox.showerror("Erro", f"Erro ao gerar PDF: {msg}")
+        self._gerar_pdf(gerar_extrato_ir, list(self.parcelas), ano)
 
     def _ask_ano_dre(self):
         dialog = ctk.CTkInputDialog(text="Digite o Ano para o DRE (ex: 2025):", title="Ano DRE")
@@ -1484,11 +1588,9 @@ class SistemaAdvocacia(ctk.CTk):
              messagebox.showerror("Erro", "Ano inválido.")
              return
             
-        sucesso, msg = gerar_dre(self.parcelas, self.despesas, ano)
-        if sucesso:
-            self._notify_pdf(msg)
-        else:
-            messagebox.showerror("Erro", f"Erro ao gerar PDF: {msg}")
+        # Totais mensais lidos dos agregados materializados (poucas linhas, sem varrer o histórico)
+        parcelas, despesas = list(self.parcelas), list(self.despesas)
+        self._gerar_pdf(lambda: gerar_dre(parcelas, despesas, ano, totais=self.dm.totais_mensais(ano)))
 
     def _notify_pdf(self, path):
         messagebox.showinfo("PDF Gerado", f"Arquivo salvo em:\n{path}")
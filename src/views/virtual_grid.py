@@ -0,0 +1,262 @@
+import sys
+
+import customtkinter as ctk
+
+# Tabela virtualizada: desenha só as linhas visíveis.
+# Um conjunto fixo de linhas (do tamanho da área visível) é criado uma vez; ao rolar, as mesmas
+# linhas recebem os dados dos registros que passam a aparecer. Com milhares de registros a tela
+# continua com algumas dezenas de widgets, e cada registro só é formatado quando fica visível.
+# Paginador divide listas grandes em páginas consultadas sob demanda.
+
+# Altura de uma linha e espaço entre linhas (mesmo visual da tabela antiga com pack(pady=2))
+ROW_HEIGHT = 55
+ROW_GAP = 4
+# Pixels rolados por "unidade" da roda do mouse / das setas da barra de rolagem
+SCROLL_UNIT = 40
+
+def _is_badge(valor):
+    """Badge: tupla (texto, "badge", cor_fundo, cor_texto)."""
+    return isinstance(valor, tuple) and len(valor) >= 2 and valor[1] == "badge"
+
+class _GridRow:
+    """Uma linha reaproveitável: uma célula por coluna, cada uma com um texto e um badge (um deles visível)."""
+
+    def __init__(self, parent, columns, on_click, on_wheel):
+        self.index = None
+        self.values = None
+        self.frame = ctk.CTkFrame(parent, fg_color="#FFFFFF", height=ROW_HEIGHT, corner_radius=8,
+                                  border_color="#EEEEEE", border_width=1)
+        self.frame.pack_propagate(False)
+        self.frame.bind("<Enter>", lambda e: self.frame.configure(border_color="#BBBBBB"))
+        self.frame.bind("<Leave>", lambda e: self.frame.configure(border_color="#EEEEEE"))
+
+        self.cells = []
+        widgets = [self.frame]
+        for _, width in columns:
+            # Container da célula com largura fixa para manter o alinhamento com o cabeçalho
+            cell = ctk.CTkFrame(self.frame, fg_color="transparent", width=width, height=40)
+            cell.pack(side="left", padx=10)
+            cell.pack_propagate(False)
+            text = ctk.CTkLabel(cell, text="", text_color="#333333", font=("Arial", 12), anchor="w")
+            badge = ctk.CTkFrame(cell, fg_color="transparent", corner_radius=12, height=24)
+            badge_text = ctk.CTkLabel(badge, text="", font=("Arial", 10, "bold"))
+            badge_text.pack(padx=8, pady=2)
+            # Estado da célula: None (vazia), "texto" ou "badge"
+            self.cells.append([text, badge, badge_text, None])
+            widgets += [cell, text, badge, badge_text]
+
+        for widget in widgets:
+            widget.bind("<Button-1>", lambda e: on_click(self.index))
+            if sys.platform.startswith("linux"):
+                widget.bind("<Button-4>", lambda e: on_wheel(-1))
+                widget.bind("<Button-5>", lambda e: on_wheel(1))
+            else:
+                widget.bind("<MouseWheel>", lambda e: on_wheel(-e.delta / (120 if sys.platform == "win32" else 1)))
+
+    def show(self, index, values, y):
+        self.index = index
+        self.frame.place(x=0, y=y, relwidth=1)
+        if values == self.values:
+            return
+        self.values = values
+        for cell, valor in zip(self.cells, values):
+            text, badge, badge_text, estado = cell
+            if _is_badge(valor):
+                texto, _, bg_color, txt_color = valor
+                badge.configure(fg_color=bg_color)
+                badge_text.configure(text=f" {texto} ", text_color=txt_color)
+                if estado != "badge":
+                    text.place_forget()
+                    badge.place(relx=0, rely=0.5, anchor="w")
+                    cell[3] = "badge"
+            else:
+                text.configure(text=str(valor))
+                if estado != "texto":
+                    badge.place_forget()
+                    text.place(relx=0, rely=0.5, anchor="w")
+                    cell[3] = "texto"
+
+    def hide(self):
+        self.index = None
+        self.frame.place_forget()
+
+class VirtualGrid(ctk.CTkFrame):
+    """
+    Área de linhas da tabela customizada (o cabeçalho continua com _create_datagrid_header).
+    columns: lista de tuplas (nome, largura), as mesmas do cabeçalho (cols_fluxo, cols_contratos...).
+    set_data(registros, formatar, on_click): formatar(registro) devolve a lista de valores das
+    colunas (texto ou badge); on_click(registro) é chamado no clique em qualquer parte da linha.
+    """
+
+    def __init__(self, master, columns, **kwargs):
+        kwargs.setdefault("fg_color", "transparent")
+        super().__init__(master, **kwargs)
+        self.columns = columns
+        self._registros = []
+        self._formatar = None
+        self._on_click = None
+        self._offset = 0
+        self._rows = []
+
+        self._scrollbar = ctk.CTkScrollbar(self, orientation="vertical", command=self.yview)
+        self._scrollbar.pack(side="right", fill="y")
+        self._body = ctk.CTkFrame(self, fg_color="transparent")
+        self._body.pack(side="left", fill="both", expand=True)
+        self._body.bind("<Configure>", lambda e: self._render())
+        if sys.platform.startswith("linux"):
+            self._body.bind("<Button-4>", lambda e: self._scroll_units(-1))
+            self._body.bind("<Button-5>", lambda e: self._scroll_units(1))
+        else:
+            self._body.bind("<MouseWheel>",
+                            lambda e: self._scroll_units(-e.delta / (120 if sys.platform == "win32" else 1)))
+
+    # ----- Dados -----
+
+    def set_data(self, registros, formatar, on_click=None):
+        """Troca os registros exibidos e volta ao topo."""
+        self._registros = registros
+        self._formatar = formatar
+        self._on_click = on_click
+        self._offset = 0
+        for row in self._rows:
+            row.values = None
+        self._render()
+
+    def refresh(self):
+        """Redesenha as linhas visíveis (ex.: depois de editar registros da lista atual)."""
+        for row in self._rows:
+            row.values = None
+        self._render()
+
+    def __len__(self):
+        return len(self._registros)
+
+    # ----- Rolagem -----
+
+    def _view_height(self):
+        # winfo_height está em pixels; posições e alturas dos widgets do CTk estão sem escala
+        return self._body.winfo_height() / self._get_widget_scaling()
+
+    def _max_offset(self):
+        total = len(self._registros) * (ROW_HEIGHT + ROW_GAP)
+        return max(0, total - self._view_height())
+
+    def _scroll_to(self, offset):
+        offset = min(max(0, offset), self._max_offset())
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+
+    def _scroll_units(self, units):
+        self._scroll_to(self._offset + units * SCROLL_UNIT)
+
+    def yview(self, *args):
+        """Protocolo de rolagem do Tk (chamado pela barra de rolagem): moveto / scroll."""
+        if not args:
+            return
+        total = len(self._registros) * (ROW_HEIGHT + ROW_GAP)
+        if args[0] == "moveto":
+            self._scroll_to(float(args[1]) * total)
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if len(args) > 2 and args[2] == "pages":
+                self._scroll_to(self._offset + amount * self._view_height())
+            else:
+                self._scroll_units(amount)
+
+    def _handle_click(self, index):
+        if index is not None and self._on_click is not None and index < len(self._registros):
+            self._on_click(self._registros[index])
+
+    # ----- Desenho -----
+
+    def _render(self):
+        altura = self._view_height()
+        passo = ROW_HEIGHT + ROW_GAP
+        total = len(self._registros)
+        self._offset = min(self._offset, self._max_offset())
+
+        # Linhas suficientes para cobrir a área visível mais uma parcialmente visível
+        necessarias = int(altura // passo) + 2
+        while len(self._rows) < necessarias:
+            self._rows.append(_GridRow(self._body, self.columns, self._handle_click, self._scroll_units))
+
+        primeiro = int(self._offset // passo)
+        deslocamento = self._offset - primeiro * passo
+        for i, row in enumerate(self._rows):
+            index = primeiro + i
+            y = i * passo - deslocamento
+            if index < total and y < altura:
+                row.show(index, self._formatar(self._registros[index]), y + ROW_GAP / 2)
+            else:
+                row.hide()
+
+        if total and altura > 0:
+            self._scrollbar.set(self._offset / (total * passo), min(1.0, (self._offset + altura) / (total * passo)))
+        else:
+            self._scrollbar.set(0.0, 1.0)
+
+# Paginação das listas: tamanhos oferecidos e o padrão
+TAMANHOS_PAGINA = (50, 100, 200, 500)
+TAMANHO_PAGINA = 100
+
+class Paginador(ctk.CTkFrame):
+    """
+    Barra de paginação: anterior / próxima, "Página X de Y · N registros" e o tamanho da página.
+    A tela consulta só a página atual (LIMIT tamanho OFFSET offset) e informa o total com set_total;
+    on_change() é chamado quando o usuário troca de página ou de tamanho.
+    """
+
+    def __init__(self, master, on_change, tamanho=TAMANHO_PAGINA, rotulo="registros", **kwargs):
+        kwargs.setdefault("fg_color", "transparent")
+        super().__init__(master, **kwargs)
+        self.on_change = on_change
+        self.tamanho = tamanho
+        self.rotulo = rotulo
+        self.pagina = 0
+        self.total = 0
+
+        self._btn_anterior = ctk.CTkButton(self, text="◀ Anterior", width=100, command=lambda: self.ir_para(self.pagina - 1))
+        self._btn_anterior.pack(side="left", padx=5)
+        self._lbl = ctk.CTkLabel(self, text="", text_color="#555555", font=("Arial", 12))
+        self._lbl.pack(side="left", padx=10)
+        self._btn_proxima = ctk.CTkButton(self, text="Próxima ▶", width=100, command=lambda: self.ir_para(self.pagina + 1))
+        self._btn_proxima.pack(side="left", padx=5)
+
+        self._combo = ctk.CTkComboBox(self, values=[str(t) for t in TAMANHOS_PAGINA], width=80,
+                                      state="readonly", command=self._trocar_tamanho)
+        self._combo.set(str(tamanho))
+        self._combo.pack(side="right", padx=5)
+        ctk.CTkLabel(self, text="Por página:", font=("Arial", 12)).pack(side="right")
+
+    @property
+    def offset(self):
+        return self.pagina * self.tamanho
+
+    @property
+    def paginas(self):
+        return max(1, -(-self.total // self.tamanho))
+
+    def set_total(self, total):
+        """Atualiza o total de registros (ajustando a página atual se ela deixou de existir)."""
+        self.total = total
+        self.pagina = min(self.pagina, self.paginas - 1)
+        self._lbl.configure(text=f"Página {self.pagina + 1} de {self.paginas} · {total} {self.rotulo}")
+        self._btn_anterior.configure(state="normal" if self.pagina > 0 else "disabled")
+        self._btn_proxima.configure(state="normal" if self.pagina < self.paginas - 1 else "disabled")
+
+    def reiniciar(self):
+        self.pagina = 0
+
+    def ir_para(self, pagina):
+        pagina = min(max(0, pagina), self.paginas - 1)
+        if pagina != self.pagina:
+            self.pagina = pagina
+            self.on_change()
+
+    def _trocar_tamanho(self, valor):
+        # Mantém o primeiro registro visível na nova página
+        primeiro = self.offset
+        self.tamanho = int(valor)
+        self.pagina = primeiro // self.tamanho
+        self.on_change()
@@ -0,0 +1,117 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Execução de cálculos pesados (consultas, agregações, scores, PDFs) fora da thread do Tk.
+# As funções rodam em threads do pool; os resultados voltam por uma fila que a thread do Tk
+# esvazia com after(), e só então os callbacks rodam (widgets só podem ser mexidos nela).
+# O SQLite é acessado pelo pool de conexões por thread do DBManager, então o DataManager
+# pode ser usado de dentro das tarefas.
+
+# Threads do pool
+MAX_WORKERS = 2
+# Intervalo de leitura da fila de resultados enquanto há tarefas pendentes
+POLL_MS = 50
+
+class Tarefa:
+    """Tarefa enviada ao pool. cancelar() descarta o resultado (e evita a execução, se ainda não começou)."""
+
+    def __init__(self, grupo, on_done, on_error):
+        self.grupo = grupo
+        self.on_done = on_done
+        self.on_error = on_error
+        self.future = None
+        self._cancelada = threading.Event()
+
+    @property
+    def cancelada(self):
+        """Pode ser consultada pela própria função em laços longos para parar mais cedo."""
+        return self._cancelada.is_set()
+
+    def cancelar(self):
+        self._cancelada.set()
+        if self.future is not None:
+            self.future.cancel()
+
+class TkWorkerPool:
+    """
+    Pool de threads integrado ao loop do Tk.
+    submit(func, *args, on_done=..., grupo="dashboard") roda func(*args) em segundo plano e chama
+    on_done(resultado) (ou on_error(exc)) na thread do Tk. cancelar(grupo) descarta as tarefas
+    pendentes de uma tela quando o usuário sai dela.
+    """
+
+    def __init__(self, root, max_workers=MAX_WORKERS, poll_ms=POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="worker")
+        self._resultados = queue.Queue()
+        self._pendentes = set()
+        self._agendado = None
+
+    def submit(self, func, *args, on_done=None, on_error=None, grupo=None):
+        tarefa = Tarefa(grupo, on_done, on_error)
+        self._pendentes.add(tarefa)
+        tarefa.future = self._executor.submit(self._executar, tarefa, func, args)
+        self._agendar()
+        return tarefa
+
+    def _executar(self, tarefa, func, args):
+        # Roda na thread do pool: nada de widgets aqui
+        if tarefa.cancelada:
+            return
+        try:
+            self._resultados.put((tarefa, func(*args), None))
+        except Exception as e:
+            self._resultados.put((tarefa, None, e))
+
+    def _agendar(self):
+        if self._agendado is None and self._pendentes:
+            self._agendado = self.root.after(self.poll_ms, self._processar)
+
+    def _processar(self):
+        """Thread do Tk: entrega os resultados prontos aos callbacks."""
+        self._agendado = None
+        while True:
+            try:
+                tarefa, resultado, erro = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            self._pendentes.discard(tarefa)
+            if tarefa.cancelada:
+                continue
+            try:
+                if erro is not None:
+                    if tarefa.on_error is not None:
+                        tarefa.on_error(erro)
+                    else:
+                        print(f"Erro em tarefa de segundo plano: {erro}")
+                elif tarefa.on_done is not None:
+                    tarefa.on_done(resultado)
+            except Exception as e:
+                print(f"Erro ao aplicar resultado de tarefa: {e}")
+        # Tarefas canceladas antes de começar nunca chegam à fila
+        self._pendentes = {t for t in self._pendentes if not (t.cancelada and t.future.done())}
+        self._agendar()
+
+    def cancelar(self, grupo):
+        """Cancela as tarefas pendentes do grupo. Retorna quantas foram canceladas."""
+        canceladas = [t for t in self._pendentes if t.grupo == grupo and not t.cancelada]
+        for tarefa in canceladas:
+            tarefa.cancelar()
+        return len(canceladas)
+
+    def pendentes(self, grupo=None):
+        return sum(1 for t in self._pendentes if not t.cancelada and (grupo is None or t.grupo == grupo))
+
+    def shutdown(self):
+        for tarefa in list(self._pendentes):
+            tarefa.cancelar()
+        self._pendentes.clear()
+        if self._agendado is not None:
+            try:
+                self.root.after_cancel(self._agendado)
+            except Exception:
+                pass
+            self._agendado = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
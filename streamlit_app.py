@@ -2,14 +2,22 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
+import io
 import os
 import sys
+import urllib.parse
 
 # Adiciona o diretório src ao path para importar módulos locais
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 # Importação do DataManager existente
 from data_manager import DataManager
+from utils.money import to_centavos, from_centavos, dividir_centavos
+from utils.dates import parse_date
+from utils.client_score import calcular_scores_clientes
+from utils.timeline import TimelineCursor
+from utils.forecast import HORIZONTE_MESES
+from utils.pdf_generator import gerar_previsao_caixa, gerar_relatorio_aging
 
 # Configuração da Página
 st.set_page_config(
@@ -41,14 +49,41 @@ def get_manager():
 def format_currency(value):
     return f"R$ {value:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
-def parse_date(date_str):
-    if not date_str: return None
-    for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
-        try:
-            return datetime.strptime(date_str, fmt).date()
-        except ValueError:
-            continue
-    return None
+def pdf_em_memoria(nome, chave, gerador, *args):
+    """
+    Bytes do PDF gerado em memória (BytesIO) por gerador(*args, buffer), guardados na sessão
+    enquanto a chave (revisões, dia, parâmetros) não mudar: o ReportLab não roda a cada rerun
+    e nenhuma sessão grava arquivo em disco. None se a geração falhar.
+    """
+    pdfs = st.session_state.setdefault("pdfs", {})
+    guardado = pdfs.get(nome)
+    if guardado is None or guardado[0] != chave:
+        buffer = io.BytesIO()
+        ok, _ = gerador(*args, buffer)
+        guardado = pdfs[nome] = (chave, buffer.getvalue() if ok else None)
+    return guardado[1]
+
+def carregar_timeline(cliente, contratos_cli):
+    """
+    Cursor da timeline do cliente guardado na sessão, com os eventos já carregados.
+    Só a primeira página é gerada de início; "Carregar mais" avança o mesmo cursor.
+    O cursor é refeito quando contratos ou parcelas mudam (ou o dia vira, por causa dos atrasos);
+    só então as parcelas do cliente são consultadas no SQLite.
+    """
+    timelines = st.session_state.setdefault("timelines", {})
+    revisoes = (st.session_state.revisoes.get("contratos"), st.session_state.revisoes.get("parcelas"),
+                datetime.now().date())
+    estado = timelines.get(cliente)
+    if estado is None or estado["revisoes"] != revisoes:
+        cursor = TimelineCursor(cliente, contratos_cli, dm.query_data("parcelas", cliente=cliente))
+        estado = {"revisoes": revisoes, "cursor": cursor, "eventos": cursor.proximos()}
+        timelines[cliente] = estado
+    return estado["cursor"], estado["eventos"]
+
+def carregar_mais_timeline(cliente):
+    estado = st.session_state.get("timelines", {}).get(cliente)
+    if estado:
+        estado["eventos"].extend(estado["cursor"].proximos())
 
 def get_status_display(row):
     hoje = datetime.now().date()
@@ -85,13 +120,37 @@ with st.sidebar:
     )
     
     st.divider()
-    st.info("💡 Dica: Esta versão web compartilha os mesmos dados JSON da versão desktop se executada localmente.")
+    st.info("💡 Dica: Esta versão web compartilha o mesmo banco SQLite da versão desktop se executada localmente.")
+
+# --- SINCRONIZAÇÃO ---
+# Tabelas exibidas por cada tela: a página só é recarregada se uma delas mudar
+MENU_TABLES = {
+    "📊 Dashboard": {"contratos", "parcelas", "despesas"},
+    "📝 Contratos": {"contratos"},
+    "💰 Fluxo de Caixa": {"contratos", "parcelas"},
+    "📉 Despesas": {"despesas"},
+    "👥 Clientes": {"contratos", "parcelas"},
+}
+
+# Revisões vistas por esta execução (lidas antes dos dados, então nada escapa)
+st.session_state.revisoes = dm.get_revisions()
+
+if hasattr(st, "fragment"):
+    @st.fragment(run_every="10s")
+    def watch_changes():
+        # include_own: o DataManager é compartilhado entre sessões, então uma gravação de
+        # outra sessão também conta como "própria" para ele
+        changed, _ = dm.poll_changes(st.session_state.revisoes, include_own=True)
+        if changed & MENU_TABLES.get(menu, set()):
+            st.rerun()
+
+    watch_changes()
 
 # --- CARREGAMENTO DE DADOS ---
-# Recarregar dados a cada interação para garantir atualização
+# Cada módulo consulta apenas o que exibe (filtros rodam no SQLite via dm.query_data).
+# Contratos é uma tabela pequena e serve de lookup para as demais telas.
 contratos = dm.load_data("contratos")
-parcelas = dm.load_data("parcelas")
-despesas = dm.load_data("despesas")
+contrato_map = {c['id']: c for c in contratos}
 
 # --- MÓDULOS ---
 
@@ -99,43 +158,24 @@ if menu == "📊 Dashboard":
     st.header("📊 Visão Geral do Escritório")
     
     # === CÁLCULOS ===
-    hoje = datetime.now().date()
-    mes_atual_str = datetime.now().strftime('%Y-%m')
+    # Motor analítico compartilhado com o desktop (arrays NumPy, valores em centavos).
+    # É reconstruído só quando alguma tabela muda; os dois períodos usam os mesmos arrays.
+    # Receita e despesa dos períodos vêm dos agregados mensais (DataManager.resumo_dashboard).
+    resumo_mes = dm.resumo_dashboard("Este Mês")
+    resumo_total = dm.resumo_dashboard("Todo o Período")
     
     # Métricas
-    receita_mes = sum(p['valor'] for p in parcelas if p['status'] == 'paga' and p.get('data_pagamento', '').startswith(mes_atual_str))
-    despesa_mes = sum(d['valor'] for d in despesas if d['data'].startswith(mes_atual_str))
-    saldo_mes = receita_mes - despesa_mes
-    
-    ticket_medio = 0
-    if contratos:
-        ticket_medio = sum(c['valor_total'] for c in contratos) / len(contratos)
+    receita_mes = from_centavos(resumo_mes['receita'])
+    despesa_mes = from_centavos(resumo_mes['despesa'])
+    saldo_mes = from_centavos(resumo_mes['saldo'])
+    ticket_medio = from_centavos(resumo_mes['ticket_medio'])
 
     # Insights Narrativos
-    daqui_30_dias = hoje + timedelta(days=30)
-    a_receber_30 = sum(
-        p['valor'] for p in parcelas 
-        if p['status'] == 'em_aberto' 
-        and parse_date(p['data_vencimento']) 
-        and hoje <= parse_date(p['data_vencimento']) <= daqui_30_dias
-    )
-    
-    qtd_atraso = sum(
-        1 for p in parcelas 
-        if p['status'] == 'em_aberto' 
-        and parse_date(p['data_vencimento']) 
-        and parse_date(p['data_vencimento']) < hoje
-    )
+    a_receber_30 = from_centavos(resumo_mes['a_receber_30'])
+    qtd_atraso = resumo_mes['qtd_atraso']
     
     # Área mais lucrativa
-    area_lucro = {}
-    contrato_map = {c['id']: c for c in contratos}
-    for p in parcelas:
-        if p['status'] == 'paga' and p.get('data_pagamento', '').startswith(mes_atual_str):
-            contrato = contrato_map.get(p['contrato_id'])
-            if contrato:
-                area = contrato.get('area_direito', 'Outros')
-                area_lucro[area] = area_lucro.get(area, 0) + p['valor']
+    area_lucro = resumo_mes['receita_por_area']
     
     top_area = max(area_lucro.items(), key=lambda x: x[1])[0] if area_lucro else "Nenhuma"
 
@@ -168,8 +208,8 @@ if menu == "📊 Dashboard":
     
     with c1:
         st.subheader("Balanço Total")
-        total_rec = sum(p['valor'] for p in parcelas if p['status'] == 'paga')
-        total_desp = sum(d['valor'] for d in despesas)
+        total_rec = from_centavos(resumo_total['receita'])
+        total_desp = from_centavos(resumo_total['despesa'])
         
         fig1, ax1 = plt.subplots(figsize=(5, 3))
         ax1.bar(['Receita', 'Despesas'], [total_rec, total_desp], color=['#2ecc71', '#e74c3c'])
@@ -177,13 +217,7 @@ if menu == "📊 Dashboard":
         
     with c2:
         st.subheader("Receita por Área")
-        area_data = {}
-        for p in parcelas:
-            if p['status'] == 'paga':
-                contrato = contrato_map.get(p['contrato_id'])
-                if contrato:
-                    area = contrato.get('area_direito', 'Outros')
-                    area_data[area] = area_data.get(area, 0) + p['valor']
+        area_data = resumo_total['receita_por_area']
         
         if area_data:
             fig2, ax2 = plt.subplots(figsize=(5, 3))
@@ -198,17 +232,11 @@ if menu == "📊 Dashboard":
 
     with c3:
         st.subheader("⚠️ Top 5 Inadimplentes")
-        inad_data = {}
-        for p in parcelas:
-            if p['status'] == 'em_aberto' and parse_date(p['data_vencimento']):
-                if parse_date(p['data_vencimento']) < hoje:
-                    cli = p.get('cliente', 'Desconhecido')
-                    inad_data[cli] = inad_data.get(cli, 0) + p['valor']
+        top_inad = resumo_total['top_inadimplentes']
         
-        if inad_data:
-            top_inad = sorted(inad_data.items(), key=lambda x: x[1], reverse=True)[:5]
+        if top_inad:
             clientes = [x[0] for x in top_inad]
-            valores = [x[1] for x in top_inad]
+            valores = [from_centavos(x[1]) for x in top_inad]
             
             fig3, ax3 = plt.subplots(figsize=(5, 3))
             ax3.barh(clientes, valores, color='#c0392b')
@@ -219,13 +247,8 @@ if menu == "📊 Dashboard":
 
     with c4:
         st.subheader("💰 Status da Carteira (A Receber)")
-        total_atrasado = sum(inad_data.values())
-        total_a_vencer = sum(
-            p['valor'] for p in parcelas 
-            if p['status'] == 'em_aberto' 
-            and parse_date(p['data_vencimento']) 
-            and parse_date(p['data_vencimento']) >= hoje
-        )
+        total_atrasado = from_centavos(resumo_total['total_atrasado'])
+        total_a_vencer = from_centavos(resumo_total['total_a_vencer'])
         
         status_vals = [total_atrasado, total_a_vencer]
         status_labels = ['Atrasado', 'A Vencer']
@@ -237,6 +260,77 @@ if menu == "📊 Dashboard":
             st.pyplot(fig4)
         else:
             st.info("Sem valores pendentes.")
+    
+    # --- AGING DA CARTEIRA ---
+    st.divider()
+    st.subheader("⏳ Aging da Carteira")
+    aging = dm.get_analytics().aging()
+    
+    colunas_aging = st.columns(len(aging['faixas']))
+    for col, faixa, qtd, valor in zip(colunas_aging, aging['faixas'], aging['qtd'], aging['total']):
+        col.metric(faixa, format_currency(from_centavos(valor)), f"{qtd} parcelas", delta_color="off")
+    
+    dimensao = st.radio("Agrupar aging por", ["Cliente", "Área", "Responsável"], horizontal=True)
+    linhas_aging = aging[{"Cliente": "por_cliente", "Área": "por_area", "Responsável": "por_responsavel"}[dimensao]]
+    if linhas_aging:
+        df_aging = pd.DataFrame(
+            [[rotulo] + [from_centavos(v) for v in valores] + [from_centavos(sum(valores))] for rotulo, valores in linhas_aging],
+            columns=[dimensao] + list(aging['faixas']) + ["Total"]
+        )
+        st.dataframe(df_aging, use_container_width=True, hide_index=True)
+        
+        chave_pdf = (tuple(sorted(st.session_state.revisoes.items())), datetime.now().date())
+        pdf = pdf_em_memoria("aging", chave_pdf, gerar_relatorio_aging, aging)
+        if pdf:
+            st.download_button("📄 Baixar Aging (PDF)", pdf, file_name="relatorio_aging.pdf", mime="application/pdf")
+    else:
+        st.success("Nenhum valor em aberto.")
+    
+    # --- PREVISÃO DE RECEBIMENTOS ---
+    st.divider()
+    st.subheader("🔮 Previsão de Recebimentos")
+    st.caption("Parcelas em aberto ponderadas pela pontualidade histórica de cada cliente, descontadas as despesas recorrentes.")
+    
+    horizonte = st.slider("Meses projetados", min_value=1, max_value=12, value=HORIZONTE_MESES)
+    previsao = dm.get_forecast(meses=horizonte)
+    
+    p1, p2, p3, p4 = st.columns(4)
+    p1.metric("Em Aberto no Período", format_currency(from_centavos(previsao['total_nominal'])))
+    p2.metric("Previsto (ponderado)", format_currency(from_centavos(previsao['total_previsto'])))
+    p3.metric("Despesas Recorrentes", format_currency(from_centavos(previsao['total_despesas'])))
+    p4.metric("Saldo Previsto", format_currency(from_centavos(previsao['saldo_previsto'])))
+    
+    escala = st.radio("Agrupar por", ["Mês", "Semana"], horizontal=True)
+    linhas = previsao['meses'] if escala == "Mês" else previsao['semanas']
+    df_previsao = pd.DataFrame({
+        escala: [l['inicio'].strftime('%m/%Y' if escala == "Mês" else '%d/%m/%Y') for l in linhas],
+        "Em Aberto": [from_centavos(l['nominal']) for l in linhas],
+        "Previsto": [from_centavos(l['previsto']) for l in linhas],
+        "Despesas": [from_centavos(l['despesas']) for l in linhas],
+        "Saldo": [from_centavos(l['saldo']) for l in linhas],
+    })
+    
+    fig5, ax5 = plt.subplots(figsize=(10, 3))
+    x = range(len(df_previsao))
+    ax5.bar([i - 0.2 for i in x], df_previsao["Previsto"], width=0.4, label="Previsto", color="#27ae60")
+    ax5.bar([i + 0.2 for i in x], df_previsao["Despesas"], width=0.4, label="Despesas", color="#c0392b")
+    ax5.plot(list(x), df_previsao["Saldo"], color="#2980b9", marker="o", label="Saldo")
+    ax5.set_xticks(list(x))
+    ax5.set_xticklabels(df_previsao[escala], rotation=45 if escala == "Semana" else 0, fontsize=8)
+    ax5.legend()
+    st.pyplot(fig5)
+    
+    with st.expander("Tabela da previsão"):
+        st.dataframe(df_previsao, use_container_width=True, hide_index=True)
+        st.caption(
+            f"Em atraso (fora da projeção): {format_currency(from_centavos(previsao['atrasado_nominal']))} — "
+            f"recuperação esperada {format_currency(from_centavos(previsao['atrasado_previsto']))}"
+        )
+    
+    chave_pdf = (tuple(sorted(st.session_state.revisoes.items())), datetime.now().date(), horizonte)
+    pdf = pdf_em_memoria("previsao", chave_pdf, gerar_previsao_caixa, previsao)
+    if pdf:
+        st.download_button("📄 Baixar Previsão (PDF)", pdf, file_name="previsao_caixa.pdf", mime="application/pdf")
 
 elif menu == "📝 Contratos":
     st.header("Gestão de Contratos")
@@ -283,26 +377,27 @@ elif menu == "📝 Contratos":
                     "parcelas": parcelas_qtd,
                     "status": "ativo"
                 }
-                contratos.append(novo_contrato)
-                dm.save_data("contratos", contratos)
+                dm.insert_records("contratos", [novo_contrato])
+                # Só a quantidade de parcelas é necessária para os ids (COUNT no SQLite)
+                total_parcelas = dm.count_data("parcelas")
                 
-                # Gerar parcelas automaticamente
-                valor_parcela = valor / parcelas_qtd
+                # Gerar parcelas automaticamente (centavos exatos: o resto vai para as primeiras)
+                valores_parcelas = dividir_centavos(to_centavos(valor), parcelas_qtd)
                 novas_parcelas = []
-                for i in range(parcelas_qtd):
+                for i, centavos in enumerate(valores_parcelas):
                     venc = data_inicio + timedelta(days=30 * (i+1))
                     novas_parcelas.append({
-                        "id": len(parcelas) + 1 + i,
+                        "id": total_parcelas + 1 + i,
                         "contrato_id": novo_contrato["id"],
                         "cliente": cliente,
                         "numero": i + 1,
-                        "valor": valor_parcela,
+                        "valor": from_centavos(centavos),
+                        "valor_centavos": centavos,
                         "data_vencimento": str(venc),
                         "status": "em_aberto",
                         "data_pagamento": ""
                     })
-                parcelas.extend(novas_parcelas)
-                dm.save_data("parcelas", parcelas)
+                dm.insert_records("parcelas", novas_parcelas)
                 
                 st.success("Contrato salvo com sucesso!")
                 st.rerun()
@@ -310,6 +405,10 @@ elif menu == "📝 Contratos":
 elif menu == "💰 Fluxo de Caixa":
     st.header("Fluxo de Caixa")
     
+    # Filtros (aplicados no SQLite, já ordenado por vencimento: atrasados primeiro)
+    filtro_status = st.multiselect("Filtrar por Status", ["em_aberto", "paga"], default=["em_aberto"])
+    parcelas = dm.query_data("parcelas", status=filtro_status or None, order_by="data_vencimento")
+    
     if parcelas:
         # Preparar DataFrame
         df_parcelas = pd.DataFrame(parcelas)
@@ -322,7 +421,7 @@ elif menu == "💰 Fluxo de Caixa":
             if row['status'] == 'paga':
                 return None
             
-            contrato = next((c for c in contratos if c['id'] == row['contrato_id']), None)
+            contrato = contrato_map.get(row['contrato_id'])
             telefone = contrato.get('telefone', '') if contrato else ''
             
             telefone_limpo = "".join(filter(str.isdigit, telefone))
@@ -343,21 +442,9 @@ elif menu == "💰 Fluxo de Caixa":
 
         df_parcelas['Link WhatsApp'] = df_parcelas.apply(gerar_link_whatsapp, axis=1)
         
-        # Filtros
-        filtro_status = st.multiselect("Filtrar por Status", ["em_aberto", "paga"], default=["em_aberto"])
-        
-        if filtro_status:
-            df_view = df_parcelas[df_parcelas['status'].isin(filtro_status)]
-        else:
-            df_view = df_parcelas
-            
-        # Ordenar: Atrasados primeiro
-        df_view['data_obj'] = df_view['data_vencimento'].apply(parse_date)
-        df_view = df_view.sort_values('data_obj')
-        
         # Exibição
         st.dataframe(
-            df_view[['id', 'cliente', 'valor', 'data_vencimento', 'Status Visual', 'Link WhatsApp']],
+            df_parcelas[['id', 'cliente', 'valor', 'data_vencimento', 'Status Visual', 'Link WhatsApp']],
             column_config={
                 "valor": st.column_config.NumberColumn("Valor", format="R$ %.2f"),
                 "Status Visual": st.column_config.TextColumn("Status", help="Estado atual da parcela"),
@@ -366,33 +453,27 @@ elif menu == "💰 Fluxo de Caixa":
             use_container_width=True,
             hide_index=True
         )
-        
-        # Ação Rápida: Baixar Parcela
-        st.divider()
-        st.subheader("Baixar Parcela")
-        c1, c2 = st.columns([1, 4])
-        id_baixar = c1.number_input("ID da Parcela", min_value=1, step=1)
-        if c2.button("Registrar Pagamento"):
-            found = False
-            for p in parcelas:
-                if p['id'] == id_baixar:
-                    if p['status'] == 'paga':
-                        st.warning("Parcela já está paga!")
-                    else:
-                        p['status'] = 'paga'
-                        p['data_pagamento'] = str(datetime.now().date())
-                        dm.save_data("parcelas", parcelas)
-                        st.success(f"Parcela {id_baixar} paga com sucesso!")
-                        st.rerun()
-                    found = True
-                    break
-            if not found:
-                st.error("Parcela não encontrada.")
     else:
         st.info("Nenhuma parcela registrada.")
+        
+    # Ação Rápida: Baixar Parcela
+    st.divider()
+    st.subheader("Baixar Parcela")
+    c1, c2 = st.columns([1, 4])
+    id_baixar = c1.number_input("ID da Parcela", min_value=1, step=1)
+    if c2.button("Registrar Pagamento"):
+        p = dm.get_record("parcelas", id_baixar)
+        if not p:
+            st.error("Parcela não encontrada.")
+        elif p['status'] == 'paga':
+            st.warning("Parcela já está paga!")
+        elif dm.mark_installment_paid(id_baixar, datetime.now().date()):
+            st.success(f"Parcela {id_baixar} paga com sucesso!")
+            st.rerun()
 
 elif menu == "📉 Despesas":
     st.header("Controle de Despesas")
+    despesas = dm.load_data("despesas")
     
     with st.form("nova_despesa"):
         c1, c2, c3 = st.columns(3)
@@ -408,8 +489,7 @@ elif menu == "📉 Despesas":
                 "categoria": categoria,
                 "data": str(datetime.now().date())
             }
-            despesas.append(nova_despesa)
-            dm.save_data("despesas", despesas)
+            dm.insert_records("despesas", [nova_despesa])
             st.success("Despesa lançada!")
             st.rerun()
             
@@ -435,13 +515,20 @@ elif menu == "👥 Clientes":
         clientes_unicos = list(set(c['cliente'] for c in contratos))
         clientes_unicos.sort()
         
-        # Ordenar clientes por score (melhores primeiro)
-        ranking = []
-        for cli in clientes_unicos:
-            ranking.append({
-                "nome": cli,
-                "dados": calcular_score_cliente(cli, contratos, parcelas)
-            })
+        # Contratos agrupados por cliente uma única vez; as parcelas de cada cliente são
+        # consultadas só quando a timeline dele é montada (carregar_timeline)
+        contratos_por_cliente = {}
+        for c in contratos:
+            contratos_por_cliente.setdefault(c['cliente'], []).append(c)
+        
+        # Ordenar clientes por score (melhores primeiro). Scores persistidos, mantidos a cada escrita;
+        # clientes ainda sem linha na tabela são calculados na hora, só com as parcelas deles
+        scores = dm.get_client_scores()
+        faltando = [cli for cli in clientes_unicos if cli not in scores]
+        if faltando:
+            parcelas_faltando = [p for cli in faltando for p in dm.query_data("parcelas", cliente=cli)]
+            scores.update(calcular_scores_clientes(contratos, parcelas_faltando, faltando))
+        ranking = [{"nome": cli, "dados": scores[cli]} for cli in clientes_unicos]
         
         # Sort by score desc
         ranking.sort(key=lambda x: x['dados']['score'], reverse=True)
@@ -464,7 +551,7 @@ elif menu == "👥 Clientes":
                 
                 # Timeline / Histórico
                 with st.expander("📜 Histórico do Cliente"):
-                    timeline = gerar_timeline_cliente(cli, contratos, parcelas)
+                    cursor, timeline = carregar_timeline(cli, contratos_por_cliente.get(cli, []))
                     if not timeline:
                         st.info("Nenhum evento registrado.")
                     else:
@@ -480,5 +567,8 @@ elif menu == "👥 Clientes":
                                 </div>
                             </div>
                             """, unsafe_allow_html=True)
+                        if cursor.tem_mais:
+                            st.button("Carregar mais", key=f"timeline_mais_{cli}",
+                                      on_click=carregar_mais_timeline, args=(cli,))
     else:
         st.warning("Nenhum cliente com contrato ativo encontrado.")
\ No newline at end of file